@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+Fingerprint dos arquivos estáticos do Portal Cautivo
+`python -m app.assets` copia cada arquivo de static/ para static/dist/ com o
+hash do conteúdo no nome (css/style.css -> dist/css/style.<hash>.css), gera
+variantes pré-comprimidas (.gz e, com o pacote brotli, .br) e grava
+static/dist/manifest.json. Com o manifesto presente, url_for('static', ...)
+aponta para os nomes com hash, que podem ser servidos com cache imutável.
+O build só usa a biblioteca padrão (roda no host, sem as dependências).
+"""
+
+import os
+import re
+import gzip
+import json
+import shutil
+import hashlib
+import logging
+import posixpath
+from typing import Dict, Optional
+
+try:
+    import brotli
+    BROTLI_AVAILABLE = True
+except ImportError:
+    BROTLI_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+DIST_DIR = 'dist'
+MANIFEST_NAME = 'manifest.json'
+HASH_LENGTH = 12
+# Tipos que valem a pena comprimir (imagens PNG/JPG já são comprimidas)
+COMPRESSIBLE = {'.css', '.js', '.svg', '.json', '.txt', '.html', '.ico', '.map'}
+CSS_URL = re.compile(r'url\(\s*([\'"]?)([^\'")]+)\1\s*\)')
+IMMUTABLE_MAX_AGE = 31536000
+
+
+def content_hash(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()[:HASH_LENGTH]
+
+
+def hashed_name(path: str, digest: str) -> str:
+    root, ext = posixpath.splitext(path)
+    return f"{root}.{digest}{ext}"
+
+
+def _rewrite_css(css: str, css_path: str, manifest: Dict[str, str]) -> str:
+    """Troca as referências url() da folha de estilo pelos arquivos com hash"""
+    css_dir = posixpath.dirname(css_path)
+
+    def replace(match):
+        quote, url = match.group(1), match.group(2)
+        if url.startswith(('data:', 'http:', 'https:', '//', '#')):
+            return match.group(0)
+        path, suffix = re.match(r'([^?#]*)(.*)', url).groups()
+        if path.startswith('/static/'):
+            target = path[len('/static/'):]
+        else:
+            target = posixpath.normpath(posixpath.join(css_dir, path))
+        if target not in manifest:
+            return match.group(0)
+        # Relativo ao CSS dentro de dist/, independente do prefixo da aplicação
+        relative = posixpath.relpath(manifest[target], posixpath.join(DIST_DIR, css_dir))
+        return f"url({quote}{relative}{suffix}{quote})"
+
+    return CSS_URL.sub(replace, css)
+
+
+def _write_variants(target: str, data: bytes) -> int:
+    """Grava o arquivo e as versões .gz/.br (quando menores que o original)"""
+    with open(target, 'wb') as handle:
+        handle.write(data)
+    written = 0
+    if os.path.splitext(target)[1].lower() not in COMPRESSIBLE:
+        return written
+    compressed = gzip.compress(data, compresslevel=9, mtime=0)
+    if len(compressed) < len(data):
+        with open(target + '.gz', 'wb') as handle:
+            handle.write(compressed)
+        written += 1
+    if BROTLI_AVAILABLE:
+        compressed = brotli.compress(data, quality=11)
+        if len(compressed) < len(data):
+            with open(target + '.br', 'wb') as handle:
+                handle.write(compressed)
+            written += 1
+    return written
+
+
+def build_manifest(static_folder: str) -> Dict[str, str]:
+    """
+    Gera static/dist/ e o manifesto {caminho original: caminho com hash}.
+
+    Os nomes dependem só do conteúdo, então o build é reproduzível e pode
+    rodar tanto no host (volume do nginx) quanto na imagem da aplicação.
+    """
+    dist = os.path.join(static_folder, DIST_DIR)
+    shutil.rmtree(dist, ignore_errors=True)
+
+    sources = []
+    for root, dirs, files in os.walk(static_folder):
+        dirs[:] = sorted(d for d in dirs if not (root == static_folder and d == DIST_DIR))
+        for name in sorted(files):
+            if name.startswith('.'):
+                continue
+            path = os.path.relpath(os.path.join(root, name), static_folder).replace(os.sep, '/')
+            sources.append(path)
+
+    manifest: Dict[str, str] = {}
+    compressed = 0
+    # CSS por último: as referências url() precisam dos hashes das imagens
+    for path in sorted(sources, key=lambda p: (p.endswith('.css'), p)):
+        with open(os.path.join(static_folder, path), 'rb') as handle:
+            data = handle.read()
+        if path.endswith('.css'):
+            data = _rewrite_css(data.decode('utf-8'), path, manifest).encode('utf-8')
+        target = posixpath.join(DIST_DIR, hashed_name(path, content_hash(data)))
+        os.makedirs(os.path.dirname(os.path.join(static_folder, target)), exist_ok=True)
+        compressed += _write_variants(os.path.join(static_folder, target), data)
+        manifest[path] = target
+
+    with open(os.path.join(dist, MANIFEST_NAME), 'w', encoding='utf-8') as handle:
+        json.dump(manifest, handle, indent=2, sort_keys=True)
+    logger.info(f"{len(manifest)} arquivos estáticos com hash ({compressed} variantes comprimidas)")
+    return manifest
+
+
+class AssetManifest:
+    """Reescreve url_for('static', ...) para os nomes com hash do manifesto"""
+
+    def __init__(self, app=None):
+        self.app = app
+        self.manifest: Dict[str, str] = {}
+        self.hashed = set()
+
+    def init_app(self, app):
+        """Inicializa com a aplicação Flask"""
+        self.app = app
+        self.load()
+        app.url_defaults(self._hashed_url)
+        app.after_request(self._cache_headers)
+
+    def load(self, static_folder: Optional[str] = None) -> Dict[str, str]:
+        static_folder = static_folder or self.app.static_folder
+        path = os.path.join(static_folder, DIST_DIR, MANIFEST_NAME)
+        try:
+            with open(path, encoding='utf-8') as handle:
+                self.manifest = json.load(handle)
+        except FileNotFoundError:
+            self.manifest = {}
+        except ValueError as e:
+            logger.error(f"Manifesto de assets inválido ({path}): {e}")
+            self.manifest = {}
+        self.hashed = set(self.manifest.values())
+        return self.manifest
+
+    def _hashed_url(self, endpoint, values):
+        if endpoint == 'static' and self.manifest:
+            filename = values.get('filename')
+            if filename in self.manifest:
+                values['filename'] = self.manifest[filename]
+
+    def _cache_headers(self, response):
+        """Arquivos com hash nunca mudam: cache de um ano (quando servidos pelo Flask)"""
+        from flask import request
+        if request.endpoint == 'static' and response.status_code == 200 \
+                and request.view_args.get('filename') in self.hashed:
+            response.cache_control.public = True
+            response.cache_control.max_age = IMMUTABLE_MAX_AGE
+            response.cache_control.immutable = True
+        return response
+
+
+# Instância global do manifesto de assets
+asset_manifest = AssetManifest()
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    build_manifest(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'static'))
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Bootstrap do usuário admin padrão do Portal Cautivo
+Executado uma vez por processo (hook do Gunicorn, `flask admin bootstrap`
+ou execução direta), fora do caminho das requisições de /admin/login
+"""
+
+import logging
+import threading
+from datetime import datetime
+
+from sqlalchemy import text
+from sqlalchemy.exc import IntegrityError
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_ADMIN_USERNAME = 'admin'
+DEFAULT_ADMIN_PASSWORD = 'admin123'
+DEFAULT_ADMIN_EMAIL = 'admin@prefeitura.com'
+
+
+class AdminBootstrap:
+    """Cria o admin padrão quando a tabela de usuários está vazia"""
+
+    # Chave do advisory lock no PostgreSQL (workers subindo juntos se serializam)
+    LOCK_KEY = 7312027
+
+    def __init__(self, app=None):
+        self.app = app
+        self.done = False
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        """Inicializa com a aplicação Flask"""
+        self.app = app
+
+    def _lock_users(self, session):
+        """Advisory lock da transação no PostgreSQL; nos outros bancos vale o UNIQUE de username"""
+        if session.get_bind().dialect.name == 'postgresql':
+            session.execute(text('SELECT pg_advisory_xact_lock(:key)'), {'key': self.LOCK_KEY})
+
+    def ensure_default_admin(self) -> bool:
+        """Cria o admin padrão se não houver usuários; retorna True se criou"""
+        from app.models import db, User
+        from app.passwords import password_hasher
+
+        try:
+            self._lock_users(db.session)
+            if db.session.query(User.id).first() is not None:
+                db.session.rollback()
+                return False
+            db.session.add(User(
+                username=DEFAULT_ADMIN_USERNAME,
+                password_hash=password_hasher.hash(DEFAULT_ADMIN_PASSWORD),
+                email=DEFAULT_ADMIN_EMAIL,
+                created_at=datetime.utcnow(),
+            ))
+            db.session.commit()
+        except IntegrityError:
+            # Outro processo criou o admin entre a consulta e o INSERT
+            db.session.rollback()
+            return False
+        logger.info("Default admin user created")
+        return True
+
+    def ensure_once(self) -> None:
+        """Bootstrap por processo: depois da primeira execução bem-sucedida não consulta mais o banco"""
+        if self.done:
+            return
+        with self._lock:
+            if self.done:
+                return
+            with self.app.app_context():
+                try:
+                    self.ensure_default_admin()
+                except Exception as e:
+                    # Banco ainda sem migrations: `flask admin bootstrap` resolve depois
+                    from app.models import db
+                    db.session.rollback()
+                    logger.warning(f"Bootstrap do admin adiado: {e}")
+                    return
+            self.done = True
+
+
+# Instância global do bootstrap
+admin_bootstrap = AdminBootstrap()
@@ -0,0 +1,196 @@
+"""
+Flask CLI commands for WiFi Portal maintenance tasks.
+
+Usage:
+    flask --app wsgi:app search-index rebuild
+    flask --app wsgi:app keyring rotate
+    flask --app wsgi:app stats refresh
+    flask --app wsgi:app access-log replay
+    flask --app wsgi:app export-logs --format csv --output registros.csv
+    flask --app wsgi:app retention run --months 12
+    flask --app wsgi:app outbox send
+    flask --app wsgi:app admin bootstrap
+    flask --app wsgi:app assets images
+    flask --app wsgi:app assets build
+    flask --app wsgi:app assets budget
+"""
+
+import click
+from flask import Flask
+
+
+def register_commands(app: Flask) -> None:
+    """Register maintenance commands on the Flask CLI."""
+
+    @app.cli.group('search-index')
+    def search_index():
+        """Blind index for searching encrypted fields."""
+
+    @search_index.command('rebuild')
+    @click.option('--batch-size', default=500, show_default=True, help='Rows per transaction.')
+    @click.option('--all', 'rebuild_all', is_flag=True, help='Rebuild every row (after changing BLIND_INDEX_KEY).')
+    def rebuild_search_index(batch_size, rebuild_all):
+        """Backfill blind indexes for access logs created before indexing."""
+        from app.data_manager import data_manager
+        updated = data_manager.rebuild_search_index(batch_size=batch_size, only_missing=not rebuild_all)
+        click.echo(f"Search index rebuilt for {updated} access logs")
+
+    @app.cli.group('keyring')
+    def keyring():
+        """Encryption keys for sensitive access log fields."""
+
+    @keyring.command('generate')
+    def generate_key():
+        """Print a new Fernet key to prepend to ENCRYPTION_KEYS."""
+        from cryptography.fernet import Fernet
+        click.echo(Fernet.generate_key().decode())
+
+    @keyring.command('export-legacy')
+    def export_legacy_key():
+        """Print the key derived from SECRET_KEY, for use in ENCRYPTION_KEYS."""
+        from app.keyring import derive_legacy_key
+        click.echo(derive_legacy_key(app.config['SECRET_KEY']).decode())
+
+    @keyring.command('rotate')
+    @click.option('--batch-size', default=500, show_default=True, help='Rows per transaction.')
+    @click.option('--pause', default=0.0, show_default=True, help='Seconds to sleep between batches.')
+    def rotate_keys(batch_size, pause):
+        """Re-encrypt nome/email with the primary key (first in ENCRYPTION_KEYS)."""
+        from app.data_manager import data_manager
+        totals = data_manager.rotate_encryption(batch_size=batch_size, pause=pause)
+        click.echo(
+            f"Rotated {totals['rotated']} access logs "
+            f"({totals['skipped']} already current, {totals['failed']} values not decryptable)"
+        )
+
+    @app.cli.group('stats')
+    def stats():
+        """Pre-aggregated dashboard statistics."""
+
+    @stats.command('refresh')
+    @click.option('--rebuild', is_flag=True, help='Drop the rollup and recompute the whole history.')
+    def refresh_stats(rebuild):
+        """Roll up closed hours of access logs (run periodically, e.g. from cron)."""
+        from app.stats_rollup import stats_rollup
+        hours = stats_rollup.refresh(rebuild=rebuild)
+        click.echo(f"Stats rollup refreshed ({hours} hourly buckets recomputed)")
+
+    @app.cli.group('access-log')
+    def access_log():
+        """Write-behind queue for access logs."""
+
+    @access_log.command('replay')
+    def replay_access_log():
+        """Re-insert quarantined write-behind segments (already stored rows are skipped)."""
+        from app.data_manager import data_manager
+        totals = data_manager.replay_quarantined_access_logs()
+        click.echo(f"Replayed {totals['rows']} access logs from {totals['files']} segments "
+                   f"({totals['failed']} segments still failing)")
+        if totals['failed']:
+            raise click.ClickException('Some quarantined segments could not be replayed')
+
+    @app.cli.command('export-logs')
+    @click.option('--format', 'fmt', type=click.Choice(['csv', 'ndjson']), default='csv', show_default=True)
+    @click.option('--start', help='First day (YYYY-MM-DD).')
+    @click.option('--end', help='Last day, inclusive (YYYY-MM-DD).')
+    @click.option('--output', type=click.File('w', encoding='utf-8'), default='-', help='Output file (default stdout).')
+    def export_logs(fmt, start, end, output):
+        """Stream access logs to a file (large compliance exports)."""
+        from app.data_manager import data_manager
+        from app.export import iter_export, parse_date_range
+        start_dt, end_dt = parse_date_range(start, end)
+        chunks = data_manager.iter_access_logs_export(start=start_dt, end=end_dt)
+        for piece in iter_export(fmt, chunks, data_manager.EXPORT_FIELDS):
+            output.write(piece)
+
+    @app.cli.group('retention')
+    def retention():
+        """Monthly partitions and retention policy for access logs."""
+
+    @retention.command('ensure-partitions')
+    @click.option('--months-ahead', default=3, show_default=True, help='Future months to pre-create.')
+    def ensure_partitions(months_ahead):
+        """Create upcoming monthly partitions (PostgreSQL only; run monthly)."""
+        from app.retention import retention_manager
+        created = retention_manager.ensure_partitions(months_ahead=months_ahead)
+        click.echo(f"Created {len(created)} partitions" + (f": {', '.join(created)}" if created else ''))
+
+    @retention.command('run')
+    @click.option('--months', type=int, default=None, help='Months to keep (default ACCESS_LOG_RETENTION_MONTHS).')
+    @click.option('--archive', is_flag=True, help='Detach old partitions into the archive schema instead of dropping.')
+    def run_retention(months, archive):
+        """Remove access logs older than the retention period."""
+        from app.retention import retention_manager
+        months = months or app.config.get('ACCESS_LOG_RETENTION_MONTHS', 0)
+        if months < 1:
+            raise click.UsageError('Retention disabled: set ACCESS_LOG_RETENTION_MONTHS or pass --months')
+        totals = retention_manager.apply_retention(months, archive=archive)
+        click.echo(
+            f"Retention applied: {totals['partitions']} partitions, "
+            f"{totals['rows']} rows, {totals['tokens']} search tokens, "
+            f"{totals['reconnects']} reconnects removed"
+        )
+
+    @app.cli.group('outbox')
+    def outbox():
+        """Queued outgoing emails."""
+
+    @outbox.command('send')
+    @click.option('--limit', default=100, show_default=True, help='Maximum messages to send.')
+    def send_outbox(limit):
+        """Send due emails now (when MAIL_OUTBOX_WORKER is disabled)."""
+        from app.outbox import email_outbox
+        totals = email_outbox.process(limit=limit)
+        click.echo(f"Sent {totals['sent']}, retrying {totals['retried']}, failed {totals['failed']}")
+
+    @app.cli.group('admin')
+    def admin():
+        """Admin panel users."""
+
+    @admin.command('bootstrap')
+    def bootstrap_admin():
+        """Create the default admin user if the users table is empty (run after db upgrade)."""
+        from app.bootstrap import admin_bootstrap, DEFAULT_ADMIN_USERNAME
+        if admin_bootstrap.ensure_default_admin():
+            click.echo(f"Default admin '{DEFAULT_ADMIN_USERNAME}' created; change its password on first login")
+        else:
+            click.echo("Admin users already exist; nothing to do")
+
+    @app.cli.group('assets')
+    def assets():
+        """Fingerprinted static files."""
+
+    @assets.command('build')
+    def build_assets():
+        """Hash static files into static/dist/ (with .gz/.br variants) and write the manifest."""
+        from app.assets import asset_manifest, build_manifest
+        manifest = build_manifest(app.static_folder)
+        asset_manifest.load()
+        click.echo(f"Built {len(manifest)} fingerprinted assets in static/dist/")
+
+    @assets.command('images')
+    def build_images():
+        """Generate resized AVIF/WebP variants of the login images (run before `assets build`)."""
+        from app.images import PIL_AVAILABLE, build_variants, responsive_images
+        if not PIL_AVAILABLE:
+            raise click.ClickException('Pillow is not installed (pip install Pillow)')
+        index = build_variants(app.static_folder)
+        responsive_images.load()
+        count = sum(len(c) for entry in index.values() for c in entry['variants'].values())
+        click.echo(f"Generated {count} image variants for {len(index)} images in static/images/responsive/")
+
+    @assets.command('budget')
+    @click.option('--template', default='login.html', show_default=True, help='Page template to measure.')
+    @click.option('--budget-kb', type=int, default=None, help='Override FIRST_PAINT_BUDGET_KB.')
+    @click.option('--viewport', type=int, default=None, help='Screen width in device pixels (FIRST_PAINT_VIEWPORT).')
+    def check_budget(template, budget_kb, viewport):
+        """Fail when the page's local first-paint bytes exceed the budget (external fonts excluded)."""
+        from app.images import first_paint_report
+        budget_kb = budget_kb or app.config['FIRST_PAINT_BUDGET_KB']
+        report = first_paint_report(app, template, viewport or app.config['FIRST_PAINT_VIEWPORT'])
+        for filename, size in report:
+            click.echo(f"{size / 1024:9.1f} KB  {filename}")
+        total = sum(size for _, size in report)
+        click.echo(f"{total / 1024:9.1f} KB  total (budget {budget_kb} KB)")
+        if total > budget_kb * 1024:
+            raise click.ClickException(f"First paint of {template} is over budget by {(total - budget_kb * 1024) / 1024:.1f} KB")
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Tokens CSRF sem estado para o Portal Cautivo
+O token é um HMAC (SECRET_KEY) sobre a janela de tempo atual e dicas do
+cliente (User-Agent e, no painel, o usuário logado), então gerar um token
+não grava nada na sessão: o GET do login não emite Set-Cookie e o esqueleto
+pré-renderizado (page_cache) não depende do cookie do navegador cativo.
+Tokens valem na janela em que foram gerados e na seguinte.
+"""
+
+import hmac
+import time
+import base64
+import hashlib
+import logging
+from typing import Optional
+
+from flask import current_app, request, session
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_WINDOW = 3600
+
+
+class CsrfTokens:
+    """Gera e valida tokens CSRF assinados por janela de tempo"""
+
+    def __init__(self, app=None):
+        self.app = app
+        self.window = DEFAULT_WINDOW
+
+    def init_app(self, app):
+        """Inicializa com a aplicação Flask"""
+        self.app = app
+        self.window = max(60, int(app.config.get('CSRF_TOKEN_WINDOW', DEFAULT_WINDOW)))
+
+    @staticmethod
+    def _client_hints() -> str:
+        # Só leitura da sessão: não a marca como modificada
+        return f"{request.headers.get('User-Agent', '')}|{session.get('username', '')}"
+
+    def _signature(self, window: int, hints: str) -> str:
+        secret = str(current_app.config['SECRET_KEY']).encode()
+        digest = hmac.new(secret, f"csrf|{window}|{hints}".encode(), hashlib.sha256).digest()
+        return base64.urlsafe_b64encode(digest).decode().rstrip('=')
+
+    def generate(self, now: Optional[float] = None) -> str:
+        """Token da janela atual para o cliente da requisição"""
+        window = int((time.time() if now is None else now) // self.window)
+        return f"{window:x}.{self._signature(window, self._client_hints())}"
+
+    def validate(self, token: Optional[str], now: Optional[float] = None) -> bool:
+        """Confere assinatura, cliente e janela (atual ou anterior)"""
+        if not token or '.' not in token:
+            return False
+        window_hex, signature = token.split('.', 1)
+        try:
+            window = int(window_hex, 16)
+        except ValueError:
+            return False
+        current = int((time.time() if now is None else now) // self.window)
+        if window not in (current, current - 1):
+            return False
+        expected = self._signature(window, self._client_hints())
+        return hmac.compare_digest(signature, expected)
+
+
+# Instância global dos tokens CSRF
+csrf_tokens = CsrfTokens()
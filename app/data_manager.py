@@ -4,11 +4,20 @@ Gerenciador de Dados para Portal Cautivo com PostgreSQL
 Implementa armazenamento seguro de dados sensíveis com criptografia em banco de dados
 """
 
+import time
+import uuid
 import logging
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Any
-from sqlalchemy import or_, func, desc
+from typing import Dict, Iterator, List, Optional, Any, Tuple
+from sqlalchemy import or_, func, desc, insert, select, update, type_coerce, cast, String
 from app.security import security_manager
+from sqlalchemy.exc import InterfaceError, OperationalError
+from app.write_behind import AccessLogWriteBehind, replay_quarantined
+from app.stats_rollup import stats_rollup
+from app.metrics import (
+    ACCESS_LOG_WRITES, ACCESS_LOG_WRITE_SECONDS, BULK_DECRYPT_SECONDS,
+    CRYPTO_OPERATIONS, SEARCH_SECONDS, STATS_SECONDS,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -20,150 +29,507 @@ class EncryptedDataManager:
         self.db = None
         self.User = None
         self.AccessLog = None
+        self.AccessLogSearchToken = None
+        self.write_behind = None
         
     def init_app(self, app):
         """Inicializa com a aplicação Flask"""
         self.app = app
         # Importa modelos aqui para evitar importação circular
-        from app.models import db, User, AccessLog
+        from app.models import db, User, AccessLog, AccessLogSearchToken
         self.db = db
         self.User = User
         self.AccessLog = AccessLog
+        self.AccessLogSearchToken = AccessLogSearchToken
         
         # Configura cipher suite para encriptação dos campos
         self._setup_encryption()
         
+        # Modo write-behind opcional para o /login
+        if app.config.get('ACCESS_LOG_WRITE_BEHIND'):
+            self.setup_write_behind()
+        
     def _setup_encryption(self):
         """Configura encriptação para os campos sensíveis"""
         # A encriptação agora é gerenciada pelo TypeDecorator nos models
         # Mas precisamos garantir que o cipher_suite está disponível
         pass
         
+    def setup_write_behind(self, start: bool = True):
+        """Ativa a fila write-behind: registros de acesso são gravados em lote"""
+        self.write_behind = AccessLogWriteBehind(
+            flush_callback=self._insert_access_rows,
+            spool_dir=self.app.config.get('ACCESS_LOG_SPOOL_DIR', 'data/spool'),
+            serialize=self._serialize_access_row,
+            deserialize=self._deserialize_access_row,
+            batch_size=self.app.config.get('ACCESS_LOG_BATCH_SIZE', 100),
+            flush_interval=self.app.config.get('ACCESS_LOG_FLUSH_INTERVAL', 2.0),
+            max_pending=self.app.config.get('ACCESS_LOG_MAX_PENDING', 10000),
+            max_failures=self.app.config.get('ACCESS_LOG_MAX_FLUSH_FAILURES', 5),
+            # Banco fora do ar: tenta de novo com backoff, sem quarentena
+            transient_errors=(OperationalError, InterfaceError),
+        )
+        if start:
+            self.write_behind.start()
+        logger.info("Write-behind de registros de acesso ativado")
+        
+    def shutdown(self):
+        """Descarrega filas pendentes (chamado no encerramento do worker)"""
+        if self.write_behind:
+            self.write_behind.stop()
+            
+    def _build_access_row(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        """Monta os valores de coluna de um registro de acesso"""
+        # Valores padrão para campos obrigatórios
+        ip = data.get('ip') or '0.0.0.0'
+        mac = data.get('mac') or ''
+        access_id = self.AccessLog.generate_access_id()
+        
+        return {
+            'nome': data.get('nome', ''),
+            'email': data.get('email', ''),
+            'email_bidx': self.AccessLog.email_index(data.get('email', '')),
+            'ip': ip,
+            'ip_hash': self.AccessLog.hash_value(ip) if ip else None,
+            'mac': mac if mac else None,
+            'mac_hash': self.AccessLog.hash_value(mac) if mac else None,
+            'user_agent': data.get('user_agent'),
+            'access_id': access_id,
+            # Mesmo instante embutido no access_id: id e timestamp ordenam juntos
+            'timestamp': self.AccessLog.access_id_time(access_id),
+        }
+        
+    @staticmethod
+    def _serialize_access_row(row: Dict[str, Any]) -> Dict[str, Any]:
+        """Converte registro para o spool (dados pessoais permanecem criptografados)"""
+        serialized = dict(row)
+        serialized['nome'] = security_manager.encrypt_data(row['nome'])
+        serialized['email'] = security_manager.encrypt_data(row['email'])
+        serialized['timestamp'] = row['timestamp'].isoformat()
+        return serialized
+        
+    @staticmethod
+    def _deserialize_access_row(row: Dict[str, Any]) -> Dict[str, Any]:
+        """Reconstrói registro lido do spool"""
+        deserialized = dict(row)
+        deserialized['nome'] = security_manager.decrypt_data(row['nome'])
+        deserialized['email'] = security_manager.decrypt_data(row['email'])
+        deserialized['timestamp'] = datetime.fromisoformat(row['timestamp'])
+        return deserialized
+        
+    def _insert_access_rows(self, rows: List[Dict[str, Any]]):
+        """
+        Grava registros em lote: um INSERT multi-linha por lote, um commit no final.
+        Idempotente: access_ids já gravados são ignorados (replay do spool após
+        queda entre o commit e a remoção do segmento).
+        """
+        batch_size = self.write_behind.batch_size if self.write_behind else len(rows)
+        with self.app.app_context():
+            try:
+                for start in range(0, len(rows), batch_size):
+                    batch = self._new_access_rows(rows[start:start + batch_size])
+                    if not batch:
+                        continue
+                    self.db.session.execute(insert(self.AccessLog), batch)
+                    # Índice cego do nome (o bulk INSERT não dispara eventos do ORM)
+                    tokens = [
+                        token
+                        for row in batch
+                        for token in self.AccessLog.search_token_rows(
+                            row['access_id'], row['nome'], row['timestamp']
+                        )
+                    ]
+                    if tokens:
+                        self.db.session.execute(insert(self.AccessLogSearchToken), tokens)
+                self.db.session.commit()
+                logger.info(f"Lote de {len(rows)} acessos registrado")
+            except Exception:
+                self.db.session.rollback()
+                raise
+            finally:
+                self.db.session.remove()
+        
+    def _new_access_rows(self, batch: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Remove do lote access_ids repetidos ou já presentes no banco"""
+        unique = list({row['access_id']: row for row in batch}.values())
+        # O timestamp deriva do access_id: o intervalo restringe as partições lidas
+        existing = set(self.db.session.scalars(
+            select(self.AccessLog.access_id).where(
+                self.AccessLog.access_id.in_([row['access_id'] for row in unique]),
+                self.AccessLog.timestamp.between(
+                    min(row['timestamp'] for row in unique),
+                    max(row['timestamp'] for row in unique),
+                ),
+            )
+        ))
+        if existing:
+            logger.warning(f"{len(existing)} registros de acesso já gravados ignorados no replay")
+        return [row for row in unique if row['access_id'] not in existing]
+        
+    def replay_quarantined_access_logs(self) -> Dict[str, int]:
+        """Regrava segmentos do write-behind em quarentena (flask access-log replay)"""
+        return replay_quarantined(
+            self.app.config.get('ACCESS_LOG_SPOOL_DIR', 'data/spool'),
+            self._insert_access_rows,
+            self._deserialize_access_row,
+        )
+        
     def log_access_encrypted(self, data: Dict[str, Any]) -> bool:
         """Registra acesso com criptografia no banco de dados"""
+        mode = 'write_behind' if self.write_behind else 'sync'
+        started = time.perf_counter()
         try:
-            # Valores padrão para campos obrigatórios
-            ip = data.get('ip') or '0.0.0.0'
-            mac = data.get('mac') or ''
+            row = self._build_access_row(data)
+            
+            # Modo write-behind: enfileira e retorna sem esperar o commit
+            if self.write_behind:
+                self.write_behind.enqueue(row)
+                logger.info(f"Acesso enfileirado: {row['access_id']}")
+                ACCESS_LOG_WRITES.labels(mode=mode, result='ok').inc()
+                return True
             
             # Cria novo registro de acesso
-            access_log = self.AccessLog(
-                nome=data.get('nome', ''),
-                email=data.get('email', ''),
-                ip=ip,
-                ip_hash=self.AccessLog.hash_value(ip) if ip else None,
-                mac=mac if mac else None,
-                mac_hash=self.AccessLog.hash_value(mac) if mac else None,
-                user_agent=data.get('user_agent'),
-                access_id=self.AccessLog.generate_access_id(),
-                timestamp=datetime.utcnow()
-            )
+            access_log = self.AccessLog(**row)
             
             self.db.session.add(access_log)
             self.db.session.commit()
             
             logger.info(f"Acesso registrado: {access_log.access_id}")
+            ACCESS_LOG_WRITES.labels(mode=mode, result='ok').inc()
             return True
             
         except Exception as e:
             logger.error(f"Erro ao registrar acesso: {e}")
             self.db.session.rollback()
+            ACCESS_LOG_WRITES.labels(mode=mode, result='error').inc()
             return False
+        finally:
+            ACCESS_LOG_WRITE_SECONDS.labels(mode=mode).observe(time.perf_counter() - started)
             
     def get_access_logs(self, limit: int = 1000) -> List[Dict[str, Any]]:
         """Obtém logs de acesso do banco de dados"""
         try:
             # Query com ordenação e limite
-            logs = self.AccessLog.query.order_by(
+            rows = self.AccessLog.query.with_entities(*self._log_columns()).order_by(
                 desc(self.AccessLog.timestamp),
                 desc(self.AccessLog.id)
             ).limit(limit).all()
             
-            # Converte para dicionários (dados já serão descriptografados pelo TypeDecorator)
-            return [log.to_dict(decrypt=True) for log in logs]
+            return self.decrypt_rows([self._log_dict(row) for row in rows])
             
         except Exception as e:
             logger.error(f"Erro ao ler logs de acesso: {e}")
             return []
             
-    def search_access_logs(self, search_term: str, field: str = 'nome') -> List[Dict[str, Any]]:
+    def _log_columns(self):
+        """Colunas de AccessLog com nome/email ainda cifrados (sem o TypeDecorator)"""
+        AccessLog = self.AccessLog
+        return [
+            AccessLog.id,
+            type_coerce(AccessLog.nome, String).label('nome'),
+            type_coerce(AccessLog.email, String).label('email'),
+            AccessLog.ip, AccessLog.ip_hash, AccessLog.mac, AccessLog.mac_hash,
+            AccessLog.user_agent, AccessLog.access_id, AccessLog.timestamp,
+        ]
+        
+    @staticmethod
+    def _log_dict(row) -> Dict[str, Any]:
+        """Mesmo formato de AccessLog.to_dict(decrypt=True), com nome/email por decifrar"""
+        return {
+            'nome': row.nome,
+            'email': row.email,
+            'ip': row.ip,
+            'ip_hash': row.ip_hash,
+            'mac': row.mac,
+            'mac_hash': row.mac_hash,
+            'user_agent': row.user_agent,
+            'access_id': row.access_id,
+            'timestamp': row.timestamp.isoformat() if row.timestamp else None,
+            'data': row.timestamp.strftime('%Y-%m-%d') if row.timestamp else None,
+            'hora': row.timestamp.strftime('%H:%M:%S') if row.timestamp else None,
+        }
+        
+    def decrypt_rows(self, rows: List[Dict[str, Any]],
+                     fields: Tuple[str, ...] = ('nome', 'email')) -> List[Dict[str, Any]]:
         """
-        Busca em logs de acesso.
+        Decifra as colunas `fields` de um lote de registros, coluna por coluna.
         
-        NOTA: Para campos encriptados, precisa descriptografar todos os registros primeiro
-        (não há como fazer LIKE em campos encriptados diretamente no banco)
+        Usa as instâncias Fernet já carregadas no chaveiro (sem hidratar objetos
+        do ORM nem passar pelo EncryptedString a cada célula).
         """
+        if not rows:
+            return rows
+        keyring = security_manager.keyring
+        with BULK_DECRYPT_SECONDS.time():
+            for field in fields:
+                for row, value in zip(rows, keyring.decrypt_many([row[field] for row in rows])):
+                    row[field] = value
+        CRYPTO_OPERATIONS.labels(operation='bulk_decrypt').inc(len(rows) * len(fields))
+        return rows
+        
+    @staticmethod
+    def encode_cursor(access_id: str) -> str:
+        """O access_id (UUIDv7, ordenado pelo tempo) do último registro é o cursor"""
+        return access_id
+        
+    @staticmethod
+    def decode_cursor(cursor: str) -> str:
+        """Valida o cursor de paginação (um access_id). Levanta ValueError se inválido"""
         try:
-            # Para campos não encriptados (ip, mac, user_agent), pode fazer busca direta
-            if field in ['ip', 'mac', 'user_agent']:
-                if field == 'ip':
-                    logs = self.AccessLog.query.filter(
-                        self.AccessLog.ip.ilike(f'%{search_term}%')
-                    ).order_by(desc(self.AccessLog.timestamp)).limit(1000).all()
-                elif field == 'mac':
-                    logs = self.AccessLog.query.filter(
-                        self.AccessLog.mac.ilike(f'%{search_term}%')
-                    ).order_by(desc(self.AccessLog.timestamp)).limit(1000).all()
-                elif field == 'user_agent':
-                    logs = self.AccessLog.query.filter(
-                        self.AccessLog.user_agent.ilike(f'%{search_term}%')
-                    ).order_by(desc(self.AccessLog.timestamp)).limit(1000).all()
-                
-                return [log.to_dict(decrypt=True) for log in logs]
+            value = uuid.UUID(cursor)
+        except (TypeError, ValueError, AttributeError):
+            raise ValueError('Cursor de paginação inválido')
+        if value.version != 7:
+            raise ValueError('Cursor de paginação inválido')
+        return str(value)
             
-            # Para campos encriptados (nome, email),
-            # precisa carregar todos e filtrar em memória
-            all_logs = self.get_access_logs(limit=10000)
-            results = []
+    def get_access_logs_page(self, cursor: Optional[str] = None, limit: int = 50,
+                             search_term: Optional[str] = None,
+                             field: str = 'nome') -> Dict[str, Any]:
+        """
+        Página de logs de acesso por keyset em access_id decrescente.
+        
+        O access_id é um UUIDv7 (ordenado pelo instante do acesso) com índice
+        único: o custo de cada página não depende da posição na tabela. O
+        limite em timestamp, derivado do próprio cursor, deixa o PostgreSQL
+        ignorar as partições mais novas. Só os registros da página são
+        descriptografados.
+        
+        Returns:
+            {'items': [...], 'next_cursor': str ou None}
+        """
+        limit = max(1, min(limit, 200))
+        
+        if search_term:
+            query = self._search_query(search_term, field)
+            if query is None:
+                return {'items': [], 'next_cursor': None}
+        else:
+            query = self.AccessLog.query
+        
+        if cursor:
+            access_id = self.decode_cursor(cursor)
+            # timestamp nunca é posterior ao instante embutido no access_id
+            newest = self.AccessLog.access_id_time(access_id) + timedelta(milliseconds=1)
+            query = query.filter(
+                self.AccessLog.access_id < access_id,
+                self.AccessLog.timestamp < newest,
+            )
+        
+        rows = query.with_entities(*self._log_columns()).order_by(
+            desc(self.AccessLog.access_id)
+        ).limit(limit + 1).all()
+        
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        next_cursor = self.encode_cursor(rows[-1].access_id) if has_more else None
+        
+        return {
+            'items': self.decrypt_rows([self._log_dict(row) for row in rows]),
+            'next_cursor': next_cursor,
+        }
             
-            search_term_lower = search_term.lower()
+    EXPORT_FIELDS = ['access_id', 'timestamp', 'data', 'hora', 'nome', 'email', 'ip', 'mac', 'user_agent']
+    
+    def iter_access_logs_export(self, start: Optional[datetime] = None,
+                                end: Optional[datetime] = None,
+                                chunk_size: int = 1000) -> Iterator[List[Dict[str, Any]]]:
+        """
+        Percorre access_logs para exportação em blocos de `chunk_size` registros.
+        
+        Usa cursor no servidor (stream_results) e descriptografa um bloco por vez
+        (decrypt_rows), então a memória do worker não cresce com o tamanho da tabela.
+        """
+        table = self.AccessLog.__table__
+        query = select(
+            table.c.access_id, table.c.timestamp,
+            type_coerce(table.c.nome, String).label('nome'),
+            type_coerce(table.c.email, String).label('email'),
+            table.c.ip, table.c.mac, table.c.user_agent
+        )
+        if start:
+            query = query.where(table.c.timestamp >= start)
+        if end:
+            query = query.where(table.c.timestamp < end)
+        query = query.order_by(table.c.access_id)
+        
+        result = self.db.session.execute(
+            query.execution_options(stream_results=True, yield_per=chunk_size)
+        )
+        for rows in result.partitions():
+            yield self.decrypt_rows([
+                {
+                    'access_id': row.access_id,
+                    'timestamp': row.timestamp.isoformat() if row.timestamp else None,
+                    'data': row.timestamp.strftime('%Y-%m-%d') if row.timestamp else None,
+                    'hora': row.timestamp.strftime('%H:%M:%S') if row.timestamp else None,
+                    'nome': row.nome,
+                    'email': row.email,
+                    'ip': row.ip,
+                    'mac': row.mac,
+                    'user_agent': row.user_agent,
+                }
+                for row in rows
+            ])
             
-            for log in all_logs:
-                if field in log and log[field] and search_term_lower in str(log[field]).lower():
-                    results.append(log)
-                    
-            return results
+    def search_access_logs(self, search_term: str, field: str = 'nome', limit: int = 1000) -> List[Dict[str, Any]]:
+        """
+        Busca em logs de acesso.
+        
+        Campos encriptados (nome, email) são buscados por índice cego (HMAC):
+        - email: correspondência exata do email normalizado
+        - nome: prefixo de palavras (ex.: "jo sil" encontra "João da Silva")
+        """
+        try:
+            with SEARCH_SECONDS.labels(field=field).time():
+                query = self._search_query(search_term, field)
+                if query is None:
+                    return []
+                
+                rows = query.with_entities(*self._log_columns()).order_by(
+                    desc(self.AccessLog.timestamp),
+                    desc(self.AccessLog.id)
+                ).limit(limit).all()
+                
+                return self.decrypt_rows([self._log_dict(row) for row in rows])
             
         except Exception as e:
             logger.error(f"Erro ao buscar logs: {e}")
             return []
             
-    def get_user_stats(self) -> Dict[str, Any]:
-        """Obtém estatísticas de uso do banco de dados"""
-        try:
-            # Total de acessos
-            total_accesses = self.db.session.query(func.count(self.AccessLog.id)).scalar()
-            
-            # IPs únicos
-            unique_ips = self.db.session.query(
-                func.count(func.distinct(self.AccessLog.ip_hash))
-            ).scalar()
-            
-            # MACs únicos
-            unique_macs = self.db.session.query(
-                func.count(func.distinct(self.AccessLog.mac_hash))
-            ).filter(self.AccessLog.mac_hash.isnot(None)).scalar()
-            
-            # Acessos hoje
-            today_start = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
-            today_accesses = self.db.session.query(
-                func.count(self.AccessLog.id)
-            ).filter(self.AccessLog.timestamp >= today_start).scalar()
-            
-            # Acessos esta semana
-            week_start = today_start - timedelta(days=today_start.weekday())
-            this_week_accesses = self.db.session.query(
-                func.count(self.AccessLog.id)
-            ).filter(self.AccessLog.timestamp >= week_start).scalar()
-            
-            stats = {
-                'total_accesses': total_accesses or 0,
-                'unique_ips': unique_ips or 0,
-                'unique_macs': unique_macs or 0,
-                'today_accesses': today_accesses or 0,
-                'this_week_accesses': this_week_accesses or 0
+    def _search_query(self, search_term: str, field: str):
+        """Monta a query de busca para o campo. Retorna None se não houver termo útil"""
+        # Para campos não encriptados (ip, mac, user_agent), pode fazer busca direta
+        if field in ['ip', 'mac', 'user_agent']:
+            column = getattr(self.AccessLog, field)
+            if field != 'user_agent':
+                # INET/MACADDR no PostgreSQL: busca parcial sobre o texto
+                column = cast(column, String)
+            return self.AccessLog.query.filter(column.ilike(f'%{search_term}%'))
+        
+        # Campos encriptados (nome, email) usam o índice cego
+        if field == 'email':
+            email_bidx = self.AccessLog.email_index(search_term)
+            if not email_bidx:
+                return None
+            return self.AccessLog.query.filter(self.AccessLog.email_bidx == email_bidx)
+        
+        if field == 'nome':
+            tokens = {
+                self.AccessLog.blind_index(word, 'nome')
+                for word in self.AccessLog.name_search_words(search_term)
             }
+            tokens.discard(None)
+            if not tokens:
+                return None
+            
+            Token = self.AccessLogSearchToken
+            matches = self.db.session.query(Token.access_id).filter(
+                Token.token.in_(tokens)
+            ).group_by(Token.access_id).having(
+                func.count(func.distinct(Token.token)) == len(tokens)
+            )
+            return self.AccessLog.query.filter(self.AccessLog.access_id.in_(matches))
+        
+        return None
+        
+    def rebuild_search_index(self, batch_size: int = 500, only_missing: bool = True) -> int:
+        """
+        Gera índices cegos para registros antigos (sem email_bidx).
+        
+        Com only_missing=False regrava todos (necessário após trocar BLIND_INDEX_KEY).
+        Percorre a tabela por id em lotes; pode ser executado com a aplicação no ar.
+        """
+        Token = self.AccessLogSearchToken
+        last_id = 0
+        updated = 0
+        while True:
+            query = self.AccessLog.query.filter(self.AccessLog.id > last_id)
+            if only_missing:
+                query = query.filter(self.AccessLog.email_bidx.is_(None))
+            logs = query.order_by(self.AccessLog.id).limit(batch_size).all()
+            if not logs:
+                break
+            
+            access_ids = [log.access_id for log in logs]
+            Token.query.filter(Token.access_id.in_(access_ids)).delete(synchronize_session=False)
+            tokens = []
+            for log in logs:
+                log.email_bidx = self.AccessLog.email_index(log.email)
+                tokens.extend(self.AccessLog.search_token_rows(log.access_id, log.nome, log.timestamp))
+            if tokens:
+                self.db.session.execute(insert(Token), tokens)
+            self.db.session.commit()
+            
+            updated += len(logs)
+            last_id = logs[-1].id
+            logger.info(f"Índice de busca reconstruído para {updated} registros")
+        return updated
             
+    def rotate_encryption(self, batch_size: int = 500, pause: float = 0.0) -> Dict[str, int]:
+        """
+        Regrava nome/email cifrados com chaves antigas usando a chave primária.
+        
+        Lê os tokens brutos (sem passar pelo TypeDecorator), pula os que já usam
+        a chave primária e atualiza em lotes por id. Idempotente e retomável;
+        `pause` (segundos entre lotes) reduz a carga com a aplicação no ar.
+        """
+        keyring = security_manager.keyring
+        table = self.AccessLog.__table__
+        raw_nome = type_coerce(table.c.nome, String)
+        raw_email = type_coerce(table.c.email, String)
+        totals = {'rotated': 0, 'skipped': 0, 'failed': 0}
+        last_id = 0
+        
+        while True:
+            rows = self.db.session.execute(
+                select(table.c.id, raw_nome, raw_email)
+                .where(table.c.id > last_id)
+                .order_by(table.c.id)
+                .limit(batch_size)
+            ).all()
+            if not rows:
+                break
+            
+            updates = []
+            for log_id, nome, email in rows:
+                values = {}
+                for column, token in (('nome', nome), ('email', email)):
+                    if not token or keyring.is_primary(token.encode()):
+                        continue
+                    try:
+                        values[column] = keyring.cipher.rotate(token.encode()).decode()
+                    except Exception:
+                        # Texto plano legado ou chave desconhecida: mantém como está
+                        totals['failed'] += 1
+                if values:
+                    updates.append((log_id, values))
+                else:
+                    totals['skipped'] += 1
+            
+            for log_id, values in updates:
+                values = {column: type_coerce(value, String) for column, value in values.items()}
+                self.db.session.execute(update(table).where(table.c.id == log_id).values(**values))
+            self.db.session.commit()
+            
+            totals['rotated'] += len(updates)
+            last_id = rows[-1][0]
+            logger.info(f"Rotação de chaves: {totals['rotated']} registros regravados até id {last_id}")
+            if pause:
+                time.sleep(pause)
+        
+        return totals
+        
+    def get_user_stats(self) -> Dict[str, Any]:
+        """Obtém estatísticas de uso (rollup pré-agregado, com consulta direta como fallback)"""
+        try:
+            started = time.perf_counter()
+            stats = stats_rollup.get_stats()
+            source = 'rollup'
+            if stats is None:
+                stats = self._live_user_stats()
+                source = 'live'
+            STATS_SECONDS.labels(source=source).observe(time.perf_counter() - started)
             return stats
             
         except Exception as e:
@@ -176,6 +542,43 @@ class EncryptedDataManager:
                 'this_week_accesses': 0,
                 'error': str(e)
             }
+            
+    def _live_user_stats(self) -> Dict[str, Any]:
+        """Estatísticas calculadas direto na tabela access_logs (varredura completa)"""
+        # Total de acessos
+        total_accesses = self.db.session.query(func.count(self.AccessLog.id)).scalar()
+        
+        # IPs únicos
+        unique_ips = self.db.session.query(
+            func.count(func.distinct(self.AccessLog.ip_hash))
+        ).scalar()
+        
+        # MACs únicos
+        unique_macs = self.db.session.query(
+            func.count(func.distinct(self.AccessLog.mac_hash))
+        ).filter(self.AccessLog.mac_hash.isnot(None)).scalar()
+        
+        # Acessos hoje
+        today_start = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+        today_accesses = self.db.session.query(
+            func.count(self.AccessLog.id)
+        ).filter(self.AccessLog.timestamp >= today_start).scalar()
+        
+        # Acessos esta semana
+        week_start = today_start - timedelta(days=today_start.weekday())
+        this_week_accesses = self.db.session.query(
+            func.count(self.AccessLog.id)
+        ).filter(self.AccessLog.timestamp >= week_start).scalar()
+        
+        stats = {
+            'total_accesses': total_accesses or 0,
+            'unique_ips': unique_ips or 0,
+            'unique_macs': unique_macs or 0,
+            'today_accesses': today_accesses or 0,
+            'this_week_accesses': this_week_accesses or 0
+        }
+        
+        return stats
 
 # Instância global do gerenciador de dados
 data_manager = EncryptedDataManager()
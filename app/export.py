@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Exportação de registros de acesso (CSV e NDJSON) em streaming
+Converte os blocos de EncryptedDataManager.iter_access_logs_export em texto
+sem acumular a tabela inteira em memória
+"""
+
+import io
+import csv
+import json
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+EXPORT_FORMATS = {
+    'csv': 'text/csv; charset=utf-8',
+    'ndjson': 'application/x-ndjson; charset=utf-8',
+}
+
+
+def iter_csv(chunks: Iterable[List[Dict[str, Any]]], fields: List[str]) -> Iterator[str]:
+    """CSV com cabeçalho; um pedaço de texto por bloco de registros"""
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=fields, extrasaction='ignore')
+    # BOM para o Excel reconhecer UTF-8 (acentos nos nomes)
+    buffer.write('\ufeff')
+    writer.writeheader()
+    yield buffer.getvalue()
+
+    for rows in chunks:
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows(rows)
+        yield buffer.getvalue()
+
+
+def iter_ndjson(chunks: Iterable[List[Dict[str, Any]]], fields: List[str]) -> Iterator[str]:
+    """Um objeto JSON por linha"""
+    for rows in chunks:
+        yield ''.join(
+            json.dumps({field: row.get(field) for field in fields}, ensure_ascii=False) + '\n'
+            for row in rows
+        )
+
+
+def parse_date_range(start: Optional[str], end: Optional[str]) -> Tuple[Optional[datetime], Optional[datetime]]:
+    """
+    Converte datas YYYY-MM-DD em intervalo [início, fim) — a data final é inclusiva.
+
+    Levanta ValueError para datas inválidas.
+    """
+    start_dt = datetime.strptime(start, '%Y-%m-%d') if start else None
+    end_dt = datetime.strptime(end, '%Y-%m-%d') + timedelta(days=1) if end else None
+    if start_dt and end_dt and start_dt >= end_dt:
+        raise ValueError('Data inicial deve ser anterior à data final')
+    return start_dt, end_dt
+
+
+def export_filename(fmt: str, moment: Optional[datetime] = None) -> str:
+    moment = moment or datetime.now()
+    return f"registros_acesso_{moment.strftime('%Y-%m-%dT%H-%M-%S')}.{fmt}"
+
+
+def iter_export(fmt: str, chunks: Iterable[List[Dict[str, Any]]], fields: List[str]) -> Iterator[str]:
+    """Seleciona o serializador do formato pedido"""
+    if fmt == 'csv':
+        return iter_csv(chunks, fields)
+    if fmt == 'ndjson':
+        return iter_ndjson(chunks, fields)
+    raise ValueError(f'Formato de exportação inválido: {fmt}')
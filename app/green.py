@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Modo de worker do Portal Cautivo (sync ou gevent)
+O deploy/gunicorn.conf.py, o wsgi.py e o pool do SQLAlchemy leem as mesmas
+variáveis (GUNICORN_WORKER_CLASS, GUNICORN_WORKER_CONNECTIONS,
+GUNICORN_THREADS). Com gevent, o wsgi.py aplica o monkey patching antes de
+importar a aplicação e o psycopg2 passa a esperar o socket de forma
+cooperativa: um envio SMTP ou commit lento bloqueia só a greenlet da
+requisição, não o worker inteiro.
+Este módulo não importa gevent nem Flask no topo (é lido pelo gunicorn.conf.py).
+"""
+
+import os
+import logging
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# Escolhido pelo benchmark (tests/benchmark/bench_portal.py --worker-class),
+# ver "Modelo de worker" em docs/DEPLOYMENT.md
+DEFAULT_WORKER_CLASS = 'gevent'
+DEFAULT_WORKER_CONNECTIONS = 1000
+DEFAULT_THREADS = 2
+# Conexões por worker: as greenlets esperam na fila do pool (pool_timeout)
+DEFAULT_POOL_SIZE = 10
+DEFAULT_MAX_OVERFLOW = 5
+DEFAULT_POOL_TIMEOUT = 10
+
+_patched = False
+
+
+def worker_class() -> str:
+    return os.getenv('GUNICORN_WORKER_CLASS', DEFAULT_WORKER_CLASS).strip().lower()
+
+
+def worker_connections() -> int:
+    return int(os.getenv('GUNICORN_WORKER_CONNECTIONS', str(DEFAULT_WORKER_CONNECTIONS)))
+
+
+def threads() -> int:
+    return int(os.getenv('GUNICORN_THREADS', str(DEFAULT_THREADS)))
+
+
+def is_green(name: Optional[str] = None) -> bool:
+    # "gevent" ou o caminho completo (gunicorn.workers.ggevent.GeventWorker)
+    return 'gevent' in (name or worker_class())
+
+
+def worker_concurrency(name: Optional[str] = None) -> int:
+    """Requisições simultâneas que um worker atende"""
+    if is_green(name):
+        return worker_connections()
+    return threads()
+
+
+def _gevent_wait_callback(conn, timeout=None):
+    """Espera do psycopg2 pelo hub do gevent (equivalente ao psycogreen)"""
+    import psycopg2
+    from psycopg2 import extensions
+    from gevent.socket import wait_read, wait_write
+
+    while True:
+        state = conn.poll()
+        if state == extensions.POLL_OK:
+            break
+        elif state == extensions.POLL_READ:
+            wait_read(conn.fileno(), timeout=timeout)
+        elif state == extensions.POLL_WRITE:
+            wait_write(conn.fileno(), timeout=timeout)
+        else:
+            raise psycopg2.OperationalError(f"Bad result from poll: {state!r}")
+
+
+def make_psycopg_green() -> bool:
+    """
+    Torna o psycopg2 cooperativo. O psycopg 3 já detecta o monkey patching
+    do gevent sozinho; sem nenhum dos dois não há nada a fazer.
+    """
+    try:
+        from psycopg2 import extensions
+    except ImportError:
+        return False
+    extensions.set_wait_callback(_gevent_wait_callback)
+    return True
+
+
+def patch(name: Optional[str] = None) -> bool:
+    """
+    Aplica o monkey patching do gevent (idempotente). Precisa rodar antes de
+    qualquer import que abra sockets ou crie threads (wsgi.py faz isso).
+    """
+    global _patched
+    if _patched or not is_green(name):
+        return _patched
+    from gevent import monkey
+    monkey.patch_all()
+    green_driver = make_psycopg_green()
+    _patched = True
+    logger.info(f"gevent ativo (psycopg2 cooperativo: {green_driver})")
+    return True
+
+
+def pool_options(database_url: str, name: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Opções do pool do SQLAlchemy derivadas da concorrência do worker.
+
+    Com sync/gthread cada thread usa no máximo uma conexão; com gevent o
+    pool fica limitado (DB_POOL_SIZE + DB_MAX_OVERFLOW) e as demais
+    greenlets aguardam até DB_POOL_TIMEOUT segundos. O total no PostgreSQL
+    é workers x (pool + overflow). SQLite usa pool próprio e é ignorado.
+    """
+    if database_url.startswith('sqlite'):
+        return {}
+    concurrency = worker_concurrency(name)
+    pool_size = min(concurrency, int(os.getenv('DB_POOL_SIZE', str(DEFAULT_POOL_SIZE))))
+    max_overflow = int(os.getenv('DB_MAX_OVERFLOW', str(DEFAULT_MAX_OVERFLOW)))
+    return {
+        'pool_size': pool_size,
+        'max_overflow': max(0, min(max_overflow, concurrency - pool_size)),
+        'pool_timeout': int(os.getenv('DB_POOL_TIMEOUT', str(DEFAULT_POOL_TIMEOUT))),
+    }
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Verificações de saúde do Portal Cautivo
+Liveness (/healthz) só indica que o processo responde; readiness (/readyz)
+testa banco, storage do rate limiter e criptografia com timeout curto e
+guarda o resultado por alguns segundos para absorver rajadas de probes
+"""
+
+import time
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+from datetime import datetime
+from typing import Any, Callable, Dict, Optional
+
+from sqlalchemy import text
+
+logger = logging.getLogger(__name__)
+
+PROBE_TOKEN = b'readiness-probe'
+
+
+class HealthChecker:
+    """Probe de prontidão com latência por dependência"""
+
+    def __init__(self, app=None):
+        self.app = app
+        self.timeout = 1.0
+        self.cache_seconds = 5.0
+        self._result: Optional[Dict[str, Any]] = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    def init_app(self, app):
+        """Inicializa com a aplicação Flask"""
+        self.app = app
+        self.timeout = app.config.get('HEALTH_CHECK_TIMEOUT', 1.0)
+        self.cache_seconds = app.config.get('HEALTH_CACHE_SECONDS', 5.0)
+
+    # ------------------------------------------------------------------
+    # Dependências
+    # ------------------------------------------------------------------
+
+    def check_database(self) -> str:
+        """SELECT 1 usando uma conexão do pool do SQLAlchemy"""
+        from app.models import db
+        with db.engine.connect() as connection:
+            connection.execute(text('SELECT 1'))
+        return db.engine.dialect.name
+
+    def check_rate_limit_storage(self) -> str:
+        """PING no storage do Flask-Limiter (Redis ou memória)"""
+        from app.security import security_manager
+        storage = security_manager.limiter.storage
+        if not storage.check():
+            raise ConnectionError('storage do rate limiter não respondeu')
+        return type(storage).__name__
+
+    def check_cipher(self) -> str:
+        """Cifra e decifra um valor com a chave primária do chaveiro"""
+        from app import models
+        from app.security import security_manager
+        if models._cipher_suite is None:
+            raise RuntimeError('criptografia dos modelos não configurada')
+        keyring = security_manager.keyring
+        if keyring.primary.decrypt(keyring.primary.encrypt(PROBE_TOKEN)) != PROBE_TOKEN:
+            raise RuntimeError('falha na verificação da chave primária')
+        return f'{len(keyring.keys)} chave(s)'
+
+    def checks(self) -> Dict[str, Callable[[], str]]:
+        return {
+            'database': self.check_database,
+            'rate_limit_storage': self.check_rate_limit_storage,
+            'cipher': self.check_cipher,
+        }
+
+    # ------------------------------------------------------------------
+    # Execução
+    # ------------------------------------------------------------------
+
+    def _timed(self, check: Callable[[], str]) -> Dict[str, Any]:
+        started = time.perf_counter()
+        with self.app.app_context():
+            detail = check()
+        return {'status': 'ok', 'detail': detail,
+                'latency_ms': round((time.perf_counter() - started) * 1000, 2)}
+
+    def run(self) -> Dict[str, Any]:
+        """Executa as verificações em paralelo; cada uma tem até `timeout` segundos"""
+        checks = self.checks()
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=len(checks), thread_name_prefix='health')
+
+        started = time.perf_counter()
+        futures = {name: self._executor.submit(self._timed, check) for name, check in checks.items()}
+        results = {}
+        for name, future in futures.items():
+            remaining = max(self.timeout - (time.perf_counter() - started), 0)
+            try:
+                results[name] = future.result(timeout=remaining)
+            except TimeoutError:
+                results[name] = {'status': 'timeout', 'latency_ms': round(self.timeout * 1000, 2)}
+            except Exception as e:
+                results[name] = {'status': 'error', 'error': str(e)[:200],
+                                 'latency_ms': round((time.perf_counter() - started) * 1000, 2)}
+
+        ready = all(result['status'] == 'ok' for result in results.values())
+        if not ready:
+            failed = [name for name, result in results.items() if result['status'] != 'ok']
+            logger.warning(f"Readiness falhou: {', '.join(failed)}")
+        return {
+            'status': 'ready' if ready else 'unavailable',
+            'checks': results,
+            'checked_at': datetime.utcnow().isoformat(),
+        }
+
+    def readiness(self) -> Dict[str, Any]:
+        """Resultado em cache por `cache_seconds`; probes simultâneos esperam a mesma execução"""
+        with self._lock:
+            age = time.monotonic() - self._checked_at
+            if self._result is None or age >= self.cache_seconds:
+                self._result = self.run()
+                self._checked_at = time.monotonic()
+                age = 0.0
+            return dict(self._result, cached=age > 0, age_seconds=round(age, 2))
+
+    def invalidate(self):
+        with self._lock:
+            self._result = None
+
+
+# Instância global do verificador de saúde
+health_checker = HealthChecker()
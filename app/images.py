@@ -0,0 +1,334 @@
+#!/usr/bin/env python3
+"""
+Imagens responsivas do Portal Cautivo
+`python -m app.images` gera, para o fundo e os ícones da página de login,
+versões redimensionadas em AVIF/WebP (e um fallback JPEG/PNG) em
+static/images/responsive/, com o índice variants.json. O helper de template
+`picture()` monta o <picture> com `srcset`, e `first_paint_report()` mede os
+bytes que a página de login baixa antes da primeira pintura (orçamento).
+Rode antes de `python -m app.assets`, que aplica o hash também às variantes
+(no host basta o Pillow; Flask/markupsafe são importados só nos helpers).
+"""
+
+import os
+import io
+import gzip
+import json
+import logging
+import posixpath
+from html.parser import HTMLParser
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from app.assets import COMPRESSIBLE, CSS_URL, asset_manifest
+
+try:
+    from PIL import Image, features
+    PIL_AVAILABLE = True
+except ImportError:
+    PIL_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+RESPONSIVE_DIR = 'images/responsive'
+VARIANTS_NAME = 'variants.json'
+MIME_TYPES = {'avif': 'image/avif', 'webp': 'image/webp', 'jpeg': 'image/jpeg', 'png': 'image/png'}
+EXTENSIONS = {'jpeg': 'jpg'}
+QUALITY = {'avif': 50, 'webp': 75, 'jpeg': 78}
+
+
+class ImageSpec(NamedTuple):
+    widths: Tuple[int, ...]
+    fallback: str
+    # Ícones ficam só no formato original (nem todo navegador aceita favicon WebP)
+    modern: bool = True
+
+
+# Imagens da primeira pintura do login (fundo e favicon)
+RESPONSIVE_IMAGES: Dict[str, ImageSpec] = {
+    'images/centro-cultural-pb.png': ImageSpec((480, 960, 1600), 'jpeg'),
+    'images/bg-wifi4.png': ImageSpec((480, 960, 1600), 'jpeg'),
+    'images/favicon.png': ImageSpec((32, 192), 'png', modern=False),
+}
+
+
+def modern_formats() -> List[str]:
+    """Formatos modernos suportados pelo Pillow instalado, do melhor para o pior"""
+    if not PIL_AVAILABLE:
+        return []
+    return [fmt for fmt in ('avif', 'webp') if features.check(fmt)]
+
+
+def variant_name(source: str, width: int, fmt: str) -> str:
+    stem = posixpath.splitext(posixpath.basename(source))[0]
+    return posixpath.join(RESPONSIVE_DIR, f"{stem}-{width}.{EXTENSIONS.get(fmt, fmt)}")
+
+
+def _encode(image, fmt: str) -> bytes:
+    buffer = io.BytesIO()
+    if fmt == 'jpeg':
+        image.convert('RGB').save(buffer, 'JPEG', quality=QUALITY[fmt], optimize=True, progressive=True)
+    elif fmt == 'png':
+        image.save(buffer, 'PNG', optimize=True)
+    else:
+        image.save(buffer, fmt.upper(), quality=QUALITY[fmt])
+    return buffer.getvalue()
+
+
+def build_variants(static_folder: str,
+                   images: Optional[Dict[str, ImageSpec]] = None) -> Dict[str, dict]:
+    """
+    Gera as variantes e grava static/images/responsive/variants.json.
+
+    Larguras maiores que a original não são geradas (a original entra no
+    lugar). Requer Pillow; sem ele, levanta RuntimeError.
+    """
+    if not PIL_AVAILABLE:
+        raise RuntimeError('Pillow não instalado: pip install Pillow')
+
+    images = RESPONSIVE_IMAGES if images is None else images
+    output = os.path.join(static_folder, RESPONSIVE_DIR)
+    os.makedirs(output, exist_ok=True)
+    for name in os.listdir(output):
+        os.remove(os.path.join(output, name))
+
+    index: Dict[str, dict] = {}
+    for source, spec in sorted(images.items()):
+        path = os.path.join(static_folder, source)
+        if not os.path.exists(path):
+            logger.warning(f"Imagem {source} não encontrada, ignorando")
+            continue
+        with Image.open(path) as original:
+            original.load()
+            width, height = original.size
+            widths = sorted({min(w, width) for w in spec.widths})
+            formats = (modern_formats() if spec.modern else []) + [spec.fallback]
+            variants: Dict[str, List[list]] = {fmt: [] for fmt in formats}
+            for target_width in widths:
+                target_height = round(height * target_width / width)
+                resized = original if target_width == width else \
+                    original.resize((target_width, target_height), Image.LANCZOS)
+                for fmt in formats:
+                    name = variant_name(source, target_width, fmt)
+                    with open(os.path.join(static_folder, name), 'wb') as handle:
+                        handle.write(_encode(resized, fmt))
+                    variants[fmt].append([name, target_width])
+        # `formats` guarda a ordem de preferência; o último é o fallback
+        index[source] = {'width': width, 'height': height, 'formats': formats, 'variants': variants}
+
+    with open(os.path.join(output, VARIANTS_NAME), 'w', encoding='utf-8') as handle:
+        json.dump(index, handle, indent=2, sort_keys=True)
+    logger.info(f"Variantes responsivas geradas para {len(index)} imagens ({', '.join(modern_formats()) or 'sem formatos modernos'})")
+    return index
+
+
+class ResponsiveImages:
+    """Helper de template `picture()`/`image_variant()` sobre o variants.json"""
+
+    def __init__(self, app=None):
+        self.app = app
+        self.variants: Dict[str, dict] = {}
+
+    def init_app(self, app):
+        """Inicializa com a aplicação Flask"""
+        self.app = app
+        self.load()
+        app.add_template_global(self.picture, 'picture')
+        app.add_template_global(self.image_variant, 'image_variant')
+
+    def load(self, static_folder: Optional[str] = None) -> Dict[str, dict]:
+        static_folder = static_folder or self.app.static_folder
+        path = os.path.join(static_folder, RESPONSIVE_DIR, VARIANTS_NAME)
+        try:
+            with open(path, encoding='utf-8') as handle:
+                self.variants = json.load(handle)
+        except FileNotFoundError:
+            self.variants = {}
+        except ValueError as e:
+            logger.error(f"Índice de imagens responsivas inválido ({path}): {e}")
+            self.variants = {}
+        return self.variants
+
+    @staticmethod
+    def _url(filename: str) -> str:
+        from flask import url_for
+        # url_for('static') passa pelo manifesto de assets (nomes com hash)
+        return url_for('static', filename=filename)
+
+    def _srcset(self, candidates: List[list]) -> str:
+        return ', '.join(f"{self._url(name)} {width}w" for name, width in candidates)
+
+    def image_variant(self, source: str, width: int) -> str:
+        """URL da menor variante com pelo menos `width` px no formato de fallback"""
+        entry = self.variants.get(source)
+        if not entry:
+            return self._url(source)
+        candidates = entry['variants'][entry['formats'][-1]]
+        for name, candidate_width in candidates:
+            if candidate_width >= width:
+                return self._url(name)
+        return self._url(candidates[-1][0])
+
+    def picture(self, source: str, alt: str = '', sizes: str = '100vw',
+                class_: Optional[str] = None, **attrs) -> 'Markup':
+        """
+        <picture> com um <source> por formato moderno e <img> de fallback.
+
+        Sem variants.json (desenvolvimento sem o build) vira um <img> simples
+        com a imagem original.
+        """
+        from markupsafe import Markup, escape
+        entry = self.variants.get(source)
+        picture_attrs = f' data-source="{escape(source)}"'
+        if class_:
+            picture_attrs += f' class="{escape(class_)}"'
+        img_attrs = ''.join(f' {escape(k.replace("_", "-"))}="{escape(v)}"' for k, v in attrs.items())
+
+        if not entry:
+            return Markup(f'<picture{picture_attrs}><img src="{escape(self._url(source))}" '
+                          f'alt="{escape(alt)}"{img_attrs}></picture>')
+
+        formats = entry['formats']
+        parts = [f'<picture{picture_attrs}>']
+        for fmt in formats[:-1]:
+            parts.append(f'<source type="{MIME_TYPES[fmt]}" sizes="{escape(sizes)}" '
+                         f'srcset="{escape(self._srcset(entry["variants"][fmt]))}">')
+        fallback = entry['variants'][formats[-1]]
+        middle = fallback[len(fallback) // 2][0]
+        parts.append(f'<img src="{escape(self._url(middle))}" '
+                     f'srcset="{escape(self._srcset(fallback))}" sizes="{escape(sizes)}" '
+                     f'width="{entry["width"]}" height="{entry["height"]}" '
+                     f'alt="{escape(alt)}"{img_attrs}>')
+        parts.append('</picture>')
+        return Markup(''.join(parts))
+
+
+# Instância global das imagens responsivas
+responsive_images = ResponsiveImages()
+
+
+# ----------------------------------------------------------------------
+# Orçamento de bytes da primeira pintura
+# ----------------------------------------------------------------------
+
+class _ResourceParser(HTMLParser):
+    """Coleta folhas de estilo, scripts, ícones e imagens da página"""
+
+    def __init__(self):
+        super().__init__()
+        self.resources: List[Tuple[str, str]] = []
+        self.pictures: List[dict] = []
+        self._picture: Optional[dict] = None
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        if tag == 'link' and attrs.get('href'):
+            rel = (attrs.get('rel') or '').split()
+            if 'stylesheet' in rel:
+                self.resources.append(('css', attrs['href']))
+            elif 'icon' in rel:
+                self.resources.append(('icon', attrs['href']))
+        elif tag == 'script' and attrs.get('src'):
+            self.resources.append(('script', attrs['src']))
+        elif tag == 'picture':
+            self._picture = {'source': attrs.get('data-source'), 'srcsets': []}
+        elif tag == 'source' and self._picture is not None and attrs.get('srcset'):
+            self._picture['srcsets'].append(attrs['srcset'])
+        elif tag == 'img' and attrs.get('src'):
+            if self._picture is not None:
+                self._picture['img'] = (attrs['src'], attrs.get('srcset'))
+            else:
+                self.resources.append(('image', attrs['src']))
+
+    def handle_endtag(self, tag):
+        if tag == 'picture' and self._picture is not None:
+            self.pictures.append(self._picture)
+            self._picture = None
+
+
+def _pick_candidate(srcset: str, viewport: int) -> str:
+    """Candidato que o navegador escolheria para `sizes=100vw` em `viewport` px"""
+    candidates = []
+    for item in srcset.split(','):
+        url, _, descriptor = item.strip().partition(' ')
+        width = int(descriptor.strip()[:-1]) if descriptor.strip().endswith('w') else 0
+        candidates.append((width, url))
+    candidates.sort()
+    for width, url in candidates:
+        if width >= viewport:
+            return url
+    return candidates[-1][1]
+
+
+def first_paint_report(app, template: str = 'login.html', viewport: int = 1080) -> List[Tuple[str, int]]:
+    """
+    Bytes transferidos por recurso local até a primeira pintura de `template`.
+
+    Arquivos de texto contam comprimidos (gzip_static no nginx); de cada
+    <picture> conta o maior candidato entre os formatos modernos, já que
+    navegadores sem AVIF recebem o WebP. Recursos externos (fontes) ficam
+    de fora, assim como imagens do CSS substituídas por um <picture>.
+    O template é renderizado sem contexto, sem passar por banco ou limiter.
+    """
+    from flask import render_template
+    static_prefix = app.static_url_path.rstrip('/') + '/'
+    reverse = {hashed: original for original, hashed in asset_manifest.manifest.items()}
+
+    def local_file(url: str) -> Optional[str]:
+        url = url.split('?')[0].split('#')[0]
+        if not url.startswith(static_prefix):
+            return None
+        return url[len(static_prefix):]
+
+    def transfer_size(filename: str) -> int:
+        with open(os.path.join(app.static_folder, filename), 'rb') as handle:
+            data = handle.read()
+        if os.path.splitext(filename)[1].lower() in COMPRESSIBLE:
+            return len(gzip.compress(data, compresslevel=9, mtime=0))
+        return len(data)
+
+    with app.test_request_context('/'):
+        html = render_template(template)
+    parser = _ResourceParser()
+    parser.feed(html)
+
+    replaced = {picture['source'] for picture in parser.pictures if picture.get('source')}
+    urls = []
+    for kind, url in parser.resources:
+        urls.append(url)
+        filename = local_file(url)
+        if kind != 'css' or filename is None:
+            continue
+        with open(os.path.join(app.static_folder, filename), encoding='utf-8') as handle:
+            css = handle.read()
+        for match in CSS_URL.finditer(css):
+            ref = match.group(2)
+            if ref.startswith(('data:', 'http:', 'https:', '//', '#')):
+                continue
+            target = ref[len(static_prefix):] if ref.startswith(static_prefix) else \
+                posixpath.normpath(posixpath.join(posixpath.dirname(filename), ref))
+            if reverse.get(target, target) in replaced:
+                continue
+            urls.append(static_prefix + target)
+
+    for picture in parser.pictures:
+        srcsets = picture['srcsets']
+        if not srcsets:
+            src, srcset = picture.get('img', (None, None))
+            urls.append(_pick_candidate(srcset, viewport) if srcset else src)
+            continue
+        sized = [local_file(_pick_candidate(srcset, viewport)) for srcset in srcsets]
+        sized = [name for name in sized if name]
+        if sized:
+            urls.append(static_prefix + max(sized, key=transfer_size))
+
+    report = []
+    for url in dict.fromkeys(u for u in urls if u):
+        filename = local_file(url)
+        if filename and os.path.exists(os.path.join(app.static_folder, filename)):
+            report.append((filename, transfer_size(filename)))
+    return report
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    build_variants(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'static'))
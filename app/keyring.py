@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+Chaveiro de criptografia do Portal Cautivo
+Carrega chaves Fernet pré-derivadas uma única vez por processo e permite
+rotação (chave primária para cifrar + chaves antigas apenas para decifrar)
+"""
+
+import os
+import hmac
+import base64
+import hashlib
+import logging
+from functools import lru_cache
+from typing import List, Optional, Sequence
+
+from cryptography.fernet import Fernet, InvalidToken, MultiFernet
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
+
+logger = logging.getLogger(__name__)
+
+# Parâmetros da derivação legada (dados gravados antes do chaveiro)
+LEGACY_SALT = b'salt_123_portal_cautivo'
+LEGACY_ITERATIONS = 100000
+
+
+@lru_cache(maxsize=4)
+def derive_legacy_key(secret_key: str) -> bytes:
+    """Deriva a chave Fernet legada a partir da SECRET_KEY (PBKDF2, custo alto)"""
+    kdf = PBKDF2HMAC(
+        algorithm=hashes.SHA256(),
+        length=32,
+        salt=LEGACY_SALT,
+        iterations=LEGACY_ITERATIONS,
+    )
+    return base64.urlsafe_b64encode(kdf.derive(secret_key.encode()))
+
+
+def parse_keys(value: str) -> List[bytes]:
+    """Lê chaves Fernet separadas por vírgula ou linha (ignora comentários)"""
+    keys = []
+    for line in value.replace(',', '\n').splitlines():
+        line = line.split('#', 1)[0].strip()
+        if line:
+            keys.append(line.encode())
+    return keys
+
+
+class Keyring:
+    """
+    Conjunto de chaves Fernet ativas.
+
+    A primeira chave é a primária (usada para cifrar); as demais só decifram
+    dados antigos até que a rotação os regrave com a primária.
+    """
+
+    def __init__(self, keys: List[bytes], blind_index_key: bytes, source: str = 'env'):
+        if not keys:
+            raise ValueError('Chaveiro precisa de pelo menos uma chave')
+        self.keys = keys
+        self.fernets = [Fernet(key) for key in keys]
+        self.cipher = MultiFernet(self.fernets)
+        self.primary = self.fernets[0]
+        self.blind_index_key = blind_index_key
+        self.source = source
+        self._key_hint = 0
+
+    def is_primary(self, token: bytes) -> bool:
+        """Verifica (só pela assinatura HMAC) se o token já usa a chave primária"""
+        try:
+            self.primary.extract_timestamp(token)
+            return True
+        except Exception:
+            return False
+
+    def decrypt_value(self, value: Optional[str]) -> Optional[str]:
+        """Como EncryptedString: valores que não decifram voltam como estão"""
+        if not value:
+            return value
+        token = value.encode()
+        # Tenta primeiro a chave do último token: numa rotação em andamento as
+        # linhas antigas não pagam a falha de HMAC na primária a cada valor
+        hint = self._key_hint
+        for index in [hint] + [i for i in range(len(self.fernets)) if i != hint]:
+            try:
+                decrypted = self.fernets[index].decrypt(token)
+            except InvalidToken:
+                continue
+            self._key_hint = index
+            try:
+                return decrypted.decode()
+            except UnicodeDecodeError:
+                return value
+        return value
+
+    def decrypt_many(self, values: Sequence[Optional[str]]) -> List[Optional[str]]:
+        """Decifra uma coluna inteira com as instâncias Fernet já carregadas"""
+        return [self.decrypt_value(value) for value in values]
+
+    @classmethod
+    def load(cls, secret_key: str, keys: Optional[str] = None,
+             keys_file: Optional[str] = None,
+             blind_index_key: Optional[str] = None) -> 'Keyring':
+        """
+        Carrega o chaveiro. Ordem de precedência:
+
+        1. `keys` (ENCRYPTION_KEYS): chaves separadas por vírgula, primária primeiro
+        2. `keys_file` (ENCRYPTION_KEYS_FILE): uma chave por linha
+        3. Derivação legada da SECRET_KEY (PBKDF2, memorizada por processo)
+        """
+        source = 'env'
+        parsed = parse_keys(keys) if keys else []
+        if not parsed and keys_file:
+            with open(keys_file, 'r', encoding='utf-8') as handle:
+                parsed = parse_keys(handle.read())
+            source = 'file'
+        if not parsed:
+            parsed = [derive_legacy_key(secret_key)]
+            source = 'legacy'
+            logger.warning("Chaves de criptografia derivadas da SECRET_KEY (PBKDF2); "
+                           "configure ENCRYPTION_KEYS para evitar o custo por processo")
+
+        if blind_index_key:
+            bidx_key = base64.urlsafe_b64decode(blind_index_key.encode())
+        else:
+            bidx_key = hmac.new(secret_key.encode(), b'wifi-portal-blind-index', hashlib.sha256).digest()
+
+        logger.info(f"Chaveiro carregado ({source}) com {len(parsed)} chave(s)")
+        return cls(parsed, bidx_key, source=source)
+
+
+def export_keys_to_env(environ=os.environ) -> bool:
+    """
+    Deriva a chave legada uma vez e a publica em ENCRYPTION_KEYS.
+
+    Chamado no processo mestre do Gunicorn: workers (inclusive os reciclados
+    por max_requests) herdam o ambiente e não repetem o PBKDF2.
+    """
+    if environ.get('ENCRYPTION_KEYS') or environ.get('ENCRYPTION_KEYS_FILE'):
+        return False
+    secret_key = environ.get('SECRET_KEY')
+    if not secret_key:
+        # Sem SECRET_KEY fixa cada worker geraria chaves diferentes
+        return False
+    environ['ENCRYPTION_KEYS'] = derive_legacy_key(secret_key).decode()
+    return True
@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+Contador de falhas de login do painel admin do Portal Cautivo
+Janela deslizante por IP e por usuário (MAX_LOGIN_ATTEMPTS falhas em
+LOGIN_ATTEMPT_WINDOW segundos). No Redis cada chave é um sorted set com o
+instante de cada falha; sem Redis (ou com ele fora do ar) os contadores
+ficam na memória do processo. O bloqueio é verificado antes de qualquer
+consulta ao banco ou hash de senha, com o mesmo custo exista ou não o usuário.
+"""
+
+import os
+import time
+import secrets
+import hashlib
+import logging
+import threading
+from collections import deque
+from typing import Deque, Dict, List, Optional
+
+try:
+    import redis
+    REDIS_AVAILABLE = True
+except ImportError:
+    REDIS_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = 'login_fail'
+PURGE_INTERVAL = 60.0
+# Intervalo mínimo entre avisos de Redis indisponível
+WARN_INTERVAL = 60.0
+
+
+class LoginAttemptTracker:
+    """Falhas de login em janela deslizante (Redis com fallback em memória)"""
+
+    def __init__(self, app=None):
+        self.app = app
+        self.max_attempts = 5
+        self.window = 3600
+        self.redis = None
+        self._memory: Dict[str, Deque[float]] = {}
+        self._lock = threading.Lock()
+        self._purged_at = 0.0
+        self._warned_at = 0.0
+
+    def init_app(self, app):
+        """Inicializa com a aplicação Flask"""
+        self.app = app
+        self.max_attempts = app.config.get('MAX_LOGIN_ATTEMPTS', 5)
+        self.window = app.config.get('LOGIN_ATTEMPT_WINDOW', 3600)
+        self.clear()
+        self.redis = None
+        if REDIS_AVAILABLE and app.config.get('LOGIN_ATTEMPT_STORAGE', 'redis') == 'redis':
+            try:
+                self.redis = redis.Redis.from_url(
+                    os.getenv('REDIS_URL', 'redis://localhost:6379/0'),
+                    socket_timeout=0.5, socket_connect_timeout=0.5,
+                )
+            except Exception as e:
+                logger.warning(f"Contador de falhas de login sem Redis (memória): {e}")
+
+    @staticmethod
+    def _keys(ip: Optional[str], username: Optional[str]) -> List[str]:
+        # Usuário entra na chave como hash (tamanho fixo, sem texto livre no Redis)
+        user = hashlib.sha256((username or '').strip().lower().encode()).hexdigest()[:32]
+        return [f'{KEY_PREFIX}:ip:{ip or "unknown"}', f'{KEY_PREFIX}:user:{user}']
+
+    def _redis_failed(self, error: Exception):
+        now = time.monotonic()
+        if now - self._warned_at > WARN_INTERVAL:
+            self._warned_at = now
+            logger.warning(f"Redis indisponível para falhas de login, usando memória: {error}")
+
+    # ------------------------------------------------------------------
+    # Memória do processo
+    # ------------------------------------------------------------------
+
+    def _memory_counts(self, keys: List[str], now: float, add: bool = False) -> List[int]:
+        cutoff = now - self.window
+        counts = []
+        with self._lock:
+            for key in keys:
+                attempts = self._memory.get(key)
+                if attempts is None:
+                    if not add:
+                        counts.append(0)
+                        continue
+                    attempts = self._memory[key] = deque()
+                while attempts and attempts[0] <= cutoff:
+                    attempts.popleft()
+                if add:
+                    attempts.append(now)
+                counts.append(len(attempts))
+            if now - self._purged_at > PURGE_INTERVAL:
+                self._purged_at = now
+                for key in [k for k, v in self._memory.items() if not v or v[-1] <= cutoff]:
+                    del self._memory[key]
+        return counts
+
+    # ------------------------------------------------------------------
+    # API
+    # ------------------------------------------------------------------
+
+    def failures(self, ip: Optional[str], username: Optional[str]) -> List[int]:
+        """Falhas na janela: [por IP, por usuário]"""
+        keys = self._keys(ip, username)
+        now = time.time()
+        if self.redis is not None:
+            try:
+                pipe = self.redis.pipeline(transaction=False)
+                for key in keys:
+                    pipe.zremrangebyscore(key, '-inf', now - self.window)
+                    pipe.zcard(key)
+                results = pipe.execute()
+                return [int(results[1]), int(results[3])]
+            except Exception as e:
+                self._redis_failed(e)
+        return self._memory_counts(keys, now)
+
+    def is_locked(self, ip: Optional[str], username: Optional[str]) -> bool:
+        """IP ou usuário com MAX_LOGIN_ATTEMPTS falhas na janela"""
+        return max(self.failures(ip, username)) >= self.max_attempts
+
+    def register_failure(self, ip: Optional[str], username: Optional[str]) -> List[int]:
+        """Registra uma falha; retorna as contagens atualizadas"""
+        keys = self._keys(ip, username)
+        now = time.time()
+        if self.redis is not None:
+            try:
+                member = f'{now:.6f}:{secrets.token_hex(4)}'
+                pipe = self.redis.pipeline(transaction=False)
+                for key in keys:
+                    pipe.zadd(key, {member: now})
+                    pipe.zremrangebyscore(key, '-inf', now - self.window)
+                    pipe.zcard(key)
+                    pipe.expire(key, int(self.window))
+                results = pipe.execute()
+                return [int(results[2]), int(results[6])]
+            except Exception as e:
+                self._redis_failed(e)
+        return self._memory_counts(keys, now, add=True)
+
+    def clear(self):
+        """Esquece as falhas em memória (testes/CLI)"""
+        with self._lock:
+            self._memory.clear()
+
+    def reset(self, username: Optional[str]):
+        """Login bem-sucedido zera o usuário (o IP continua na janela)"""
+        key = self._keys(None, username)[1]
+        if self.redis is not None:
+            try:
+                self.redis.delete(key)
+            except Exception as e:
+                self._redis_failed(e)
+        with self._lock:
+            self._memory.pop(key, None)
+
+
+# Instância global do contador de falhas de login
+login_attempts = LoginAttemptTracker()
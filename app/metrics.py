@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+Métricas Prometheus do Portal Cautivo
+Contadores e histogramas dos caminhos quentes (registro de acesso, estatísticas,
+busca, criptografia, rate limiting e renderização de templates) expostos em
+/metrics. Com PROMETHEUS_MULTIPROC_DIR definido (ver deploy/gunicorn.conf.py)
+os valores ficam em arquivos mmap compartilhados e /metrics agrega todos os
+workers. Sem prometheus_client as métricas viram no-ops.
+"""
+
+import os
+import time
+import logging
+from functools import wraps
+
+from flask import Response, g, request, before_render_template, template_rendered
+
+try:
+    from prometheus_client import (
+        CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Histogram,
+        generate_latest, multiprocess,
+    )
+    PROMETHEUS_AVAILABLE = True
+except ImportError:
+    PROMETHEUS_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+# Faixas para operações do portal: de 1 ms a 10 s
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class _NoopMetric:
+    """Substituto quando prometheus_client não está instalado"""
+
+    def labels(self, *args, **kwargs):
+        return self
+
+    def inc(self, amount=1):
+        pass
+
+    def observe(self, value):
+        pass
+
+    def time(self):
+        return _NoopTimer()
+
+
+class _NoopTimer:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def __call__(self, f):
+        return f
+
+
+def _counter(name, documentation, labelnames=()):
+    if not PROMETHEUS_AVAILABLE:
+        return _NoopMetric()
+    return Counter(name, documentation, labelnames)
+
+
+def _histogram(name, documentation, labelnames=()):
+    if not PROMETHEUS_AVAILABLE:
+        return _NoopMetric()
+    return Histogram(name, documentation, labelnames, buckets=LATENCY_BUCKETS)
+
+
+HTTP_REQUEST_SECONDS = _histogram(
+    'portal_http_request_seconds', 'Duração das requisições HTTP', ['endpoint', 'method', 'status'])
+ACCESS_LOG_WRITES = _counter(
+    'portal_access_log_writes_total', 'Registros de acesso gravados', ['mode', 'result'])
+ACCESS_LOG_WRITE_SECONDS = _histogram(
+    'portal_access_log_write_seconds', 'Tempo de log_access_encrypted', ['mode'])
+STATS_SECONDS = _histogram(
+    'portal_stats_seconds', 'Tempo de get_user_stats', ['source'])
+SEARCH_SECONDS = _histogram(
+    'portal_search_seconds', 'Tempo de search_access_logs', ['field'])
+CRYPTO_OPERATIONS = _counter(
+    'portal_crypto_operations_total', 'Valores cifrados/decifrados com Fernet', ['operation'])
+BULK_DECRYPT_SECONDS = _histogram(
+    'portal_bulk_decrypt_seconds', 'Tempo de decifragem em lote por coluna')
+RATELIMIT_CHECKS = _counter(
+    'portal_ratelimit_checks_total', 'Verificações de rate limit por nível do storage', ['tier'])
+RATELIMIT_BREACHES = _counter(
+    'portal_ratelimit_breaches_total', 'Limites de requisição excedidos', ['endpoint'])
+SECURITY_EVENTS = _counter(
+    'portal_security_events_total', 'Eventos de segurança por destino', ['event_type', 'outcome'])
+TEMPLATE_RENDER_SECONDS = _histogram(
+    'portal_template_render_seconds', 'Tempo de renderização de templates', ['template'])
+
+
+def timed(histogram, **labels):
+    """Decorator que observa a duração da função no histograma"""
+    metric = histogram.labels(**labels) if labels else histogram
+
+    def decorator(f):
+        @wraps(f)
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return f(*args, **kwargs)
+            finally:
+                metric.observe(time.perf_counter() - started)
+        return wrapper
+    return decorator
+
+
+def render_metrics() -> bytes:
+    """Exposição de texto do Prometheus (agrega os workers no modo multiprocesso)"""
+    if os.getenv('PROMETHEUS_MULTIPROC_DIR'):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry)
+
+
+class MetricsManager:
+    """Instrumentação de requisições e templates e rota /metrics"""
+
+    def __init__(self, app=None):
+        self.app = app
+
+    def init_app(self, app):
+        """Inicializa com a aplicação Flask"""
+        self.app = app
+        if not app.config.get('METRICS_ENABLED', True):
+            return
+        if not PROMETHEUS_AVAILABLE:
+            logger.warning("prometheus_client não instalado: /metrics desativado")
+            return
+
+        app.before_request(self._start_timer)
+        app.after_request(self._observe_request)
+        before_render_template.connect(self._template_started, app)
+        template_rendered.connect(self._template_finished, app)
+        app.add_url_rule('/metrics', 'metrics', self.metrics_view)
+
+    @staticmethod
+    def _start_timer():
+        g._metrics_started = time.perf_counter()
+
+    @staticmethod
+    def _observe_request(response):
+        started = g.pop('_metrics_started', None)
+        if started is not None and request.endpoint != 'metrics':
+            HTTP_REQUEST_SECONDS.labels(
+                endpoint=request.endpoint or 'unknown',
+                method=request.method,
+                status=str(response.status_code),
+            ).observe(time.perf_counter() - started)
+        return response
+
+    @staticmethod
+    def _template_started(sender, template, context, **extra):
+        g.setdefault('_metrics_templates', []).append(time.perf_counter())
+
+    @staticmethod
+    def _template_finished(sender, template, context, **extra):
+        stack = g.get('_metrics_templates')
+        if stack:
+            TEMPLATE_RENDER_SECONDS.labels(template=template.name or 'string').observe(
+                time.perf_counter() - stack.pop()
+            )
+
+    @staticmethod
+    def metrics_view():
+        return Response(render_metrics(), content_type=CONTENT_TYPE_LATEST)
+
+
+# Instância global das métricas
+metrics_manager = MetricsManager()
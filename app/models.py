@@ -3,17 +3,31 @@ SQLAlchemy models for WiFi Portal Application.
 Defines User and AccessLog tables with encryption for sensitive data.
 """
 
-from datetime import datetime
+from datetime import datetime, timedelta
 from flask_sqlalchemy import SQLAlchemy
-from sqlalchemy import String, Text, DateTime, Integer, Index, event
+from sqlalchemy import String, Text, DateTime, Integer, Float, Index, LargeBinary, UniqueConstraint, Uuid, event
+from sqlalchemy.dialects import postgresql
 from sqlalchemy.types import TypeDecorator
 import hashlib
+import hmac
+import ipaddress
+import os
+import re
+import threading
+import time
+import unicodedata
+import uuid
+
+from app.metrics import CRYPTO_OPERATIONS
 
 db = SQLAlchemy()
 
 # Global cipher suite reference (will be set from security_manager)
 _cipher_suite = None
 
+# Global blind index key (HMAC key for searchable encrypted fields)
+_blind_index_key = None
+
 def set_encryption_cipher(cipher):
     """Set the global cipher suite for encryption."""
     global _cipher_suite
@@ -22,6 +36,17 @@ def set_encryption_cipher(cipher):
     logging.getLogger(__name__).info(f"Encryption cipher configured: {cipher is not None}")
 
 
+def set_blind_index_key(key):
+    """Set the global HMAC key used for blind indexes."""
+    global _blind_index_key
+    _blind_index_key = key
+
+
+# Pre-bound metric children for the encrypt/decrypt hot path
+_ENCRYPT_OPS = CRYPTO_OPERATIONS.labels(operation='encrypt')
+_DECRYPT_OPS = CRYPTO_OPERATIONS.labels(operation='decrypt')
+
+
 class EncryptedString(TypeDecorator):
     """
     Custom SQLAlchemy type for encrypted string fields.
@@ -46,6 +71,7 @@ class EncryptedString(TypeDecorator):
             return value
         try:
             encrypted = _cipher_suite.encrypt(value.encode())
+            _ENCRYPT_OPS.inc()
             logger.debug(f"Encrypted {len(value)} chars to {len(encrypted.decode())} chars")
             return encrypted.decode()
         except Exception as e:
@@ -60,12 +86,136 @@ class EncryptedString(TypeDecorator):
             return value
         try:
             decrypted = _cipher_suite.decrypt(value.encode())
+            _DECRYPT_OPS.inc()
             return decrypted.decode()
         except Exception:
             # If decryption fails, return as-is
             return value
 
 
+class InetAddress(TypeDecorator):
+    """
+    IPv4/IPv6 address: native INET on PostgreSQL (7 bytes for IPv4, 19 for
+    IPv6), text elsewhere. Values are normalized; invalid input becomes NULL.
+    """
+    impl = String(45)
+    cache_ok = True
+    
+    def load_dialect_impl(self, dialect):
+        if dialect.name == 'postgresql':
+            return dialect.type_descriptor(postgresql.INET())
+        return dialect.type_descriptor(String(45))
+    
+    def process_bind_param(self, value, dialect):
+        if not value:
+            return None
+        try:
+            return str(ipaddress.ip_address(str(value).strip()))
+        except ValueError:
+            return None
+    
+    def process_result_value(self, value, dialect):
+        # psycopg 3 returns ipaddress objects; psycopg2 and SQLite return text
+        return None if value is None else str(value)
+
+
+# aa:bb:cc:dd:ee:ff, aa-bb-cc-dd-ee-ff, aabb.ccdd.eeff or aabbccddeeff
+MAC_PATTERN = re.compile(
+    r'^(?:[0-9A-Fa-f]{2}[:-]){5}[0-9A-Fa-f]{2}$'
+    r'|^(?:[0-9A-Fa-f]{4}\.){2}[0-9A-Fa-f]{4}$'
+    r'|^[0-9A-Fa-f]{12}$'
+)
+
+
+class MacAddress(TypeDecorator):
+    """
+    MAC address: native MACADDR on PostgreSQL (6 bytes), text elsewhere.
+    Accepts ':', '-', '.' or no separators; always read back as AA:BB:CC:DD:EE:FF.
+    """
+    impl = String(17)
+    cache_ok = True
+    
+    def load_dialect_impl(self, dialect):
+        if dialect.name == 'postgresql':
+            return dialect.type_descriptor(postgresql.MACADDR())
+        return dialect.type_descriptor(String(17))
+    
+    @staticmethod
+    def normalize(value):
+        value = str(value or '').strip()
+        if not MAC_PATTERN.match(value):
+            return None
+        digits = re.sub(r'[^0-9A-Fa-f]', '', value)
+        return ':'.join(digits[i:i + 2] for i in range(0, 12, 2)).upper()
+    
+    def process_bind_param(self, value, dialect):
+        return self.normalize(value) if value else None
+    
+    def process_result_value(self, value, dialect):
+        return None if value is None else str(value).upper()
+
+
+class Digest(TypeDecorator):
+    """
+    Hash stored as raw bytes (BYTEA/BLOB: 32 bytes for SHA-256 instead of
+    64 hex characters). Python code keeps working with hex strings.
+    """
+    impl = LargeBinary
+    cache_ok = True
+    
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        return bytes.fromhex(value) if isinstance(value, str) else bytes(value)
+    
+    def process_result_value(self, value, dialect):
+        return None if value is None else bytes(value).hex()
+
+
+UNIX_EPOCH = datetime(1970, 1, 1)
+
+# Last (milliseconds, counter) handed out by uuid7(), per process
+_uuid7_lock = threading.Lock()
+_uuid7_last = (0, 0)
+
+
+def uuid7(moment=None):
+    """
+    Time-ordered 128-bit identifier (UUID version 7, RFC 9562) as text.
+    
+    The first 48 bits are Unix milliseconds, so ids sort by creation time
+    both as text and as native UUID. Without `moment`, the 12 bits after the
+    version hold a counter that keeps ids monotonic within a process even
+    when several are generated in the same millisecond.
+    """
+    global _uuid7_last
+    rand = int.from_bytes(os.urandom(10), 'big')
+    if moment is not None:
+        millis = (moment - UNIX_EPOCH) // timedelta(milliseconds=1)
+        counter = rand >> 68
+    else:
+        with _uuid7_lock:
+            millis = time.time_ns() // 1_000_000
+            last_millis, last_counter = _uuid7_last
+            if millis > last_millis:
+                # Random start in the lower half leaves room for the counter
+                counter = (rand >> 69) & 0x7FF
+            elif last_counter < 0xFFF:
+                millis, counter = last_millis, last_counter + 1
+            else:
+                millis, counter = last_millis + 1, 0
+            _uuid7_last = (millis, counter)
+    value = (millis << 80) | (0x7 << 76) | (counter << 64) | (0b10 << 62) | (rand & ((1 << 62) - 1))
+    hex_value = f'{value:032x}'
+    return f'{hex_value[:8]}-{hex_value[8:12]}-{hex_value[12:16]}-{hex_value[16:20]}-{hex_value[20:]}'
+
+
+def uuid7_time(value):
+    """Creation time (UTC, millisecond precision) embedded in a uuid7() id."""
+    millis = int(str(value).replace('-', '')[:12], 16)
+    return UNIX_EPOCH + timedelta(milliseconds=millis)
+
+
 class User(db.Model):
     """Admin user model for authentication."""
     __tablename__ = 'users'
@@ -102,21 +252,20 @@ class AccessLog(db.Model):
     nome = db.Column(EncryptedString(500), nullable=False)  # Will be encrypted
     email = db.Column(EncryptedString(500), nullable=False)  # Will be encrypted
     
-    # Non-encrypted fields
-    ip = db.Column(String(45), nullable=True, default='0.0.0.0')  # IPv4 or IPv6
-    ip_hash = db.Column(String(64), nullable=True, index=True)  # SHA-256 hash for queries
-    mac = db.Column(String(17), nullable=True)
-    mac_hash = db.Column(String(64), nullable=True, index=True)  # SHA-256 hash for queries
+    # Non-encrypted fields (compact types: INET/MACADDR and binary digests)
+    ip = db.Column(InetAddress(), nullable=True, default='0.0.0.0')  # IPv4 or IPv6
+    ip_hash = db.Column(Digest(), nullable=True, index=True)  # SHA-256 hash for queries
+    mac = db.Column(MacAddress(), nullable=True)
+    mac_hash = db.Column(Digest(), nullable=True, index=True)  # SHA-256 hash for queries
     user_agent = db.Column(Text, nullable=True)
     
-    # Metadata
-    access_id = db.Column(String(64), unique=True, nullable=False, index=True)
-    timestamp = db.Column(DateTime, default=datetime.utcnow, nullable=False, index=True)
+    # Blind index (keyed HMAC of normalized email) for exact-match search
+    email_bidx = db.Column(String(32), nullable=True, index=True)
     
-    # Composite index for efficient pagination
-    __table_args__ = (
-        Index('idx_timestamp_id', 'timestamp', 'id'),
-    )
+    # Metadata: access_id is a UUIDv7 (native UUID on PostgreSQL) that sorts
+    # like the timestamp, so it is also the keyset pagination cursor
+    access_id = db.Column(Uuid(as_uuid=False), unique=True, nullable=False, index=True)
+    timestamp = db.Column(DateTime, default=datetime.utcnow, nullable=False, index=True)
     
     def __repr__(self):
         return f'<AccessLog {self.access_id} at {self.timestamp}>'
@@ -150,9 +299,210 @@ class AccessLog(db.Model):
         return hashlib.sha256(value.encode()).hexdigest()
     
     @staticmethod
-    def generate_access_id():
-        """Generate unique access ID."""
-        import secrets
-        timestamp = datetime.utcnow().strftime('%Y%m%d%H%M%S')
-        random_part = secrets.token_hex(8)
-        return f"{timestamp}_{random_part}"
+    def normalize_text(value):
+        """Normalize text for blind indexing (lowercase, no accents, single spaces)."""
+        if not value:
+            return ''
+        value = unicodedata.normalize('NFKD', value)
+        value = ''.join(c for c in value if not unicodedata.combining(c))
+        return ' '.join(re.sub(r'[^\w@.+-]', ' ', value.lower()).split())
+    
+    @staticmethod
+    def blind_index(value, scope):
+        """
+        Keyed HMAC-SHA256 of a normalized value, truncated to 128 bits.
+        
+        Returns None if the blind index key is not configured.
+        """
+        if not value or _blind_index_key is None:
+            return None
+        message = f"{scope}:{value}".encode()
+        return hmac.new(_blind_index_key, message, hashlib.sha256).hexdigest()[:32]
+    
+    @classmethod
+    def email_index(cls, email):
+        """Blind index for exact email lookups."""
+        return cls.blind_index(cls.normalize_text(email).replace(' ', ''), 'email')
+    
+    @classmethod
+    def name_search_words(cls, nome):
+        """Normalized words of a name usable for prefix search."""
+        words = re.sub(r'[^\w]', ' ', cls.normalize_text(nome)).split()
+        return [w[:SEARCH_PREFIX_MAX] for w in words if len(w) >= SEARCH_PREFIX_MIN]
+    
+    @classmethod
+    def name_tokens(cls, nome):
+        """Blind index tokens for every word prefix (edge n-grams) of a name."""
+        tokens = set()
+        for word in cls.name_search_words(nome):
+            for size in range(SEARCH_PREFIX_MIN, len(word) + 1):
+                token = cls.blind_index(word[:size], 'nome')
+                if token:
+                    tokens.add(token)
+        return tokens
+    
+    @classmethod
+    def search_token_rows(cls, access_id, nome, timestamp):
+        """Rows for access_log_search_tokens covering one access log."""
+        return [
+            {'access_id': access_id, 'token': token, 'timestamp': timestamp}
+            for token in cls.name_tokens(nome)
+        ]
+    
+    @staticmethod
+    def generate_access_id(moment=None):
+        """
+        Generate a unique, time-ordered access ID (UUIDv7).
+        
+        Pass `moment` when the record's timestamp is not "now" (backfills,
+        seeds) so the id sorts with the timestamp.
+        """
+        return uuid7(moment)
+    
+    @staticmethod
+    def access_id_time(access_id):
+        """Timestamp (millisecond precision) embedded in an access ID."""
+        return uuid7_time(access_id)
+
+
+
+# Prefix lengths indexed for name search
+SEARCH_PREFIX_MIN = 2
+SEARCH_PREFIX_MAX = 12
+
+
+class AccessLogSearchToken(db.Model):
+    """Blind index tokens (HMAC of name prefixes) for searching encrypted names."""
+    __tablename__ = 'access_log_search_tokens'
+    
+    id = db.Column(Integer, primary_key=True)
+    access_id = db.Column(Uuid(as_uuid=False), nullable=False)
+    token = db.Column(String(32), nullable=False)
+    timestamp = db.Column(DateTime, nullable=False, index=True)
+    
+    __table_args__ = (
+        Index('idx_search_token_access', 'token', 'access_id'),
+    )
+    
+    def __repr__(self):
+        return f'<AccessLogSearchToken {self.access_id}>'
+
+
+class AccessStatsRollup(db.Model):
+    """
+    Pre-aggregated access statistics per time bucket.
+    
+    granularity is 'hour', 'day' or 'all'. Sketches are compressed HyperLogLog
+    registers over ip_hash/mac_hash for approximate distinct counts. The single
+    'all' row records in covered_until how far the rollup has been computed.
+    """
+    __tablename__ = 'access_stats_rollup'
+    
+    id = db.Column(Integer, primary_key=True)
+    granularity = db.Column(String(8), nullable=False)
+    bucket_start = db.Column(DateTime, nullable=False)
+    access_count = db.Column(Integer, nullable=False, default=0)
+    ip_sketch = db.Column(LargeBinary, nullable=True)
+    mac_sketch = db.Column(LargeBinary, nullable=True)
+    covered_until = db.Column(DateTime, nullable=True)
+    updated_at = db.Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+    
+    __table_args__ = (
+        UniqueConstraint('granularity', 'bucket_start', name='uq_rollup_bucket'),
+    )
+    
+    def __repr__(self):
+        return f'<AccessStatsRollup {self.granularity} {self.bucket_start}: {self.access_count}>'
+
+
+class EmailOutbox(db.Model):
+    """
+    Persisted queue of outgoing emails, delivered by a background sender.
+    
+    status is 'pending', 'sent' or 'failed'. next_attempt_at doubles as a
+    lease: a sender claims a message by pushing it forward, so a message
+    claimed by a worker that died is retried once the lease expires.
+    """
+    __tablename__ = 'email_outbox'
+    
+    id = db.Column(Integer, primary_key=True)
+    recipient = db.Column(EncryptedString(500), nullable=False)
+    subject = db.Column(String(255), nullable=False)
+    body = db.Column(EncryptedString(), nullable=False)
+    status = db.Column(String(16), nullable=False, default='pending')
+    attempts = db.Column(Integer, nullable=False, default=0)
+    next_attempt_at = db.Column(DateTime, nullable=False, default=datetime.utcnow)
+    last_error = db.Column(String(500), nullable=True)
+    created_at = db.Column(DateTime, nullable=False, default=datetime.utcnow)
+    sent_at = db.Column(DateTime, nullable=True)
+    
+    __table_args__ = (
+        Index('idx_outbox_status_next', 'status', 'next_attempt_at'),
+    )
+    
+    def __repr__(self):
+        return f'<EmailOutbox {self.id} {self.status}>'
+
+
+class AccessReconnect(db.Model):
+    """
+    Lightweight record of a returning device re-authorized with one click.
+    
+    Points to the AccessLog (access_id) where the visitor filled in the form;
+    no personal data is stored again, so no encryption or blind indexes.
+    """
+    __tablename__ = 'access_reconnects'
+    
+    id = db.Column(Integer, primary_key=True)
+    access_id = db.Column(Uuid(as_uuid=False), nullable=False, index=True)
+    ip = db.Column(InetAddress(), nullable=True)
+    ip_hash = db.Column(Digest(), nullable=True)
+    mac_hash = db.Column(Digest(), nullable=False, index=True)
+    timestamp = db.Column(DateTime, default=datetime.utcnow, nullable=False, index=True)
+    
+    def __repr__(self):
+        return f'<AccessReconnect {self.access_id} at {self.timestamp}>'
+
+
+class SecurityEvent(db.Model):
+    """
+    Structured security event written in batches by the event pipeline
+    (SECURITY_EVENT_SINK=db).
+    
+    sample_rate is the probability the event had of being kept, so counts of
+    sampled event types are estimated as sum(1 / sample_rate).
+    """
+    __tablename__ = 'security_events'
+    
+    id = db.Column(Integer, primary_key=True)
+    timestamp = db.Column(DateTime, nullable=False, default=datetime.utcnow)
+    event_type = db.Column(String(64), nullable=False)
+    ip = db.Column(String(45), nullable=True)
+    endpoint = db.Column(String(100), nullable=True)
+    user_agent = db.Column(String(255), nullable=True)
+    details = db.Column(Text, nullable=True)
+    sample_rate = db.Column(Float, nullable=False, default=1.0)
+    
+    __table_args__ = (
+        Index('idx_security_events_type_timestamp', 'event_type', 'timestamp'),
+    )
+    
+    def __repr__(self):
+        return f'<SecurityEvent {self.event_type} {self.timestamp}>'
+
+
+@event.listens_for(AccessLog, 'before_insert')
+def _set_email_blind_index(mapper, connection, target):
+    """Keep the email blind index in sync on ORM inserts."""
+    if target.email_bidx is None:
+        target.email_bidx = AccessLog.email_index(target.email)
+
+
+@event.listens_for(AccessLog, 'after_insert')
+def _insert_name_search_tokens(mapper, connection, target):
+    """Write name prefix tokens for ORM inserts."""
+    rows = AccessLog.search_token_rows(
+        target.access_id, target.nome, target.timestamp or datetime.utcnow()
+    )
+    if rows:
+        connection.execute(AccessLogSearchToken.__table__.insert(), rows)
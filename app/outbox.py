@@ -0,0 +1,291 @@
+#!/usr/bin/env python3
+"""
+Caixa de saída de emails do Portal Cautivo
+Mensagens são gravadas na tabela email_outbox dentro da requisição e enviadas
+por uma thread de fundo que reaproveita a conexão SMTP autenticada, com novas
+tentativas em backoff exponencial. O corpo (links de redefinição de senha) é
+apagado ao entregar ou descartar a mensagem, e as linhas enviadas/descartadas
+são removidas após MAIL_OUTBOX_RETENTION_HOURS.
+"""
+
+import os
+import time
+import smtplib
+import logging
+import threading
+from collections import deque
+from datetime import datetime, timedelta
+from email.message import EmailMessage
+from email.utils import formataddr
+from typing import Any, Deque, Dict, Optional
+
+from sqlalchemy import delete, func, update
+
+logger = logging.getLogger(__name__)
+
+# Mensagens guardadas pelo DebugSMTP (as mais antigas saem)
+DEBUG_SENT_LIMIT = 100
+# Intervalo mínimo entre limpezas da caixa de saída (segundos)
+PURGE_INTERVAL = 3600.0
+
+
+def smtp_settings() -> Dict[str, Any]:
+    """Configuração SMTP a partir do ambiente (aceita os nomes SMTP_* e MAIL_*)"""
+    username = os.getenv('SMTP_USERNAME') or os.getenv('SMTP_USER') or os.getenv('MAIL_USERNAME')
+    return {
+        'server': os.getenv('SMTP_SERVER') or os.getenv('MAIL_SERVER') or 'smtp.gmail.com',
+        'port': int(os.getenv('SMTP_PORT') or os.getenv('MAIL_PORT') or '587'),
+        'username': username,
+        'password': os.getenv('SMTP_PASSWORD') or os.getenv('MAIL_PASSWORD'),
+        'use_tls': (os.getenv('SMTP_USE_TLS') or os.getenv('MAIL_USE_TLS') or 'True').lower() == 'true',
+        'from_email': (
+            os.getenv('FROM_EMAIL')
+            or os.getenv('SMTP_FROM')
+            or os.getenv('MAIL_DEFAULT_SENDER')
+            or username
+        ),
+        'from_name': os.getenv('FROM_NAME', 'Wi-Fi Portal Admin'),
+    }
+
+
+class DebugSMTP:
+    """
+    Substituto local do smtplib.SMTP (MAIL_BACKEND=debug).
+
+    Não abre conexão: guarda as últimas mensagens em `DebugSMTP.sent` e as
+    registra no log.
+    """
+
+    sent: Deque[EmailMessage] = deque(maxlen=DEBUG_SENT_LIMIT)
+
+    def __init__(self, host: str = '', port: int = 0, timeout: float = None):
+        self.host = host
+        self.port = port
+
+    def ehlo(self):
+        return 250, b'debug'
+
+    def starttls(self):
+        return 220, b'debug'
+
+    def login(self, username, password):
+        return 235, b'debug'
+
+    def noop(self):
+        return 250, b'debug'
+
+    def send_message(self, message: EmailMessage):
+        DebugSMTP.sent.append(message)
+        logger.info(f"[debug smtp] {message['To']}: {message['Subject']}")
+        return {}
+
+    def quit(self):
+        return 221, b'debug'
+
+
+class EmailOutbox:
+    """Fila persistente de emails com envio em segundo plano"""
+
+    def __init__(self, app=None):
+        self.app = app
+        self.db = None
+        self.Outbox = None
+        self.max_attempts = 5
+        self.retry_base = 30
+        self.lease = 300
+        self.retention = timedelta(hours=24)
+        self._purged_at = 0.0
+        self._connection = None
+        self._thread: Optional[threading.Thread] = None
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self._send_lock = threading.Lock()
+
+    def init_app(self, app):
+        """Inicializa com a aplicação Flask"""
+        self.app = app
+        from app.models import db, EmailOutbox as Outbox
+        self.db = db
+        self.Outbox = Outbox
+        self.max_attempts = app.config.get('MAIL_OUTBOX_MAX_ATTEMPTS', 5)
+        self.retry_base = app.config.get('MAIL_OUTBOX_RETRY_BASE', 30)
+        self.retention = timedelta(hours=app.config.get('MAIL_OUTBOX_RETENTION_HOURS', 24))
+
+        if app.config.get('MAIL_OUTBOX_WORKER'):
+            self.start(app.config.get('MAIL_OUTBOX_POLL_INTERVAL', 10))
+
+    # ------------------------------------------------------------------
+    # Enfileiramento
+    # ------------------------------------------------------------------
+
+    def is_configured(self) -> bool:
+        """Backend debug dispensa credenciais; SMTP real precisa de usuário e senha"""
+        if self.app.config.get('MAIL_BACKEND') == 'debug':
+            return True
+        settings = smtp_settings()
+        return bool(settings['username'] and settings['password'])
+
+    def enqueue(self, recipient: str, subject: str, body: str) -> bool:
+        """Grava a mensagem na caixa de saída e acorda o sender"""
+        try:
+            self.db.session.add(self.Outbox(recipient=recipient, subject=subject, body=body))
+            self.db.session.commit()
+        except Exception as e:
+            logger.error(f"Erro ao enfileirar email: {e}")
+            self.db.session.rollback()
+            return False
+        self._wakeup.set()
+        return True
+
+    # ------------------------------------------------------------------
+    # Envio
+    # ------------------------------------------------------------------
+
+    def _smtp_class(self):
+        return DebugSMTP if self.app.config.get('MAIL_BACKEND') == 'debug' else smtplib.SMTP
+
+    def _get_connection(self, settings: Dict[str, Any]):
+        """Reaproveita a conexão autenticada enquanto o servidor responder ao NOOP"""
+        if self._connection is not None:
+            try:
+                if self._connection.noop()[0] == 250:
+                    return self._connection
+            except (smtplib.SMTPException, OSError):
+                pass
+            self._close_connection()
+
+        connection = self._smtp_class()(settings['server'], settings['port'], timeout=30)
+        connection.ehlo()
+        if settings['use_tls']:
+            connection.starttls()
+            connection.ehlo()
+        if settings['username'] and settings['password']:
+            connection.login(settings['username'], settings['password'])
+        self._connection = connection
+        return connection
+
+    def _close_connection(self):
+        if self._connection is not None:
+            try:
+                self._connection.quit()
+            except Exception:
+                pass
+            self._connection = None
+
+    def _build_message(self, item, settings: Dict[str, Any]) -> EmailMessage:
+        message = EmailMessage()
+        message['From'] = formataddr((settings['from_name'], settings['from_email'] or 'wifi-portal@localhost'))
+        message['To'] = item.recipient
+        message['Subject'] = item.subject
+        message.set_content(item.body)
+        return message
+
+    def _claim(self, item, now: datetime) -> bool:
+        """Reserva a mensagem para este processo (UPDATE condicional)"""
+        table = self.Outbox.__table__
+        result = self.db.session.execute(
+            update(table)
+            .where(table.c.id == item.id,
+                   table.c.status == 'pending',
+                   table.c.next_attempt_at == item.next_attempt_at)
+            .values(next_attempt_at=now + timedelta(seconds=self.lease),
+                    attempts=table.c.attempts + 1)
+        )
+        self.db.session.commit()
+        return result.rowcount == 1
+
+    def retry_delay(self, attempts: int) -> timedelta:
+        """Backoff exponencial: base, 2x base, 4x base... (máximo 1 hora)"""
+        return timedelta(seconds=min(self.retry_base * 2 ** max(attempts - 1, 0), 3600))
+
+    def purge(self, now: Optional[datetime] = None) -> int:
+        """Remove mensagens enviadas/descartadas há mais de `retention`"""
+        cutoff = (now or datetime.utcnow()) - self.retention
+        table = self.Outbox.__table__
+        result = self.db.session.execute(
+            delete(table).where(
+                table.c.status.in_(('sent', 'failed')),
+                func.coalesce(table.c.sent_at, table.c.created_at) < cutoff,
+            )
+        )
+        self.db.session.commit()
+        if result.rowcount:
+            logger.info(f"Caixa de saída: {result.rowcount} mensagens antigas removidas")
+        return result.rowcount
+
+    def process(self, limit: int = 20, now: Optional[datetime] = None) -> Dict[str, int]:
+        """Envia as mensagens vencidas; retorna contagem de enviadas/adiadas/falhas"""
+        totals = {'sent': 0, 'retried': 0, 'failed': 0}
+        now = now or datetime.utcnow()
+        if time.monotonic() - self._purged_at > PURGE_INTERVAL:
+            self._purged_at = time.monotonic()
+            self.purge(now)
+        due = (self.Outbox.query
+               .filter(self.Outbox.status == 'pending', self.Outbox.next_attempt_at <= now)
+               .order_by(self.Outbox.next_attempt_at)
+               .limit(limit)
+               .all())
+        if not due:
+            return totals
+
+        settings = smtp_settings()
+        with self._send_lock:
+            for item in due:
+                if not self._claim(item, now):
+                    continue
+                self.db.session.refresh(item)
+                try:
+                    connection = self._get_connection(settings)
+                    connection.send_message(self._build_message(item, settings))
+                    item.status = 'sent'
+                    item.sent_at = datetime.utcnow()
+                    item.last_error = None
+                    # Link de redefinição não fica no banco depois da entrega
+                    item.body = ''
+                    totals['sent'] += 1
+                    logger.info(f"Email {item.id} enviado")
+                except Exception as e:
+                    self._close_connection()
+                    item.last_error = str(e)[:500]
+                    if item.attempts >= self.max_attempts:
+                        item.status = 'failed'
+                        item.body = ''
+                        totals['failed'] += 1
+                        logger.error(f"Email {item.id} descartado após {item.attempts} tentativas: {e}")
+                    else:
+                        item.next_attempt_at = now + self.retry_delay(item.attempts)
+                        totals['retried'] += 1
+                        logger.warning(f"Falha ao enviar email {item.id} (tentativa {item.attempts}): {e}")
+                self.db.session.commit()
+        return totals
+
+    def start(self, poll_interval: float = 10):
+        """Sender em segundo plano: acorda a cada enfileiramento ou `poll_interval` segundos"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stopping.clear()
+
+        def run():
+            while not self._stopping.is_set():
+                self._wakeup.wait(poll_interval)
+                self._wakeup.clear()
+                with self.app.app_context():
+                    try:
+                        self.process()
+                    except Exception as e:
+                        logger.error(f"Erro no envio da caixa de saída: {e}")
+                        self.db.session.rollback()
+                    finally:
+                        self.db.session.remove()
+            self._close_connection()
+
+        self._thread = threading.Thread(target=run, name='email-outbox', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stopping.set()
+        self._wakeup.set()
+
+
+# Instância global da caixa de saída
+email_outbox = EmailOutbox()
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Cache de renderização das páginas públicas do Portal Cautivo
+Páginas estáticas (termos, política) são renderizadas uma vez por processo e
+servidas com ETag/Last-Modified (304 em revalidações). O login é renderizado
+uma vez com marcadores no lugar de ip/mac/link-orig/csrf e, nas requisições
+seguintes, só os valores (escapados) são inseridos.
+"""
+
+import os
+import re
+import hashlib
+import logging
+import threading
+from datetime import datetime, timezone
+from typing import Any, Dict, Hashable, List, Tuple
+
+from flask import Response, render_template, request, session
+from markupsafe import escape
+
+logger = logging.getLogger(__name__)
+
+
+def _marker(name: str) -> str:
+    # NUL não aparece em HTML nem é alterado pelo autoescape do Jinja
+    return f'\x00{name}\x00'
+
+
+class PageCache:
+    """Respostas e fragmentos de template pré-renderizados por processo"""
+
+    def __init__(self, app=None):
+        self.app = app
+        self.enabled = True
+        self.max_age = 3600
+        self._pages: Dict[Tuple, Tuple[bytes, str, datetime]] = {}
+        self._shells: Dict[Tuple, List[str]] = {}
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        """Inicializa com a aplicação Flask"""
+        self.app = app
+        # Com recarga de templates (desenvolvimento) o cache esconderia as edições
+        self.enabled = (app.config.get('PAGE_CACHE_ENABLED', True)
+                        and not app.debug and not app.config.get('TEMPLATES_AUTO_RELOAD'))
+        self.max_age = app.config.get('PAGE_CACHE_MAX_AGE', 3600)
+
+    def clear(self):
+        with self._lock:
+            self._pages.clear()
+            self._shells.clear()
+
+    def _template_mtime(self, template: str) -> datetime:
+        path = os.path.join(self.app.root_path, self.app.template_folder, template)
+        try:
+            return datetime.fromtimestamp(int(os.path.getmtime(path)), tz=timezone.utc)
+        except OSError:
+            return datetime.now(timezone.utc).replace(microsecond=0)
+
+    # ------------------------------------------------------------------
+    # Páginas estáticas
+    # ------------------------------------------------------------------
+
+    def static_page(self, template: str, **context) -> Response:
+        """Página sem dados da requisição: um render por processo, ETag e 304"""
+        if not self.enabled:
+            return Response(render_template(template, **context), mimetype='text/html')
+
+        key = (template, request.script_root)
+        page = self._pages.get(key)
+        if page is None:
+            body = render_template(template, **context).encode('utf-8')
+            page = (body, hashlib.sha256(body).hexdigest()[:32], self._template_mtime(template))
+            with self._lock:
+                self._pages[key] = page
+
+        body, etag, last_modified = page
+        response = Response(body, mimetype='text/html')
+        response.set_etag(etag)
+        response.last_modified = last_modified
+        response.cache_control.public = True
+        response.cache_control.max_age = self.max_age
+        return response.make_conditional(request)
+
+    # ------------------------------------------------------------------
+    # Fragmentos (login)
+    # ------------------------------------------------------------------
+
+    def _build_shell(self, template: str, names: List[str], context: Dict[str, Any]) -> List[str]:
+        """Renderiza com marcadores e divide em [texto, nome, texto, nome, ..., texto]"""
+        html = render_template(template, **context, **{name: _marker(name) for name in names})
+        pattern = re.compile('\x00(' + '|'.join(re.escape(name) for name in names) + ')\x00')
+        return pattern.split(html)
+
+    def render_fragments(self, template: str, variant: Hashable,
+                         values: Dict[str, Any], **context) -> str:
+        """
+        Render de `template` em que só `values` mudam entre requisições.
+
+        `variant` identifica as combinações de `context` (ex.: visitante
+        recorrente ou não); cada uma tem seu próprio esqueleto em cache.
+        """
+        # Mensagens flash pendentes mudam o HTML: render completo
+        if not self.enabled or session.get('_flashes'):
+            return render_template(template, **context, **values)
+
+        key = (template, variant, request.script_root, tuple(sorted(values)))
+        parts = self._shells.get(key)
+        if parts is None:
+            parts = self._build_shell(template, sorted(values), context)
+            with self._lock:
+                self._shells[key] = parts
+
+        rendered = parts[:]
+        for i in range(1, len(rendered), 2):
+            value = values[rendered[i]]
+            rendered[i] = str(escape('' if value is None else value))
+        return ''.join(rendered)
+
+
+# Instância global do cache de páginas
+page_cache = PageCache()
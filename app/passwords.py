@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+Hash de senhas do painel admin do Portal Cautivo
+O custo do scrypt é calibrado na inicialização para caber em
+PASSWORD_HASH_TARGET_MS (nunca abaixo do padrão do werkzeug) e o cálculo
+roda num pool de threads nativas limitado (PASSWORD_HASH_WORKERS): uma
+rajada de POSTs em /admin/login espera na fila (ou recebe 503 acima de
+PASSWORD_HASH_MAX_PENDING) em vez de ocupar todos os workers. Hashes mais
+fracos que o atual são refeitos no próximo login bem-sucedido. O formato
+continua o do werkzeug (check_password_hash lê qualquer hash gravado).
+
+No Gunicorn a calibração roda uma vez no processo mestre (on_starting) e é
+publicada em PASSWORD_HASH_METHOD: os workers herdam o mesmo custo em vez de
+calibrar cada um (e ao mesmo tempo, disputando a CPU).
+"""
+
+import os
+import time
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from typing import Callable, Optional, Tuple
+
+from werkzeug.security import check_password_hash, generate_password_hash
+
+from app import green
+
+logger = logging.getLogger(__name__)
+
+# Padrão do werkzeug 3: piso da calibração
+SCRYPT_MIN_N = 2 ** 15
+SCRYPT_R = 8
+SCRYPT_P = 1
+
+
+class PasswordHashBusy(RuntimeError):
+    """Fila do hash de senhas cheia (ou espera acima do timeout)"""
+
+
+def scrypt_method(n: int) -> str:
+    return f'scrypt:{n}:{SCRYPT_R}:{SCRYPT_P}'
+
+
+def scrypt_cost(method: str) -> Optional[int]:
+    """n * r * p de um método scrypt do werkzeug; None para outros algoritmos"""
+    parts = method.split(':')
+    if parts[0] != 'scrypt':
+        return None
+    try:
+        n, r, p = (int(value) for value in parts[1:4])
+    except ValueError:
+        return None
+    return n * r * p
+
+
+class PasswordHasher:
+    """Hash/verificação de senhas calibrados e fora da thread da requisição"""
+
+    def __init__(self, app=None):
+        self.app = app
+        self.method = scrypt_method(SCRYPT_MIN_N)
+        self.target_ms = 250
+        self.max_memory_mb = 64
+        self.workers = 2
+        self.max_pending = 16
+        self.queue_timeout = 10.0
+        self._executor = None
+        self._executor_pid = None
+        self._slots = None
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        """Inicializa com a aplicação Flask (calibra o custo se habilitado)"""
+        self.app = app
+        self.target_ms = app.config.get('PASSWORD_HASH_TARGET_MS', 250)
+        self.max_memory_mb = app.config.get('PASSWORD_HASH_MAX_MEMORY_MB', 64)
+        self.workers = max(1, app.config.get('PASSWORD_HASH_WORKERS', 2))
+        self.max_pending = app.config.get('PASSWORD_HASH_MAX_PENDING', 16)
+        self.queue_timeout = app.config.get('PASSWORD_HASH_QUEUE_TIMEOUT', 10.0)
+        self._slots = threading.BoundedSemaphore(self.max_pending) if self.max_pending > 0 else None
+        method = app.config.get('PASSWORD_HASH_METHOD')
+        if method and (scrypt_cost(method) or 0) >= scrypt_cost(scrypt_method(SCRYPT_MIN_N)):
+            # Calibrado pelo processo mestre do Gunicorn
+            self.method = method
+        elif app.config.get('PASSWORD_HASH_CALIBRATE', True):
+            self.calibrate()
+
+    def calibrate(self, target_ms: Optional[float] = None,
+                  timer: Callable[[], float] = time.perf_counter) -> str:
+        """
+        Maior n (potência de 2) cujo hash cabe em `target_ms`, entre o piso do
+        werkzeug e o limite de memória (128 * n * r bytes por hash).
+        """
+        target = (self.target_ms if target_ms is None else target_ms) / 1000
+        max_n = max(SCRYPT_MIN_N, self.max_memory_mb * 1024 * 1024 // (128 * SCRYPT_R))
+        chosen, elapsed, n = SCRYPT_MIN_N, None, SCRYPT_MIN_N
+        while n <= max_n:
+            started = timer()
+            generate_password_hash('calibration', scrypt_method(n))
+            took = timer() - started
+            if took > target and n > SCRYPT_MIN_N:
+                break
+            chosen, elapsed = n, took
+            if took > target:
+                break
+            n *= 2
+        self.method = scrypt_method(chosen)
+        logger.info(f"Hash de senhas calibrado: {self.method} "
+                    f"({(elapsed or 0) * 1000:.0f} ms, alvo {target * 1000:.0f} ms)")
+        return self.method
+
+    def _get_executor(self):
+        # Criado no processo que usa (depois do fork do gunicorn); com gevent as
+        # threads precisam ser nativas, senão o hash bloquearia o hub
+        if self._executor is None or self._executor_pid != os.getpid():
+            with self._lock:
+                if self._executor is None or self._executor_pid != os.getpid():
+                    if green._patched:
+                        from gevent.threadpool import ThreadPoolExecutor as NativeExecutor
+                        self._executor = NativeExecutor(max_workers=self.workers)
+                    else:
+                        self._executor = ThreadPoolExecutor(max_workers=self.workers,
+                                                            thread_name_prefix='password-hash')
+                    self._executor_pid = os.getpid()
+        return self._executor
+
+    def _run(self, fn, *args):
+        """Executa no pool; PasswordHashBusy se a fila estiver cheia"""
+        if self._slots is not None and not self._slots.acquire(timeout=self.queue_timeout):
+            raise PasswordHashBusy('Fila do hash de senhas cheia')
+        try:
+            return self._get_executor().submit(fn, *args).result(timeout=self.queue_timeout)
+        except FutureTimeout:
+            raise PasswordHashBusy('Hash de senha demorou além do timeout')
+        finally:
+            if self._slots is not None:
+                self._slots.release()
+
+    def hash(self, password: str) -> str:
+        """Hash no formato do werkzeug com o custo calibrado"""
+        return self._run(generate_password_hash, password, self.method)
+
+    def verify(self, stored_hash: str, password: str) -> bool:
+        return bool(stored_hash) and self._run(check_password_hash, stored_hash, password)
+
+    def needs_rehash(self, stored_hash: str) -> bool:
+        """Só hashes mais fracos que o atual (calibrações variam entre processos)"""
+        cost = scrypt_cost(stored_hash.split('$', 1)[0])
+        return cost is None or cost < scrypt_cost(self.method)
+
+    def verify_and_update(self, stored_hash: str, password: str) -> Tuple[bool, Optional[str]]:
+        """(senha correta, novo hash se o gravado precisa ser refeito)"""
+        if not self.verify(stored_hash, password):
+            return False, None
+        if self.needs_rehash(stored_hash):
+            return True, self.hash(password)
+        return True, None
+
+
+def export_method_to_env(environ=os.environ) -> bool:
+    """
+    Calibra o custo uma vez e o publica em PASSWORD_HASH_METHOD.
+
+    Chamado no processo mestre do Gunicorn: workers (inclusive os reciclados
+    por max_requests) herdam o ambiente e não repetem a calibração.
+    """
+    if environ.get('PASSWORD_HASH_METHOD'):
+        return False
+    if environ.get('PASSWORD_HASH_CALIBRATE', 'True').lower() != 'true':
+        return False
+    hasher = PasswordHasher()
+    hasher.max_memory_mb = int(environ.get('PASSWORD_HASH_MAX_MEMORY_MB', '64'))
+    environ['PASSWORD_HASH_METHOD'] = hasher.calibrate(
+        target_ms=int(environ.get('PASSWORD_HASH_TARGET_MS', '250'))
+    )
+    return True
+
+
+# Instância global do hash de senhas
+password_hasher = PasswordHasher()
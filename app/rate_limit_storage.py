@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+"""
+Storage de rate limiting em dois níveis para o Flask-Limiter
+Contadores locais (por processo) absorvem os hits comuns; na requisição o
+Redis só é consultado quando o contador se aproxima do limite ou acumula
+incrementos demais. Os demais incrementos pendentes são enviados em lote por
+uma thread de fundo a cada `sync_interval`. URI: tiered+redis://host:6379/0
+"""
+
+import os
+import time
+import logging
+import threading
+from typing import Dict, List, Optional, Tuple
+
+from limits.storage import Storage, RedisStorage, storage_from_string
+
+from app.metrics import RATELIMIT_CHECKS
+
+logger = logging.getLogger(__name__)
+
+SCHEME_PREFIX = 'tiered+'
+PURGE_INTERVAL = 60.0
+
+
+def limit_from_key(key: str) -> Optional[int]:
+    """
+    Extrai o limite da chave gerada pelo limits
+    (LIMITER/<identificadores>/<quantidade>/<múltiplo>/<granularidade>)
+    """
+    parts = key.rsplit('/', 3)
+    if len(parts) == 4 and parts[1].isdigit():
+        return int(parts[1])
+    return None
+
+
+class _Counter:
+    __slots__ = ('remote', 'pending', 'synced_at', 'expires_at', 'expiry')
+
+    def __init__(self, expires_at: float, expiry: int = 0):
+        self.remote = 0
+        self.pending = 0
+        self.synced_at = 0.0
+        self.expires_at = expires_at
+        self.expiry = expiry
+
+
+class TieredStorage(Storage):
+    """
+    Janela fixa com pré-contagem local e sincronização em lote com o storage remoto.
+
+    Cada processo pode admitir no máximo `sync_batch` hits ainda não
+    sincronizados por chave; a partir de `sync_ratio` do limite todo hit é
+    sincronizado, então o limite efetivo só é excedido nessa margem. Chaves
+    bem abaixo do limite (o caso comum: um IP por aparelho) nunca sincronizam
+    na requisição; a thread de fundo envia seus pendentes a cada `sync_interval`.
+    """
+
+    STORAGE_SCHEME = [
+        'tiered+redis', 'tiered+rediss', 'tiered+redis+unix',
+        'tiered+redis+sentinel', 'tiered+redis+cluster',
+        'tiered+memcached', 'tiered+memory',
+    ]
+
+    def __init__(self, uri: Optional[str] = None, wrap_exceptions: bool = False,
+                 sync_interval: float = 1.0, sync_batch: int = 10, sync_ratio: float = 0.8,
+                 **options):
+        remote_uri = uri[len(SCHEME_PREFIX):] if uri and uri.startswith(SCHEME_PREFIX) else uri
+        self.remote = storage_from_string(remote_uri, wrap_exceptions=wrap_exceptions, **options)
+        self.sync_interval = float(sync_interval)
+        self.sync_batch = max(1, int(sync_batch))
+        self.sync_ratio = float(sync_ratio)
+        self._counters: Dict[str, _Counter] = {}
+        self._lock = threading.Lock()
+        self._last_purge = time.time()
+        self._flusher_pid = None
+        super().__init__(uri, wrap_exceptions=wrap_exceptions)
+
+    @property
+    def base_exceptions(self):
+        return self.remote.base_exceptions
+
+    def _local_budget(self, limit: Optional[int]) -> int:
+        """Hits que podem ficar pendentes sem consultar o remoto"""
+        if limit is None:
+            return 1
+        # round(): 20 * (1 - 0.8) dá 3.999... em ponto flutuante
+        return max(1, min(self.sync_batch, int(round(limit * (1 - self.sync_ratio), 6))))
+
+    def incr(self, key: str, expiry: int, amount: int = 1) -> int:
+        now = time.time()
+        with self._lock:
+            counter = self._counters.get(key)
+            if counter is None or counter.expires_at <= now or not counter.expiry:
+                counter = self._counters[key] = _Counter(now + expiry, expiry)
+            counter.pending += amount
+            estimate = counter.remote + counter.pending
+            RATELIMIT_CHECKS.labels(tier='local').inc()
+
+            limit = limit_from_key(key)
+            if (counter.pending >= self._local_budget(limit)
+                    or (limit is not None and estimate >= limit * self.sync_ratio)):
+                self._sync(now)
+                estimate = counter.remote + counter.pending
+        self._ensure_flusher()
+        return estimate
+
+    def _ensure_flusher(self) -> None:
+        """Inicia a sincronização periódica no processo atual (depois do fork do gunicorn)"""
+        if self._flusher_pid == os.getpid():
+            return
+        with self._lock:
+            if self._flusher_pid == os.getpid():
+                return
+            self._flusher_pid = os.getpid()
+        threading.Thread(target=self._flush_loop, name='ratelimit-sync', daemon=True).start()
+
+    def _flush_loop(self) -> None:
+        pid = os.getpid()
+        while self._flusher_pid == pid:
+            time.sleep(self.sync_interval)
+            try:
+                with self._lock:
+                    self._sync(time.time())
+            except Exception as e:
+                # Pendentes continuam no contador local e vão na próxima rodada
+                logger.warning(f"Falha ao sincronizar contadores de rate limit: {e}")
+
+    def _sync(self, now: float) -> None:
+        """Envia todos os incrementos pendentes de uma vez (chamado com o lock)"""
+        dirty = [
+            (key, counter) for key, counter in self._counters.items()
+            if counter.pending and counter.expires_at > now
+        ]
+        if dirty:
+            RATELIMIT_CHECKS.labels(tier='remote').inc(len(dirty))
+        for (key, counter), (total, expires_at) in zip(dirty, self._flush(dirty)):
+            counter.remote = total
+            counter.pending = 0
+            counter.synced_at = now
+            counter.expires_at = expires_at
+
+        if now - self._last_purge >= PURGE_INTERVAL:
+            self._counters = {k: c for k, c in self._counters.items() if c.expires_at > now}
+            self._last_purge = now
+
+    def _flush(self, dirty: List[Tuple[str, _Counter]]) -> List[Tuple[int, float]]:
+        """Incrementa as chaves no remoto; devolve (total, expiração) de cada uma"""
+        if isinstance(self.remote, RedisStorage):
+            # Uma ida ao Redis para todas as chaves: script INCRBY+EXPIRE e PTTL
+            pipe = self.remote.get_connection().pipeline(transaction=False)
+            for key, counter in dirty:
+                redis_key = self.remote.prefixed_key(key)
+                self.remote.lua_incr_expire([redis_key], [counter.expiry, counter.pending], client=pipe)
+                pipe.pttl(redis_key)
+            replies = pipe.execute()
+            now = time.time()
+            return [
+                (int(replies[i]), now + max(replies[i + 1], 0) / 1000)
+                for i in range(0, len(replies), 2)
+            ]
+        return [
+            (self.remote.incr(key, counter.expiry, counter.pending), self.remote.get_expiry(key))
+            for key, counter in dirty
+        ]
+
+    def get(self, key: str) -> int:
+        now = time.time()
+        with self._lock:
+            counter = self._counters.get(key)
+            if counter is not None and counter.expires_at > now and (
+                    counter.expiry or now - counter.synced_at < self.sync_interval):
+                # Janela conhecida (incr): a estimativa local já inclui os pendentes
+                return counter.remote + counter.pending
+            value = self.remote.get(key)
+            if counter is None or counter.expires_at <= now:
+                # Leitura sem janela conhecida: apenas cache pelo intervalo de sincronização
+                counter = self._counters[key] = _Counter(now + self.sync_interval)
+            counter.remote = value
+            counter.synced_at = now
+            return value
+
+    def get_expiry(self, key: str) -> float:
+        with self._lock:
+            counter = self._counters.get(key)
+            if counter is not None and counter.expiry and counter.expires_at > time.time():
+                return counter.expires_at
+        return self.remote.get_expiry(key)
+
+    def check(self) -> bool:
+        return self.remote.check()
+
+    def reset(self) -> Optional[int]:
+        with self._lock:
+            self._counters.clear()
+        return self.remote.reset()
+
+    def clear(self, key: str) -> None:
+        with self._lock:
+            self._counters.pop(key, None)
+        self.remote.clear(key)
@@ -0,0 +1,301 @@
+#!/usr/bin/env python3
+"""
+Particionamento mensal e retenção de access_logs (LGPD)
+No PostgreSQL a tabela é particionada por mês em `timestamp` (ver migração
+e4a9c1d7b352); a retenção remove ou arquiva partições inteiras. Em bancos sem
+particionamento (SQLite em desenvolvimento) a retenção apaga em lotes.
+Partições futuras são criadas por uma thread dos workers do Gunicorn (ao subir
+e a cada ACCESS_LOG_PARTITION_INTERVAL); registros que caíram na partição DEFAULT
+são movidos para a partição do mês quando ela é criada.
+"""
+
+import re
+import logging
+import threading
+from datetime import date, datetime
+from typing import Dict, List, Optional
+
+from sqlalchemy import column, inspect, table as table_clause, text
+
+logger = logging.getLogger(__name__)
+
+PARENT_TABLE = 'access_logs'
+DEFAULT_PARTITION = f'{PARENT_TABLE}_default'
+ARCHIVE_SCHEMA = 'archive'
+# Chave do advisory lock no PostgreSQL (um único worker cria partições)
+LOCK_KEY = 7312027
+PARTITION_PATTERN = re.compile(r'^access_logs_(\d{4})(\d{2})$')
+
+
+def month_start(moment) -> date:
+    return date(moment.year, moment.month, 1)
+
+
+def add_months(month: date, months: int) -> date:
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month: date) -> str:
+    return f"{PARENT_TABLE}_{month.year:04d}{month.month:02d}"
+
+
+def partition_ddl(month: date) -> str:
+    """DDL da partição mensal que contém `month`"""
+    start = month_start(month)
+    end = add_months(start, 1)
+    return (
+        f"CREATE TABLE IF NOT EXISTS {partition_name(start)} PARTITION OF {PARENT_TABLE} "
+        f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+    )
+
+
+def move_from_default_sql(month: date, columns: List[str]) -> List[str]:
+    """
+    Cria a partição de `month` com os registros que estão na DEFAULT: sem isso
+    o CREATE ... PARTITION OF falha ("would be violated by some row").
+    """
+    start = month_start(month)
+    end = add_months(start, 1)
+    name = partition_name(start)
+    column_list = ', '.join(columns)
+    bounds = f"timestamp >= '{start.isoformat()}' AND timestamp < '{end.isoformat()}'"
+    return [
+        # Inserções do mês na DEFAULT esperam o fim da transação
+        f"LOCK TABLE {DEFAULT_PARTITION} IN SHARE ROW EXCLUSIVE MODE",
+        f"CREATE TABLE {name} (LIKE {PARENT_TABLE} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)",
+        f"WITH moved AS (DELETE FROM {DEFAULT_PARTITION} WHERE {bounds} RETURNING {column_list}) "
+        f"INSERT INTO {name} ({column_list}) SELECT {column_list} FROM moved",
+        f"ALTER TABLE {PARENT_TABLE} ATTACH PARTITION {name} "
+        f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')",
+    ]
+
+
+class RetentionManager:
+    """Gerencia partições mensais e a política de retenção de access_logs"""
+
+    def __init__(self, app=None):
+        self.app = app
+        self.db = None
+        self.AccessLog = None
+        self.AccessLogSearchToken = None
+        self.AccessReconnect = None
+        self._thread = None
+        self._stopping = threading.Event()
+
+    def init_app(self, app):
+        """Inicializa com a aplicação Flask"""
+        self.app = app
+        from app.models import db, AccessLog, AccessLogSearchToken, AccessReconnect
+        self.db = db
+        self.AccessLog = AccessLog
+        self.AccessLogSearchToken = AccessLogSearchToken
+        self.AccessReconnect = AccessReconnect
+
+    def start_worker(self) -> bool:
+        """
+        Inicia a thread de partições conforme a configuração. Chamado pelo hook
+        post_worker_init do Gunicorn: processos da CLI (db upgrade, retention
+        run, admin bootstrap) não criam partições em segundo plano.
+        """
+        interval = self.app.config.get('ACCESS_LOG_PARTITION_INTERVAL', 86400)
+        if not interval:
+            return False
+        self.start(interval, self.app.config.get('ACCESS_LOG_PARTITION_MONTHS_AHEAD', 3))
+        return True
+
+    def is_partitioned(self) -> bool:
+        """Verifica se access_logs é uma tabela particionada (PostgreSQL)"""
+        if self.db.engine.dialect.name != 'postgresql':
+            return False
+        return bool(self.db.session.execute(text(
+            "SELECT 1 FROM pg_partitioned_table p JOIN pg_class c ON c.oid = p.partrelid "
+            "WHERE c.relname = :table"
+        ), {'table': PARENT_TABLE}).scalar())
+
+    def list_partitions(self) -> List[date]:
+        """Meses com partição criada, em ordem"""
+        names = self.db.session.execute(text(
+            "SELECT c.relname FROM pg_inherits i "
+            "JOIN pg_class c ON c.oid = i.inhrelid "
+            "JOIN pg_class p ON p.oid = i.inhparent "
+            "WHERE p.relname = :table"
+        ), {'table': PARENT_TABLE}).scalars()
+        months = []
+        for name in names:
+            match = PARTITION_PATTERN.match(name)
+            if match:
+                months.append(date(int(match.group(1)), int(match.group(2)), 1))
+        return sorted(months)
+
+    def _default_has_rows(self, month: date) -> bool:
+        """Verifica se a partição DEFAULT tem registros do mês"""
+        if not self.db.session.execute(text("SELECT to_regclass(:name) IS NOT NULL"),
+                                       {'name': DEFAULT_PARTITION}).scalar():
+            return False
+        start = month_start(month)
+        return bool(self.db.session.execute(text(
+            f"SELECT EXISTS (SELECT 1 FROM {DEFAULT_PARTITION} "
+            "WHERE timestamp >= :start AND timestamp < :end)"
+        ), {'start': start, 'end': add_months(start, 1)}).scalar())
+
+    def ensure_partitions(self, months_ahead: int = 3, today: Optional[date] = None) -> List[str]:
+        """
+        Cria as partições do mês atual e dos próximos `months_ahead` meses,
+        movendo para elas os registros do mês que estejam na DEFAULT.
+        """
+        if not self.is_partitioned():
+            return []
+        current = month_start(today or datetime.utcnow())
+        existing = set(self.list_partitions())
+        columns = [column.name for column in self.AccessLog.__table__.columns]
+        created = []
+        for offset in range(months_ahead + 1):
+            month = add_months(current, offset)
+            if month in existing:
+                continue
+            if self._default_has_rows(month):
+                for statement in move_from_default_sql(month, columns):
+                    self.db.session.execute(text(statement))
+                logger.warning(f"Registros de {month:%Y-%m} movidos da partição DEFAULT")
+            else:
+                self.db.session.execute(text(partition_ddl(month)))
+            created.append(partition_name(month))
+        self.db.session.commit()
+        if created:
+            logger.info(f"Partições criadas: {', '.join(created)}")
+        return created
+
+    def apply_retention(self, months: int, archive: bool = False,
+                        today: Optional[date] = None, batch_size: int = 5000) -> Dict[str, int]:
+        """
+        Remove registros com mais de `months` meses completos.
+
+        Tabela particionada: partições inteiras são removidas (DROP) ou, com
+        archive=True, desanexadas e movidas para o schema `archive`; registros
+        antigos da partição DEFAULT (meses sem partição) saem em lotes, copiados
+        para `archive.access_logs_default` com archive=True.
+        Sem particionamento: DELETE em lotes por id.
+
+        O rollup de estatísticas é recalculado em seguida: o resumo e os
+        sketches de IP/MAC não têm como descontar os registros removidos.
+        """
+        if months < 1:
+            raise ValueError('Retenção mínima de 1 mês')
+        cutoff = add_months(month_start(today or datetime.utcnow()), -months)
+        cutoff_dt = datetime(cutoff.year, cutoff.month, 1)
+        totals = {'partitions': 0, 'rows': 0, 'tokens': 0, 'reconnects': 0}
+
+        if self.is_partitioned():
+            if archive:
+                self.db.session.execute(text(f"CREATE SCHEMA IF NOT EXISTS {ARCHIVE_SCHEMA}"))
+            for month in self.list_partitions():
+                if add_months(month, 1) > cutoff:
+                    continue
+                name = partition_name(month)
+                if archive:
+                    self.db.session.execute(text(f"ALTER TABLE {PARENT_TABLE} DETACH PARTITION {name}"))
+                    self.db.session.execute(text(f"ALTER TABLE {name} SET SCHEMA {ARCHIVE_SCHEMA}"))
+                else:
+                    self.db.session.execute(text(f"DROP TABLE {name}"))
+                totals['partitions'] += 1
+                logger.warning(f"Retenção: partição {name} {'arquivada' if archive else 'removida'}")
+            self.db.session.commit()
+
+            if inspect(self.db.engine).has_table(DEFAULT_PARTITION):
+                archive_to = None
+                if archive:
+                    archive_to = f"{ARCHIVE_SCHEMA}.{DEFAULT_PARTITION}"
+                    self.db.session.execute(text(
+                        f"CREATE TABLE IF NOT EXISTS {archive_to} (LIKE {PARENT_TABLE} INCLUDING DEFAULTS)"
+                    ))
+                    self.db.session.commit()
+                totals['rows'] = self._delete_before(
+                    table_clause(DEFAULT_PARTITION, column('id'), column('timestamp')),
+                    cutoff_dt, batch_size, archive_to=archive_to,
+                )
+        else:
+            table = self.AccessLog.__table__
+            while True:
+                ids = [row[0] for row in self.db.session.execute(
+                    table.select().with_only_columns(table.c.id)
+                    .where(table.c.timestamp < cutoff_dt)
+                    .limit(batch_size)
+                )]
+                if not ids:
+                    break
+                self.db.session.execute(table.delete().where(table.c.id.in_(ids)))
+                self.db.session.commit()
+                totals['rows'] += len(ids)
+
+        # Tokens do índice cego e reconexões ficam em tabelas próprias (não particionadas)
+        totals['tokens'] = self._delete_before(self.AccessLogSearchToken.__table__, cutoff_dt, batch_size)
+        totals['reconnects'] = self._delete_before(self.AccessReconnect.__table__, cutoff_dt, batch_size)
+
+        logger.warning(f"Retenção aplicada (antes de {cutoff_dt.date()}): {totals}")
+        if totals['partitions'] or totals['rows']:
+            from app.stats_rollup import stats_rollup
+            stats_rollup.refresh(rebuild=True)
+        return totals
+
+    def _try_lock(self) -> bool:
+        """Advisory lock da transação no PostgreSQL; outros bancos sempre seguem"""
+        if self.db.engine.dialect.name != 'postgresql':
+            return True
+        return bool(self.db.session.execute(
+            text('SELECT pg_try_advisory_xact_lock(:key)'), {'key': LOCK_KEY}
+        ).scalar())
+
+    def start(self, interval: float, months_ahead: int = 3):
+        """Cria partições na inicialização e depois a cada `interval` segundos"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stopping.clear()
+
+        def run():
+            while True:
+                with self.app.app_context():
+                    try:
+                        if self._try_lock():
+                            self.ensure_partitions(months_ahead=months_ahead)
+                        else:
+                            self.db.session.rollback()
+                    except Exception as e:
+                        logger.error(f"Erro ao criar partições de access_logs: {e}")
+                        self.db.session.rollback()
+                    finally:
+                        self.db.session.remove()
+                if self._stopping.wait(interval):
+                    return
+
+        self._thread = threading.Thread(target=run, name='access-log-partitions', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stopping.set()
+
+    def _delete_before(self, table, cutoff_dt: datetime, batch_size: int,
+                       archive_to: Optional[str] = None) -> int:
+        """DELETE em lotes por id das linhas com timestamp anterior ao corte"""
+        deleted = 0
+        while True:
+            ids = [row[0] for row in self.db.session.execute(
+                table.select().with_only_columns(table.c.id)
+                .where(table.c.timestamp < cutoff_dt)
+                .limit(batch_size)
+            )]
+            if not ids:
+                break
+            if archive_to:
+                # Mesma transação do DELETE: o lote não some sem estar no arquivo
+                self.db.session.execute(text(
+                    f"INSERT INTO {archive_to} SELECT * FROM {table.name} WHERE id = ANY(:ids)"
+                ), {'ids': ids})
+            self.db.session.execute(table.delete().where(table.c.id.in_(ids)))
+            self.db.session.commit()
+            deleted += len(ids)
+        return deleted
+
+
+# Instância global do gerenciador de retenção
+retention_manager = RetentionManager()
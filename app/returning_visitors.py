@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""
+Reconhecimento de visitantes recorrentes do Portal Cautivo
+Um dispositivo (MAC) que preencheu o formulário recentemente pode se
+reconectar com um clique: grava-se apenas um registro leve em
+access_reconnects apontando para o acesso original. As consultas pelo
+mac_hash ficam num cache LRU com TTL por processo; resultados negativos
+expiram bem antes, pois o cadastro pode ter sido feito em outro worker
+(ou ainda estar na fila de escrita) e o cache só é limpo localmente.
+"""
+
+import time
+import logging
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional
+
+from sqlalchemy import desc
+
+logger = logging.getLogger(__name__)
+
+_MISSING = object()
+
+
+class TTLCache:
+    """LRU pequeno com expiração por entrada (thread-safe)"""
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 300):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: 'OrderedDict[str, tuple]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str, default=_MISSING):
+        now = time.monotonic()
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return default
+            value, expires_at = item
+            if expires_at <= now:
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: str, value, ttl: Optional[float] = None) -> None:
+        ttl = self.ttl if ttl is None else ttl
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+class ReturningVisitors:
+    """Consulta e reautorização de dispositivos já cadastrados"""
+
+    def __init__(self, app=None):
+        self.app = app
+        self.db = None
+        self.AccessLog = None
+        self.AccessReconnect = None
+        self.enabled = True
+        self.window = timedelta(hours=24)
+        self.miss_ttl = 5
+        self.cache = TTLCache()
+
+    def init_app(self, app):
+        """Inicializa com a aplicação Flask"""
+        self.app = app
+        from app.models import db, AccessLog, AccessReconnect
+        self.db = db
+        self.AccessLog = AccessLog
+        self.AccessReconnect = AccessReconnect
+        self.enabled = app.config.get('RETURNING_VISITOR_ENABLED', True)
+        self.window = timedelta(hours=app.config.get('RETURNING_VISITOR_WINDOW_HOURS', 24))
+        self.miss_ttl = app.config.get('RETURNING_VISITOR_MISS_TTL', 5)
+        self.cache = TTLCache(
+            maxsize=app.config.get('RETURNING_VISITOR_CACHE_SIZE', 1024),
+            ttl=app.config.get('RETURNING_VISITOR_CACHE_TTL', 300),
+        )
+
+    def lookup(self, mac: str, now: Optional[datetime] = None) -> Optional[Dict[str, Any]]:
+        """
+        Último cadastro completo do MAC dentro da janela, ou None.
+
+        A janela conta a partir do formulário (não das reconexões), então o
+        visitante volta a aceitar os termos pelo menos uma vez por janela.
+        """
+        if not self.enabled or not mac:
+            return None
+        now = now or datetime.utcnow()
+        mac_hash = self.AccessLog.hash_value(mac)
+
+        visit = self.cache.get(mac_hash)
+        if visit is _MISSING:
+            row = (self.AccessLog.query
+                   .with_entities(self.AccessLog.access_id, self.AccessLog.timestamp)
+                   .filter(self.AccessLog.mac_hash == mac_hash,
+                           self.AccessLog.timestamp >= now - self.window)
+                   .order_by(desc(self.AccessLog.timestamp))
+                   .first())
+            # Resultado negativo fica em cache só por alguns segundos: segura
+            # rajadas de GET sem atrasar a reconexão de quem acabou de se
+            # cadastrar em outro worker (forget() só limpa o cache local)
+            if row:
+                visit = {'access_id': row.access_id, 'timestamp': row.timestamp}
+                self.cache.set(mac_hash, visit)
+            else:
+                visit = None
+                if self.miss_ttl > 0:
+                    self.cache.set(mac_hash, visit, ttl=self.miss_ttl)
+
+        if visit is None or visit['timestamp'] < now - self.window:
+            return None
+        return visit
+
+    def reconnect(self, mac: str, ip: str, now: Optional[datetime] = None) -> Optional[str]:
+        """Grava a reconexão se o MAC ainda for recorrente; retorna o access_id original"""
+        now = now or datetime.utcnow()
+        visit = self.lookup(mac, now)
+        if visit is None:
+            return None
+        try:
+            self.db.session.add(self.AccessReconnect(
+                access_id=visit['access_id'],
+                ip=ip or None,
+                ip_hash=self.AccessLog.hash_value(ip) if ip else None,
+                mac_hash=self.AccessLog.hash_value(mac),
+                timestamp=now,
+            ))
+            self.db.session.commit()
+        except Exception as e:
+            logger.error(f"Erro ao registrar reconexão: {e}")
+            self.db.session.rollback()
+            return None
+        return visit['access_id']
+
+    def forget(self, mac: str) -> None:
+        """Descarta o cache do MAC (após um novo cadastro pelo formulário)"""
+        if mac:
+            self.cache.delete(self.AccessLog.hash_value(mac))
+
+
+# Instância global de visitantes recorrentes
+returning_visitors = ReturningVisitors()
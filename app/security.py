@@ -6,13 +6,12 @@ Implementa criptografia, rate limiting, validação avançada e headers de segur
 
 import os
 import csv
-import secrets
 import hashlib
 import logging
 from datetime import datetime, timedelta
 from functools import wraps
 from typing import Optional, Dict, Any
-from flask import request, session, flash, redirect, url_for, current_app
+from flask import request, session, flash, redirect, render_template, url_for, current_app
 from flask_limiter import Limiter
 from flask_limiter.util import get_remote_address
 try:
@@ -20,9 +19,12 @@ try:
     REDIS_AVAILABLE = True
 except ImportError:
     REDIS_AVAILABLE = False
-from cryptography.fernet import Fernet
-from cryptography.hazmat.primitives import hashes
-from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
+from app.keyring import Keyring
+from app.csrf import csrf_tokens
+from app.login_attempts import login_attempts
+from app import rate_limit_storage  # registra o esquema tiered+ no limits
+from app.metrics import RATELIMIT_BREACHES
+from app.security_events import security_events
 import base64
 import re
 
@@ -37,13 +39,22 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+
+def count_rate_limit_breach(request_limit):
+    """Callback on_breach do Flask-Limiter: só contabiliza (a resposta 429 segue o padrão)"""
+    RATELIMIT_BREACHES.labels(endpoint=request.endpoint or 'unknown').inc()
+    return None
+
+
 class SecurityManager:
     """Gerenciador de segurança avançada"""
     
     def __init__(self, app=None):
         self.app = app
         self.limiter = None
+        self.keyring = None
         self.cipher_suite = None
+        self.blind_index_key = None
         # Não chama setup_encryption aqui, será chamado no init_app
         
     def init_app(self, app):
@@ -56,6 +67,15 @@ class SecurityManager:
     def setup_limiter(self):
         """Configura o rate limiting"""
         storage_uri = os.getenv('REDIS_URL', 'redis://localhost:6379/0')
+        storage_options = {}
+        
+        # Contadores locais com sincronização em lote evitam uma ida ao Redis por limite/requisição
+        if os.getenv('RATE_LIMIT_LOCAL_TIER', 'True').lower() == 'true':
+            storage_uri = rate_limit_storage.SCHEME_PREFIX + storage_uri
+            storage_options = {
+                'sync_interval': float(os.getenv('RATE_LIMIT_SYNC_INTERVAL', '1.0')),
+                'sync_batch': int(os.getenv('RATE_LIMIT_SYNC_BATCH', '10')),
+            }
         
         if REDIS_AVAILABLE:
             try:
@@ -63,39 +83,41 @@ class SecurityManager:
                     app=self.app,
                     key_func=get_remote_address,
                     storage_uri=storage_uri,
-                    default_limits=["1000 per hour", "100 per minute"]
+                    storage_options=storage_options,
+                    default_limits=["1000 per hour", "100 per minute"],
+                    on_breach=count_rate_limit_breach
                 )
-                logger.info("Rate limiting configured with Redis")
+                logger.info(f"Rate limiting configured with Redis ({'local tier' if storage_options else 'direct'})")
             except Exception as e:
                 logger.warning(f"Redis not available, falling back to in-memory: {e}")
                 self.limiter = Limiter(
                     app=self.app,
                     key_func=get_remote_address,
-                    default_limits=["1000 per hour", "100 per minute"]
+                    default_limits=["1000 per hour", "100 per minute"],
+                    on_breach=count_rate_limit_breach
                 )
         else:
             logger.warning("Redis not available, using in-memory storage")
             self.limiter = Limiter(
                 app=self.app,
                 key_func=get_remote_address,
-                default_limits=["1000 per hour", "100 per minute"]
+                default_limits=["1000 per hour", "100 per minute"],
+                on_breach=count_rate_limit_breach
             )
         
     def setup_encryption(self):
         """Configura a criptografia para dados sensíveis"""
-        # Gera chave de criptografia baseada na SECRET_KEY
-        secret_key = self.app.config.get('SECRET_KEY', 'fallback-key')
-        password = secret_key.encode()
-        salt = b'salt_123_portal_cautivo'
-        
-        kdf = PBKDF2HMAC(
-            algorithm=hashes.SHA256(),
-            length=32,
-            salt=salt,
-            iterations=100000,
+        # Chaves pré-derivadas (ENCRYPTION_KEYS/arquivo) ou derivação legada da SECRET_KEY
+        self.keyring = Keyring.load(
+            secret_key=self.app.config.get('SECRET_KEY', 'fallback-key'),
+            keys=self.app.config.get('ENCRYPTION_KEYS'),
+            keys_file=self.app.config.get('ENCRYPTION_KEYS_FILE'),
+            blind_index_key=self.app.config.get('BLIND_INDEX_KEY'),
         )
-        key = base64.urlsafe_b64encode(kdf.derive(password))
-        self.cipher_suite = Fernet(key)
+        self.cipher_suite = self.keyring.cipher
+        
+        # Chave separada para índices cegos (busca em campos criptografados)
+        self.blind_index_key = self.keyring.blind_index_key
         
     def setup_headers(self):
         """Configura headers de segurança"""
@@ -111,7 +133,7 @@ class SecurityManager:
             response.headers['Permissions-Policy'] = 'geolocation=(), microphone=(), camera=()'
             
             # Prevenção de cache para páginas sensíveis
-            if request.endpoint in ['admin', 'admin_profile', 'admin_login']:
+            if request.endpoint in ['admin', 'admin_logs_api', 'admin_profile', 'admin_login']:
                 response.headers['Cache-Control'] = 'no-cache, no-store, must-revalidate'
                 response.headers['Pragma'] = 'no-cache'
                 response.headers['Expires'] = '0'
@@ -185,15 +207,15 @@ class SecurityManager:
         return text.strip()
         
     def log_security_event(self, event_type: str, details: Dict[str, Any]):
-        """Registra eventos de segurança"""
-        log_data = {
-            'timestamp': datetime.now().isoformat(),
-            'event_type': event_type,
-            'ip': get_remote_address(),
-            'user_agent': request.headers.get('User-Agent', 'Unknown'),
-            'details': details
-        }
-        logger.warning(f"SECURITY: {event_type} - {log_data}")
+        """Registra eventos de segurança (enfileirados; gravação em lote fora da requisição)"""
+        security_events.emit(
+            event_type,
+            details,
+            ip=get_remote_address(),
+            user_agent=request.headers.get('User-Agent', 'Unknown'),
+            endpoint=request.endpoint,
+            method=request.method,
+        )
 
 # Instância global do gerenciador de segurança
 security_manager = SecurityManager()
@@ -212,33 +234,39 @@ def require_admin(f):
         return f(*args, **kwargs)
     return decorated_function
 
+def login_username() -> str:
+    """
+    Usuário do formulário de login, normalizado uma única vez: o bloqueio, o
+    contador de falhas e a verificação de senha usam o mesmo valor
+    """
+    return security_manager.sanitize_input_advanced(request.form.get('username', '').strip())
+
 def rate_limit_admin(f):
-    """Decorator para aplicar rate limiting em rotas administrativas"""
+    """
+    Decorator que recusa POSTs de login bloqueados (falhas por IP ou usuário
+    na janela deslizante) antes de consultar o banco ou calcular hash
+    """
     @wraps(f)
     def decorated_function(*args, **kwargs):
-        # Aplica rate limiting mais restrito para admin
-        if security_manager.limiter:
-            # Verifica limite personalizado para login admin
-            key = f"admin_login_{get_remote_address()}"
-            current = security_manager.limiter.storage.get(key)
-            if current and current >= 5:  # 5 tentativas por hora
+        if request.method == 'POST':
+            ip = get_remote_address()
+            if login_attempts.is_locked(ip, login_username()):
                 security_manager.log_security_event('rate_limit_exceeded', {
-                    'key': key,
-                    'attempts': current
+                    'ip': ip,
+                    'endpoint': request.endpoint,
+                    'window': login_attempts.window
                 })
                 flash('Muitas tentativas de login. Tente novamente mais tarde.', 'error')
-                return redirect(url_for('admin_login'))
+                return render_template('admin_login.html', csrf_token=generate_csrf_token()), 429
         return f(*args, **kwargs)
     return decorated_function
 
 def validate_csrf_token():
-    """Valida token CSRF"""
-    token = session.get('csrf_token')
+    """Valida token CSRF (assinado, sem estado na sessão)"""
     form_token = request.form.get('csrf_token')
     
-    if not token or not form_token or token != form_token:
+    if not csrf_tokens.validate(form_token):
         security_manager.log_security_event('csrf_token_invalid', {
-            'session_token': token is not None,
             'form_token': form_token is not None
         })
         flash('Token de segurança inválido. Por favor, tente novamente.', 'error')
@@ -260,7 +288,5 @@ def require_csrf_token(f):
     return decorated_function
 
 def generate_csrf_token():
-    """Gera token CSRF"""
-    if 'csrf_token' not in session:
-        session['csrf_token'] = secrets.token_urlsafe(32)
-    return session['csrf_token']
\ No newline at end of file
+    """Gera token CSRF (não grava na sessão)"""
+    return csrf_tokens.generate()
\ No newline at end of file
@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+"""
+Pipeline de eventos de segurança do Portal Cautivo
+Eventos estruturados (JSON) entram numa fila em memória via QueueHandler e
+um QueueListener os grava em lote no arquivo ou no banco, fora da thread da
+requisição. Eventos de alto volume (access_registered) podem ser amostrados.
+"""
+
+import os
+import json
+import queue
+import random
+import logging
+import threading
+from datetime import datetime
+from logging.handlers import QueueHandler, QueueListener
+from typing import Any, Dict, List, Optional
+
+from app.metrics import SECURITY_EVENTS
+
+logger = logging.getLogger(__name__)
+
+# Nome dos LogRecords dos eventos (não passam pelo root/arquivos gerais)
+EVENT_LOGGER = 'wifi_portal.security_events'
+
+
+def parse_sample_rates(value: str) -> Dict[str, float]:
+    """'access_registered=0.1,rate_limit_exceeded=0.5' -> {tipo: taxa}"""
+    rates = {}
+    for item in (value or '').split(','):
+        if '=' not in item:
+            continue
+        event_type, rate = item.split('=', 1)
+        rates[event_type.strip()] = min(max(float(rate), 0.0), 1.0)
+    return rates
+
+
+class _DroppingQueueHandler(QueueHandler):
+    """Fila cheia descarta o evento em vez de bloquear a requisição"""
+
+    def enqueue(self, record):
+        event_type = record.event['event_type']
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            SECURITY_EVENTS.labels(event_type=event_type, outcome='dropped').inc()
+        else:
+            SECURITY_EVENTS.labels(event_type=event_type, outcome='queued').inc()
+
+
+class _BatchSink(logging.Handler):
+    """Acumula eventos e os grava em lote (tamanho do lote ou flush periódico)"""
+
+    def __init__(self, batch_size: int = 100):
+        super().__init__()
+        self.batch_size = batch_size
+        self.buffer: List[Dict[str, Any]] = []
+
+    def emit(self, record):
+        self.buffer.append(record.event)
+        if len(self.buffer) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        self.acquire()
+        try:
+            if not self.buffer:
+                return
+            batch, self.buffer = self.buffer, []
+            try:
+                self.write(batch)
+            except Exception as e:
+                logger.error(f"Falha ao gravar {len(batch)} eventos de segurança: {e}")
+        finally:
+            self.release()
+
+    def write(self, batch: List[Dict[str, Any]]):
+        raise NotImplementedError
+
+
+class JsonFileSink(_BatchSink):
+    """Uma linha JSON por evento; cada lote é uma única escrita em modo append"""
+
+    def __init__(self, path: str, batch_size: int = 100):
+        super().__init__(batch_size)
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def write(self, batch):
+        lines = ''.join(
+            json.dumps(dict(event, timestamp=event['timestamp'].isoformat()), ensure_ascii=False, default=str) + '\n'
+            for event in batch
+        )
+        with open(self.path, 'a', encoding='utf-8') as handle:
+            handle.write(lines)
+
+
+class DatabaseSink(_BatchSink):
+    """INSERT em lote na tabela security_events"""
+
+    def __init__(self, app, batch_size: int = 100):
+        super().__init__(batch_size)
+        self.app = app
+
+    def write(self, batch):
+        from app.models import db, SecurityEvent
+        rows = [
+            {
+                'timestamp': event['timestamp'],
+                'event_type': event['event_type'],
+                'ip': event.get('ip'),
+                'endpoint': event.get('endpoint'),
+                'user_agent': (event.get('user_agent') or '')[:255] or None,
+                'details': json.dumps(event.get('details'), ensure_ascii=False, default=str),
+                'sample_rate': event['sample_rate'],
+            }
+            for event in batch
+        ]
+        with self.app.app_context():
+            with db.engine.begin() as connection:
+                connection.execute(SecurityEvent.__table__.insert(), rows)
+
+
+class SecurityEventPipeline:
+    """Fila de eventos de segurança com gravação assíncrona em lote"""
+
+    def __init__(self, app=None):
+        self.app = app
+        self.sample_rates: Dict[str, float] = {}
+        self.flush_interval = 2.0
+        self.queue: Optional[queue.Queue] = None
+        self.sink: Optional[_BatchSink] = None
+        self.listener: Optional[QueueListener] = None
+        self._handler: Optional[QueueHandler] = None
+        self._flusher: Optional[threading.Thread] = None
+        self._stopping = threading.Event()
+
+    def init_app(self, app):
+        """Inicializa com a aplicação Flask e inicia o listener"""
+        self.app = app
+        self.sample_rates = parse_sample_rates(app.config.get('SECURITY_EVENT_SAMPLE_RATES', ''))
+        self.flush_interval = app.config.get('SECURITY_EVENT_FLUSH_INTERVAL', 2.0)
+        batch_size = app.config.get('SECURITY_EVENT_BATCH_SIZE', 100)
+
+        if app.config.get('SECURITY_EVENT_SINK', 'file') == 'db':
+            sink = DatabaseSink(app, batch_size)
+        else:
+            sink = JsonFileSink(app.config.get('SECURITY_EVENT_FILE', 'logs/security_events.jsonl'), batch_size)
+
+        self.stop()
+        self.sink = sink
+        self.queue = queue.Queue(maxsize=app.config.get('SECURITY_EVENT_QUEUE_SIZE', 10000))
+        self._handler = _DroppingQueueHandler(self.queue)
+        self.start()
+
+    # ------------------------------------------------------------------
+    # Produção de eventos (thread da requisição)
+    # ------------------------------------------------------------------
+
+    def emit(self, event_type: str, details: Dict[str, Any], **context) -> bool:
+        """Enfileira o evento (ou o descarta pela amostragem); nunca faz I/O"""
+        rate = self.sample_rates.get(event_type, 1.0)
+        if rate < 1.0 and random.random() >= rate:
+            SECURITY_EVENTS.labels(event_type=event_type, outcome='sampled_out').inc()
+            return False
+
+        event = {
+            'timestamp': datetime.utcnow(),
+            'event_type': event_type,
+            **context,
+            'details': details,
+            'sample_rate': rate,
+        }
+        if self._handler is None:
+            # Pipeline não inicializado (scripts/uso fora da aplicação)
+            logger.warning(f"SECURITY: {event_type} - {event}")
+            return True
+
+        record = logging.LogRecord(EVENT_LOGGER, logging.WARNING, __file__, 0, event_type, None, None)
+        record.event = event
+        self._handler.handle(record)
+        return True
+
+    # ------------------------------------------------------------------
+    # Consumo (listener em segundo plano)
+    # ------------------------------------------------------------------
+
+    def start(self):
+        if self.listener is not None:
+            return
+        self._stopping.clear()
+        self.listener = QueueListener(self.queue, self.sink)
+        self.listener.start()
+
+        def run():
+            while not self._stopping.wait(self.flush_interval):
+                self.sink.flush()
+
+        self._flusher = threading.Thread(target=run, name='security-events-flush', daemon=True)
+        self._flusher.start()
+
+    def flush(self):
+        """Espera a fila esvaziar e grava o lote pendente"""
+        if self.queue is not None and self.listener is not None:
+            self.queue.join()
+        if self.sink is not None:
+            self.sink.flush()
+
+    def stop(self):
+        """Processa o que resta na fila e grava o último lote"""
+        if self.listener is None:
+            return
+        self._stopping.set()
+        self.listener.stop()
+        self.listener = None
+        self.sink.flush()
+
+
+# Instância global do pipeline de eventos
+security_events = SecurityEventPipeline()
@@ -0,0 +1,368 @@
+#!/usr/bin/env python3
+"""
+Rollup de estatísticas de acesso para o painel administrativo
+Mantém buckets por hora/dia com contagens e sketches HyperLogLog de IP/MAC,
+para que o dashboard não precise varrer a tabela access_logs inteira
+"""
+
+import math
+import zlib
+import hashlib
+import logging
+import threading
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional
+
+from sqlalchemy import case, func, text
+
+logger = logging.getLogger(__name__)
+
+EPOCH = datetime(1970, 1, 1)
+
+
+class HyperLogLog:
+    """Sketch HyperLogLog para contagem aproximada de valores distintos (p=12, ~1,6% de erro)"""
+
+    PRECISION = 12
+    REGISTERS = 1 << PRECISION
+
+    def __init__(self, registers: Optional[bytes] = None):
+        self.registers = bytearray(registers) if registers else bytearray(self.REGISTERS)
+
+    def add(self, value: str):
+        if not value:
+            return
+        h = int.from_bytes(hashlib.blake2b(value.encode(), digest_size=8).digest(), 'big')
+        index = h >> (64 - self.PRECISION)
+        rest = h & ((1 << (64 - self.PRECISION)) - 1)
+        rank = (64 - self.PRECISION) - rest.bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def update(self, values: Iterable[str]) -> 'HyperLogLog':
+        for value in values:
+            self.add(value)
+        return self
+
+    def merge(self, other: 'HyperLogLog') -> 'HyperLogLog':
+        self.registers = bytearray(map(max, self.registers, other.registers))
+        return self
+
+    def estimate(self) -> int:
+        m = self.REGISTERS
+        zeros = self.registers.count(0)
+        if zeros == m:
+            return 0
+        alpha = 0.7213 / (1 + 1.079 / m)
+        raw = alpha * m * m / sum(2.0 ** -r for r in self.registers)
+        if raw <= 2.5 * m and zeros:
+            # Correção para cardinalidades pequenas (linear counting)
+            return int(round(m * math.log(m / zeros)))
+        return int(round(raw))
+
+    def to_bytes(self) -> bytes:
+        return zlib.compress(bytes(self.registers))
+
+    @classmethod
+    def from_bytes(cls, data: Optional[bytes]) -> 'HyperLogLog':
+        return cls(zlib.decompress(data) if data else None)
+
+
+def floor_hour(moment: datetime) -> datetime:
+    return moment.replace(minute=0, second=0, microsecond=0)
+
+
+def floor_day(moment: datetime) -> datetime:
+    return moment.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+class StatsRollup:
+    """
+    Gerenciador do rollup de estatísticas.
+
+    Um job periódico (thread opcional ou `flask stats refresh`) recalcula os
+    buckets de hora já fechados a partir de access_logs, consolida os buckets
+    de dia e acumula tudo na linha 'all'. As leituras combinam o rollup com
+    os registros mais recentes que ele ainda não cobre; se o rollup ficou
+    para trás mais que `max_lag`, as leituras voltam à consulta direta.
+    """
+
+    # Horas fechadas recalculadas a cada execução (registros que chegam atrasados)
+    REROLL_HOURS = 2
+    # Buckets de hora mais antigos que isso são descartados (os de dia permanecem)
+    HOUR_RETENTION_DAYS = 14
+    # Chave do advisory lock no PostgreSQL (um único worker executa o job)
+    LOCK_KEY = 7312026
+
+    def __init__(self, app=None):
+        self.app = app
+        self.db = None
+        self.AccessLog = None
+        self.Rollup = None
+        self.grace = timedelta(minutes=5)
+        self.max_lag = timedelta(hours=2)
+        self._thread = None
+        self._stopping = threading.Event()
+
+    def init_app(self, app):
+        """Inicializa com a aplicação Flask"""
+        self.app = app
+        from app.models import db, AccessLog, AccessStatsRollup
+        self.db = db
+        self.AccessLog = AccessLog
+        self.Rollup = AccessStatsRollup
+        self.grace = timedelta(seconds=app.config.get('STATS_ROLLUP_GRACE', 300))
+        self.max_lag = timedelta(seconds=app.config.get('STATS_ROLLUP_MAX_LAG', 7200))
+
+        interval = app.config.get('STATS_ROLLUP_INTERVAL', 300)
+        if interval:
+            self.start(interval)
+
+    # ------------------------------------------------------------------
+    # Leitura
+    # ------------------------------------------------------------------
+
+    def get_stats(self, now: Optional[datetime] = None) -> Optional[Dict[str, Any]]:
+        """
+        Estatísticas do dashboard em O(buckets).
+
+        Retorna None se o rollup ainda não foi calculado ou está desatualizado
+        (covered_until mais antigo que `max_lag`): use a consulta direta.
+        """
+        summary = self.Rollup.query.filter_by(granularity='all', bucket_start=EPOCH).first()
+        if summary is None or summary.covered_until is None:
+            return None
+
+        now = now or datetime.utcnow()
+        if now - summary.covered_until > self.max_lag:
+            logger.warning(f"Rollup de estatísticas desatualizado (até {summary.covered_until}); "
+                           "usando consulta direta")
+            return None
+        today_start = floor_day(now)
+        week_start = today_start - timedelta(days=today_start.weekday())
+
+        # Registros posteriores ao que o rollup cobre (no máximo `max_lag`):
+        # contagens no banco, só os hashes distintos vêm para os sketches
+        timestamp = self.AccessLog.timestamp
+        in_tail = timestamp >= summary.covered_until
+        tail_total, tail_today, tail_week = self.db.session.query(
+            func.count(),
+            func.coalesce(func.sum(case((timestamp >= today_start, 1), else_=0)), 0),
+            func.coalesce(func.sum(case((timestamp >= week_start, 1), else_=0)), 0),
+        ).filter(in_tail).one()
+
+        ips = HyperLogLog.from_bytes(summary.ip_sketch).update(
+            self.db.session.scalars(self.db.select(self.AccessLog.ip_hash).where(in_tail).distinct())
+        )
+        macs = HyperLogLog.from_bytes(summary.mac_sketch).update(
+            self.db.session.scalars(self.db.select(self.AccessLog.mac_hash).where(in_tail).distinct())
+        )
+
+        days = self.Rollup.query.filter(
+            self.Rollup.granularity == 'day',
+            self.Rollup.bucket_start >= week_start
+        ).all()
+
+        return {
+            'total_accesses': summary.access_count + tail_total,
+            'unique_ips': ips.estimate(),
+            'unique_macs': macs.estimate(),
+            'today_accesses': sum(d.access_count for d in days if d.bucket_start >= today_start)
+            + int(tail_today),
+            'this_week_accesses': sum(d.access_count for d in days) + int(tail_week),
+        }
+
+    def get_hourly(self, since: datetime) -> List[Dict[str, Any]]:
+        """Contagens por hora a partir de `since` (buckets já consolidados)"""
+        hours = self.Rollup.query.filter(
+            self.Rollup.granularity == 'hour',
+            self.Rollup.bucket_start >= since
+        ).order_by(self.Rollup.bucket_start).all()
+        return [
+            {'hour': h.bucket_start.isoformat(), 'accesses': h.access_count,
+             'unique_ips': HyperLogLog.from_bytes(h.ip_sketch).estimate()}
+            for h in hours
+        ]
+
+    # ------------------------------------------------------------------
+    # Job de consolidação
+    # ------------------------------------------------------------------
+
+    def _try_lock(self, wait: bool = False) -> bool:
+        """Advisory lock da transação no PostgreSQL; outros bancos sempre seguem"""
+        if self.db.engine.dialect.name != 'postgresql':
+            return True
+        if wait:
+            self.db.session.execute(text('SELECT pg_advisory_xact_lock(:key)'), {'key': self.LOCK_KEY})
+            return True
+        return bool(self.db.session.execute(
+            text('SELECT pg_try_advisory_xact_lock(:key)'), {'key': self.LOCK_KEY}
+        ).scalar())
+
+    def refresh(self, now: Optional[datetime] = None, rebuild: bool = False) -> int:
+        """
+        Consolida as horas fechadas ainda não cobertas pelo rollup.
+
+        Com rebuild=True descarta o rollup e recalcula todo o histórico
+        (esperando um refresh em andamento terminar em vez de desistir).
+        Retorna o número de buckets de hora recalculados.
+        """
+        now = now or datetime.utcnow()
+        if not self._try_lock(wait=rebuild):
+            logger.info("Rollup de estatísticas já em execução em outro processo")
+            return 0
+
+        if rebuild:
+            self.Rollup.query.delete()
+
+        summary = self.Rollup.query.filter_by(granularity='all', bucket_start=EPOCH).first()
+        target = floor_hour(now - self.grace)
+
+        if summary is None or summary.covered_until is None:
+            first = self.db.session.query(self.db.func.min(self.AccessLog.timestamp)).scalar()
+            start = floor_hour(first) if first else target
+            if summary is None:
+                summary = self.Rollup(granularity='all', bucket_start=EPOCH, access_count=0)
+                self.db.session.add(summary)
+        else:
+            start = max(
+                summary.covered_until - timedelta(hours=self.REROLL_HOURS),
+                EPOCH
+            )
+
+        if start >= target:
+            summary.covered_until = max(summary.covered_until or target, target)
+            self.db.session.commit()
+            return 0
+
+        ip_sketch = HyperLogLog.from_bytes(summary.ip_sketch)
+        mac_sketch = HyperLogLog.from_bytes(summary.mac_sketch)
+        touched_days = set()
+        hours_done = 0
+
+        # Processa um dia por consulta (usa o índice de timestamp)
+        day = floor_day(start)
+        while day < target:
+            range_start = max(day, start)
+            range_end = min(day + timedelta(days=1), target)
+            buckets = self._aggregate_hours(range_start, range_end)
+
+            existing = {
+                h.bucket_start: h for h in self.Rollup.query.filter(
+                    self.Rollup.granularity == 'hour',
+                    self.Rollup.bucket_start >= range_start,
+                    self.Rollup.bucket_start < range_end
+                ).all()
+            }
+            for hour_start, (count, ips, macs) in buckets.items():
+                row = existing.pop(hour_start, None)
+                if row is None:
+                    row = self.Rollup(granularity='hour', bucket_start=hour_start, access_count=0)
+                    self.db.session.add(row)
+                summary.access_count += count - row.access_count
+                row.access_count = count
+                row.ip_sketch = ips.to_bytes()
+                row.mac_sketch = macs.to_bytes()
+                ip_sketch.merge(ips)
+                mac_sketch.merge(macs)
+                hours_done += 1
+            for row in existing.values():
+                # Hora que ficou vazia (registros removidos)
+                summary.access_count -= row.access_count
+                self.db.session.delete(row)
+
+            if buckets or existing:
+                touched_days.add(day)
+            day += timedelta(days=1)
+
+        self.db.session.flush()
+        for day in touched_days:
+            self._rollup_day(day)
+
+        summary.ip_sketch = ip_sketch.to_bytes()
+        summary.mac_sketch = mac_sketch.to_bytes()
+        summary.covered_until = target
+
+        self.Rollup.query.filter(
+            self.Rollup.granularity == 'hour',
+            self.Rollup.bucket_start < floor_day(now) - timedelta(days=self.HOUR_RETENTION_DAYS)
+        ).delete(synchronize_session=False)
+
+        self.db.session.commit()
+        logger.info(f"Rollup de estatísticas atualizado até {target} ({hours_done} horas)")
+        return hours_done
+
+    def _aggregate_hours(self, range_start: datetime, range_end: datetime):
+        """Contagem e sketches por hora de um intervalo de access_logs"""
+        rows = self.db.session.query(
+            self.AccessLog.timestamp, self.AccessLog.ip_hash, self.AccessLog.mac_hash
+        ).filter(
+            self.AccessLog.timestamp >= range_start,
+            self.AccessLog.timestamp < range_end
+        ).yield_per(5000)
+
+        buckets = {}
+        for timestamp, ip_hash, mac_hash in rows:
+            hour = floor_hour(timestamp)
+            if hour not in buckets:
+                buckets[hour] = [0, HyperLogLog(), HyperLogLog()]
+            bucket = buckets[hour]
+            bucket[0] += 1
+            bucket[1].add(ip_hash)
+            bucket[2].add(mac_hash)
+        return {hour: tuple(bucket) for hour, bucket in buckets.items()}
+
+    def _rollup_day(self, day: datetime):
+        """Recalcula o bucket de dia a partir dos buckets de hora"""
+        hours = self.Rollup.query.filter(
+            self.Rollup.granularity == 'hour',
+            self.Rollup.bucket_start >= day,
+            self.Rollup.bucket_start < day + timedelta(days=1)
+        ).all()
+        row = self.Rollup.query.filter_by(granularity='day', bucket_start=day).first()
+        if not hours:
+            if row is not None:
+                self.db.session.delete(row)
+            return
+        if row is None:
+            row = self.Rollup(granularity='day', bucket_start=day)
+            self.db.session.add(row)
+
+        ips, macs = HyperLogLog(), HyperLogLog()
+        for hour in hours:
+            ips.merge(HyperLogLog.from_bytes(hour.ip_sketch))
+            macs.merge(HyperLogLog.from_bytes(hour.mac_sketch))
+        row.access_count = sum(h.access_count for h in hours)
+        row.ip_sketch = ips.to_bytes()
+        row.mac_sketch = macs.to_bytes()
+
+    # ------------------------------------------------------------------
+    # Thread de fundo
+    # ------------------------------------------------------------------
+
+    def start(self, interval: float):
+        """Executa refresh() a cada `interval` segundos numa thread do worker"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stopping.clear()
+
+        def run():
+            while not self._stopping.wait(interval):
+                with self.app.app_context():
+                    try:
+                        self.refresh()
+                    except Exception as e:
+                        logger.error(f"Erro ao atualizar rollup de estatísticas: {e}")
+                        self.db.session.rollback()
+                    finally:
+                        self.db.session.remove()
+
+        self._thread = threading.Thread(target=run, name='stats-rollup', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stopping.set()
+
+
+# Instância global do rollup de estatísticas
+stats_rollup = StatsRollup()
@@ -0,0 +1,318 @@
+#!/usr/bin/env python3
+"""
+Fila write-behind para registros de acesso do Portal Cautivo
+Agrupa inserções de AccessLog em lotes e mantém um journal local (spool)
+para que registros enfileirados não se percam se o processo cair. O replay
+do spool precisa ser idempotente (o processo pode cair entre o commit e a
+remoção do segmento); lotes que falham repetidamente vão para quarentena.
+"""
+
+import os
+import glob
+import json
+import time
+import uuid
+import atexit
+import logging
+import threading
+from typing import Any, Callable, Dict, List, Optional
+
+try:
+    import fcntl
+    FCNTL_AVAILABLE = True
+except ImportError:
+    FCNTL_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+# Espera máxima entre tentativas de flush com o banco falhando (segundos)
+MAX_BACKOFF = 60.0
+
+
+def read_spool(path: str, deserialize: Callable[[Dict[str, Any]], Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Lê um segmento do spool (uma linha JSON por registro)"""
+    rows = []
+    with open(path, 'r', encoding='utf-8') as handle:
+        for line in handle:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                rows.append(deserialize(json.loads(line)))
+            except Exception as e:
+                # Linha truncada por queda no meio da escrita
+                logger.error(f"Registro inválido no spool {path}: {e}")
+    return rows
+
+
+def replay_quarantined(spool_dir: str, flush_callback: Callable[[List[Dict[str, Any]]], None],
+                       deserialize: Callable[[Dict[str, Any]], Dict[str, Any]]) -> Dict[str, int]:
+    """Regrava os segmentos em quarentena; os que gravarem são apagados"""
+    totals = {'files': 0, 'rows': 0, 'failed': 0}
+    pattern = os.path.join(spool_dir, f'access_logs-*{AccessLogWriteBehind.QUARANTINE_SUFFIX}')
+    for path in sorted(glob.glob(pattern)):
+        rows = read_spool(path, deserialize)
+        try:
+            if rows:
+                flush_callback(rows)
+        except Exception as e:
+            logger.error(f"Segmento em quarentena {path} ainda falha: {e}")
+            totals['failed'] += 1
+            continue
+        os.remove(path)
+        totals['files'] += 1
+        totals['rows'] += len(rows)
+    return totals
+
+
+class AccessLogWriteBehind:
+    """
+    Fila em processo para gravação em lote de registros de acesso.
+
+    Cada registro é anexado ao spool do processo antes de entrar na fila em
+    memória. Uma thread de fundo descarrega a fila quando ela atinge
+    `batch_size` registros ou a cada `flush_interval` segundos. O spool só é
+    apagado depois do commit no banco; spools de processos mortos são
+    recuperados na inicialização do próximo processo.
+
+    Com o banco falhando, as tentativas seguem backoff exponencial (até
+    MAX_BACKOFF). Erros em `transient_errors` (banco fora do ar) não contam
+    para a quarentena; os demais, após `max_failures` flushes seguidos, movem
+    os segmentos pendentes para `.failed`. Passar de `max_pending` registros
+    na fila também os move, limitando a memória. Segmentos em quarentena
+    ficam no disco até `flask access-log replay`.
+    """
+
+    SPOOL_SUFFIX = '.spool'
+    SEGMENT_SUFFIX = '.flushing'
+    QUARANTINE_SUFFIX = '.failed'
+
+    def __init__(self, flush_callback: Callable[[List[Dict[str, Any]]], None],
+                 spool_dir: str,
+                 serialize: Callable[[Dict[str, Any]], Dict[str, Any]] = None,
+                 deserialize: Callable[[Dict[str, Any]], Dict[str, Any]] = None,
+                 batch_size: int = 100,
+                 flush_interval: float = 2.0,
+                 max_pending: int = 10000,
+                 max_failures: int = 5,
+                 transient_errors: tuple = ()):
+        self.flush_callback = flush_callback
+        self.spool_dir = spool_dir
+        self.serialize = serialize or (lambda row: row)
+        self.deserialize = deserialize or (lambda row: row)
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = max(0.1, flush_interval)
+        self.max_pending = max(self.batch_size, max_pending)
+        self.max_failures = max(1, max_failures)
+        self.transient_errors = transient_errors
+
+        self._token = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self._buffer: List[Dict[str, Any]] = []
+        self._segments: List[str] = []
+        self._segment_seq = 0
+        self._attempts = 0
+        self._failures = 0
+        self._retry_at = 0.0
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._spool_file = None
+
+        os.makedirs(self.spool_dir, mode=0o750, exist_ok=True)
+        self._open_spool()
+        self.recover()
+
+    # ------------------------------------------------------------------
+    # Spool
+    # ------------------------------------------------------------------
+
+    def _path(self, token: str, suffix: str) -> str:
+        return os.path.join(self.spool_dir, f"access_logs-{token}{suffix}")
+
+    def _open_spool(self):
+        """Abre o spool ativo do processo e o trava enquanto o processo viver"""
+        self._spool_path = self._path(self._token, self.SPOOL_SUFFIX)
+        self._spool_file = open(self._spool_path, 'a', encoding='utf-8')
+        if FCNTL_AVAILABLE:
+            fcntl.flock(self._spool_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+
+    def _rotate_spool(self) -> Optional[str]:
+        """Fecha o spool ativo como segmento e abre um novo (chamado com _lock)"""
+        self._spool_file.close()
+        if os.path.getsize(self._spool_path) == 0:
+            self._open_spool()
+            return None
+        self._segment_seq += 1
+        segment = self._path(self._token, f".{self._segment_seq}{self.SEGMENT_SUFFIX}")
+        os.replace(self._spool_path, segment)
+        self._open_spool()
+        return segment
+
+    @staticmethod
+    def _owner_alive(spool_path: str) -> bool:
+        """Verifica se o processo dono de um spool ainda o mantém travado"""
+        if not os.path.exists(spool_path):
+            return False
+        if not FCNTL_AVAILABLE:
+            # Sem flock (Windows) não há como saber se o dono morreu
+            return True
+        with open(spool_path, 'a', encoding='utf-8') as handle:
+            try:
+                fcntl.flock(handle.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                return True
+            fcntl.flock(handle.fileno(), fcntl.LOCK_UN)
+        return False
+
+    def recover(self) -> int:
+        """Reassume spools deixados por processos que morreram antes do flush"""
+        recovered = 0
+        pattern = os.path.join(self.spool_dir, 'access_logs-*')
+        owners = {}
+        for path in glob.glob(pattern):
+            if path.endswith(self.QUARANTINE_SUFFIX):
+                continue
+            name = os.path.basename(path)[len('access_logs-'):]
+            token = name.split('.', 1)[0]
+            if token != self._token:
+                owners.setdefault(token, []).append(path)
+
+        for token, paths in owners.items():
+            if self._owner_alive(self._path(token, self.SPOOL_SUFFIX)):
+                continue
+            for path in sorted(paths):
+                rows = self._read_segment(path)
+                with self._lock:
+                    self._segment_seq += 1
+                    segment = self._path(self._token, f".{self._segment_seq}{self.SEGMENT_SUFFIX}")
+                    os.replace(path, segment)
+                    if rows:
+                        self._segments.append(segment)
+                        self._buffer[0:0] = rows
+                    else:
+                        os.remove(segment)
+                recovered += len(rows)
+
+        if recovered:
+            logger.warning(f"Recuperados {recovered} registros de acesso do spool")
+            self._wakeup.set()
+        return recovered
+
+    def _read_segment(self, path: str) -> List[Dict[str, Any]]:
+        return read_spool(path, self.deserialize)
+
+    def _quarantine(self, segments: List[str]):
+        """Tira segmentos da fila, mantendo-os no disco (chamado com _lock)"""
+        for path in segments:
+            target = path[:-len(self.SEGMENT_SUFFIX)] + self.QUARANTINE_SUFFIX
+            try:
+                os.replace(path, target)
+            except FileNotFoundError:
+                pass
+            self._segments.remove(path)
+
+    # ------------------------------------------------------------------
+    # Fila
+    # ------------------------------------------------------------------
+
+    def enqueue(self, row: Dict[str, Any]):
+        """Grava o registro no spool e o coloca na fila de flush"""
+        line = json.dumps(self.serialize(row), ensure_ascii=False)
+        with self._lock:
+            self._spool_file.write(line + '\n')
+            self._spool_file.flush()
+            self._buffer.append(row)
+            pending = len(self._buffer)
+        if pending >= self.batch_size:
+            self._wakeup.set()
+
+    def pending(self) -> int:
+        """Quantidade de registros aguardando flush"""
+        with self._lock:
+            return len(self._buffer)
+
+    def flush(self) -> int:
+        """Descarrega a fila no banco. Retorna o número de registros gravados"""
+        with self._flush_lock:
+            with self._lock:
+                if not self._buffer:
+                    return 0
+                rows, self._buffer = self._buffer, []
+                segment = self._rotate_spool()
+                if segment:
+                    self._segments.append(segment)
+                segments = list(self._segments)
+
+            try:
+                self.flush_callback(rows)
+            except Exception as e:
+                self._flush_failed(rows, segments, e)
+                return 0
+
+            self._attempts = self._failures = 0
+            self._retry_at = 0.0
+            with self._lock:
+                for path in segments:
+                    try:
+                        os.remove(path)
+                    except FileNotFoundError:
+                        pass
+                    self._segments.remove(path)
+            return len(rows)
+
+    def _flush_failed(self, rows: List[Dict[str, Any]], segments: List[str], error: Exception):
+        """Devolve o lote à fila com backoff ou o põe em quarentena"""
+        self._attempts += 1
+        if not isinstance(error, self.transient_errors):
+            self._failures += 1
+        backoff = self.flush_interval * 2 ** min(self._attempts, 10)
+        self._retry_at = time.monotonic() + min(MAX_BACKOFF, backoff)
+        with self._lock:
+            overflow = len(rows) + len(self._buffer) > self.max_pending
+            if self._failures >= self.max_failures or overflow:
+                self._quarantine(segments)
+                self._failures = 0
+                logger.error(
+                    f"Lote de {len(rows)} registros de acesso em quarentena "
+                    f"({'fila cheia' if overflow else 'falhas repetidas'}): {error}"
+                )
+                return
+            self._buffer[0:0] = rows
+        logger.error(f"Falha no flush de {len(rows)} registros de acesso: {error}")
+
+    # ------------------------------------------------------------------
+    # Thread de fundo
+    # ------------------------------------------------------------------
+
+    def start(self):
+        """Inicia a thread de flush periódico"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._run, name='access-log-writer', daemon=True)
+        self._thread.start()
+        atexit.register(self.stop)
+
+    def _run(self):
+        while not self._stopping.is_set():
+            backoff = self._retry_at - time.monotonic()
+            self._wakeup.wait(backoff if backoff > 0 else self.flush_interval)
+            self._wakeup.clear()
+            if self._retry_at > time.monotonic() and not self._stopping.is_set():
+                continue
+            self.flush()
+
+    def stop(self):
+        """Para a thread e faz o flush final (encerramento do worker)"""
+        self._stopping.set()
+        self._wakeup.set()
+        if self._thread and self._thread.is_alive():
+            self._thread.join(timeout=self.flush_interval + 5)
+        self.flush()
+        with self._lock:
+            if self._spool_file and not self._spool_file.closed:
+                self._spool_file.close()
+                if not self._buffer and os.path.getsize(self._spool_path) == 0:
+                    os.remove(self._spool_path)
@@ -1,16 +1,26 @@
 # Gunicorn configuration for Portal Cautivo
 # Usage: gunicorn -c deploy/gunicorn.conf.py wsgi:app
 
+import os
+import shutil
 import multiprocessing
 
+from app import green
+
+# Prometheus multiprocess mode: every worker writes its metrics to mmap files
+# here and /metrics aggregates them. Must be set before the app is imported.
+os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", "/tmp/wifi-portal-metrics")
+
 # Bind to localhost only (Nginx will proxy from outside)
 bind = "0.0.0.0:5000"
 
-# Worker configuration
-workers = multiprocessing.cpu_count() + 1
-worker_class = "sync"  # Use "gevent" if you install gevent and need async
-worker_connections = 1000
-threads = 2
+# Worker configuration (shared with wsgi.py and the SQLAlchemy pool via app/green.py)
+# gevent: one greenlet per request, so slow SMTP/DB I/O does not block the worker.
+# GUNICORN_WORKER_CLASS=sync falls back to threads (GUNICORN_THREADS per worker).
+workers = int(os.getenv("GUNICORN_WORKERS", str(multiprocessing.cpu_count() + 1)))
+worker_class = green.worker_class()
+worker_connections = green.worker_connections()
+threads = green.threads()
 
 # Timeout and keepalive
 timeout = 30
@@ -33,6 +43,50 @@ daemon = False
 pidfile = None
 umask = 0o022
 
+# Server hooks
+def on_starting(server):
+    """Derive encryption keys and calibrate password hashing once in the master; workers inherit both via env."""
+    from dotenv import load_dotenv
+    from app.keyring import export_keys_to_env
+    from app.passwords import export_method_to_env
+    load_dotenv('.env.local')
+    if export_keys_to_env():
+        server.log.info("Encryption keys derived in master process")
+    # Calibrate the password hash cost once; workers inherit it via env
+    if export_method_to_env():
+        server.log.info(f"Password hash calibrated in master process: {os.environ['PASSWORD_HASH_METHOD']}")
+    # Stale metric files from a previous run would be summed into /metrics
+    metrics_dir = os.environ["PROMETHEUS_MULTIPROC_DIR"]
+    shutil.rmtree(metrics_dir, ignore_errors=True)
+    os.makedirs(metrics_dir, exist_ok=True)
+
+def post_worker_init(worker):
+    """Create the default admin once per worker, off the /admin/login path."""
+    from app.bootstrap import admin_bootstrap
+    from app.retention import retention_manager
+    # Workers booting together serialize on a Postgres advisory lock
+    admin_bootstrap.ensure_once()
+    # Only server workers pre-create monthly partitions (never CLI processes)
+    retention_manager.start_worker()
+
+def worker_exit(server, worker):
+    """Flush pending write-behind access logs and security events before the worker goes away."""
+    from app.data_manager import data_manager
+    from app.outbox import email_outbox
+    from app.security_events import security_events
+    data_manager.shutdown()
+    security_events.stop()
+    # Queued emails stay in email_outbox for the other workers
+    email_outbox.stop()
+
+def child_exit(server, worker):
+    """Drop the dead worker's live gauges from the shared metrics directory."""
+    try:
+        from prometheus_client import multiprocess
+    except ImportError:
+        return
+    multiprocess.mark_process_dead(worker.pid)
+
 # SSL (optional - use only if not behind Nginx with SSL)
 # keyfile = "/etc/letsencrypt/live/seu-dominio.com/privkey.pem"
 # certfile = "/etc/letsencrypt/live/seu-dominio.com/fullchain.pem"
@@ -0,0 +1,36 @@
+"""Add security_events table for the structured event pipeline
+
+Revision ID: a3c5e7f9b214
+Revises: f2b8d4a61c09
+Create Date: 2026-10-17 14:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a3c5e7f9b214'
+down_revision = 'f2b8d4a61c09'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('security_events',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('timestamp', sa.DateTime(), nullable=False),
+    sa.Column('event_type', sa.String(length=64), nullable=False),
+    sa.Column('ip', sa.String(length=45), nullable=True),
+    sa.Column('endpoint', sa.String(length=100), nullable=True),
+    sa.Column('user_agent', sa.String(length=255), nullable=True),
+    sa.Column('details', sa.Text(), nullable=True),
+    sa.Column('sample_rate', sa.Float(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('idx_security_events_type_timestamp', 'security_events', ['event_type', 'timestamp'], unique=False)
+
+
+def downgrade():
+    op.drop_index('idx_security_events_type_timestamp', table_name='security_events')
+    op.drop_table('security_events')
@@ -0,0 +1,41 @@
+"""Add access_reconnects table for returning-visitor re-authorization
+
+Revision ID: b6d2f8a4c517
+Revises: a3c5e7f9b214
+Create Date: 2026-10-17 15:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b6d2f8a4c517'
+down_revision = 'a3c5e7f9b214'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('access_reconnects',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('access_id', sa.String(length=64), nullable=False),
+    sa.Column('ip', sa.String(length=45), nullable=True),
+    sa.Column('ip_hash', sa.String(length=64), nullable=True),
+    sa.Column('mac_hash', sa.String(length=64), nullable=False),
+    sa.Column('timestamp', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('access_reconnects', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_access_reconnects_access_id'), ['access_id'], unique=False)
+        batch_op.create_index(batch_op.f('ix_access_reconnects_mac_hash'), ['mac_hash'], unique=False)
+        batch_op.create_index(batch_op.f('ix_access_reconnects_timestamp'), ['timestamp'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('access_reconnects', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_access_reconnects_timestamp'))
+        batch_op.drop_index(batch_op.f('ix_access_reconnects_mac_hash'))
+        batch_op.drop_index(batch_op.f('ix_access_reconnects_access_id'))
+
+    op.drop_table('access_reconnects')
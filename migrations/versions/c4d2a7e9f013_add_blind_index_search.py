@@ -0,0 +1,46 @@
+"""Add blind index columns for searching encrypted nome/email
+
+Revision ID: c4d2a7e9f013
+Revises: b7e1c9f2a1d4
+Create Date: 2026-10-17 09:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c4d2a7e9f013'
+down_revision = 'b7e1c9f2a1d4'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('access_logs', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('email_bidx', sa.String(length=32), nullable=True))
+        batch_op.create_index(batch_op.f('ix_access_logs_email_bidx'), ['email_bidx'], unique=False)
+
+    op.create_table('access_log_search_tokens',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('access_id', sa.String(length=64), nullable=False),
+    sa.Column('token', sa.String(length=32), nullable=False),
+    sa.Column('timestamp', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('access_log_search_tokens', schema=None) as batch_op:
+        batch_op.create_index('idx_search_token_access', ['token', 'access_id'], unique=False)
+        batch_op.create_index(batch_op.f('ix_access_log_search_tokens_timestamp'), ['timestamp'], unique=False)
+
+    # Registros existentes: flask --app wsgi:app search-index rebuild
+
+
+def downgrade():
+    with op.batch_alter_table('access_log_search_tokens', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_access_log_search_tokens_timestamp'))
+        batch_op.drop_index('idx_search_token_access')
+
+    op.drop_table('access_log_search_tokens')
+    with op.batch_alter_table('access_logs', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_access_logs_email_bidx'))
+        batch_op.drop_column('email_bidx')
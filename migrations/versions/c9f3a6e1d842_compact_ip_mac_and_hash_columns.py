@@ -0,0 +1,251 @@
+"""Store ip/mac as INET/MACADDR and ip_hash/mac_hash as raw digests
+
+Revision ID: c9f3a6e1d842
+Revises: b6d2f8a4c517
+Create Date: 2026-10-17 17:00:00.000000
+
+PostgreSQL: access_logs (particionada) é copiada para uma tabela nova com os
+tipos compactos, partição por partição. Os meses anteriores ao atual não
+recebem escritas, então são copiados cada um na sua própria transação sem
+bloquear o portal. No fim, com a tabela antiga bloqueada só para escrita, o
+mês atual (e partições futuras/DEFAULT) é copiado, meses alterados durante a
+cópia são recopiados e as tabelas trocam de nome. access_reconnects é
+pequena e é convertida com ALTER TABLE.
+
+A versão anterior do app grava o hash em hex; numa coluna bytea isso vira 64
+bytes ASCII que as buscas da versão nova não encontram. Pare os workers
+antigos antes da migração; o trigger access_hash_hex_compat converte, por
+garantia, qualquer hex que ainda chegue (digests brutos têm 32 bytes).
+
+SQLite: ip/mac continuam texto; os hashes viram BLOB.
+
+Evite `flask search-index rebuild` e `flask retention run` durante a migração.
+"""
+from datetime import date
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c9f3a6e1d842'
+down_revision = 'b6d2f8a4c517'
+branch_labels = None
+depends_on = None
+
+
+COMPACT_COLUMNS = """
+    id integer NOT NULL DEFAULT nextval('access_logs_id_seq'),
+    nome varchar(500) NOT NULL,
+    email varchar(500) NOT NULL,
+    ip inet,
+    ip_hash bytea,
+    mac macaddr,
+    mac_hash bytea,
+    user_agent text,
+    email_bidx varchar(32),
+    access_id varchar(64) NOT NULL,
+    timestamp timestamp without time zone NOT NULL
+"""
+
+INDEXES = {
+    'ix_access_logs_timestamp': "(timestamp)",
+    'ix_access_logs_ip_hash': "(ip_hash)",
+    'ix_access_logs_mac_hash': "(mac_hash)",
+    'ix_access_logs_email_bidx': "(email_bidx)",
+    'idx_timestamp_id': "(timestamp, id)",
+}
+UNIQUE_INDEX = ('ix_access_logs_access_id', "(access_id, timestamp)")
+
+# Texto inválido vira NULL em vez de abortar a cópia
+HELPERS = [
+    """
+    CREATE FUNCTION pg_temp.try_inet(value text) RETURNS inet AS $$
+    BEGIN
+        RETURN NULLIF(value, '')::inet;
+    EXCEPTION WHEN others THEN
+        RETURN NULL;
+    END $$ LANGUAGE plpgsql IMMUTABLE
+    """,
+    """
+    CREATE FUNCTION pg_temp.try_macaddr(value text) RETURNS macaddr AS $$
+    BEGIN
+        RETURN NULLIF(value, '')::macaddr;
+    EXCEPTION WHEN others THEN
+        RETURN NULL;
+    END $$ LANGUAGE plpgsql IMMUTABLE
+    """,
+    """
+    CREATE FUNCTION pg_temp.try_digest(value text) RETURNS bytea AS $$
+        SELECT CASE WHEN value ~ '^[0-9a-f]{64}$' THEN decode(value, 'hex') END
+    $$ LANGUAGE sql IMMUTABLE
+    """,
+]
+
+HEX_COMPAT_FUNCTION = """
+CREATE FUNCTION access_hash_hex_compat() RETURNS trigger AS $$
+BEGIN
+    IF length(NEW.ip_hash) = 64 AND encode(NEW.ip_hash, 'escape') ~ '^[0-9a-f]{64}$' THEN
+        NEW.ip_hash := decode(encode(NEW.ip_hash, 'escape'), 'hex');
+    END IF;
+    IF length(NEW.mac_hash) = 64 AND encode(NEW.mac_hash, 'escape') ~ '^[0-9a-f]{64}$' THEN
+        NEW.mac_hash := decode(encode(NEW.mac_hash, 'escape'), 'hex');
+    END IF;
+    RETURN NEW;
+END $$ LANGUAGE plpgsql
+"""
+HEX_COMPAT_TABLES = ('access_logs', 'access_reconnects')
+
+COPY_COLUMNS = "id, nome, email, ip, ip_hash, mac, mac_hash, user_agent, email_bidx, access_id, timestamp"
+CONVERTED = (
+    "id, nome, email, pg_temp.try_inet(ip), pg_temp.try_digest(ip_hash), "
+    "pg_temp.try_macaddr(mac), pg_temp.try_digest(mac_hash), user_agent, email_bidx, access_id, timestamp"
+)
+
+
+def _partitions(bind, parent):
+    """[(nome, limites)] das partições de `parent`"""
+    return bind.execute(sa.text(
+        "SELECT c.relname, pg_get_expr(c.relpartbound, c.oid) FROM pg_inherits i "
+        "JOIN pg_class c ON c.oid = i.inhrelid JOIN pg_class p ON p.oid = i.inhparent "
+        "WHERE p.relname = :parent ORDER BY c.relname"
+    ), {'parent': parent}).fetchall()
+
+
+def _is_historical(name, current):
+    """Partições mensais anteriores ao mês atual (não recebem mais escritas)"""
+    suffix = name[len('access_logs_'):]
+    if not suffix.isdigit() or len(suffix) != 6:
+        return False
+    return date(int(suffix[:4]), int(suffix[4:]), 1) < current
+
+
+def _upgrade_postgresql():
+    bind = op.get_bind()
+    for ddl in HELPERS:
+        op.execute(ddl)
+
+    current = date.today().replace(day=1)
+    partitions = _partitions(bind, 'access_logs')
+    op.execute(
+        f"CREATE TABLE access_logs_compact ({COMPACT_COLUMNS}, PRIMARY KEY (id, timestamp)) "
+        "PARTITION BY RANGE (timestamp)"
+    )
+    for name, bounds in partitions:
+        op.execute(f"CREATE TABLE {name.replace('access_logs', 'access_logs_compact', 1)} "
+                   f"PARTITION OF access_logs_compact {bounds}")
+
+    # 1) Meses fechados: uma transação por partição, portal continua no ar
+    historical = [name for name, _ in partitions if _is_historical(name, current)]
+    with op.get_context().autocommit_block():
+        for name in historical:
+            op.execute(f"INSERT INTO {name.replace('access_logs', 'access_logs_compact', 1)} "
+                       f"({COPY_COLUMNS}) SELECT {CONVERTED} FROM {name}")
+        # Índices depois da carga (mais rápido); a tabela nova ainda não é usada
+        for index, columns in INDEXES.items():
+            op.execute(f"CREATE INDEX {index}_compact ON access_logs_compact {columns}")
+        op.execute(f"CREATE UNIQUE INDEX {UNIQUE_INDEX[0]}_compact ON access_logs_compact {UNIQUE_INDEX[1]}")
+
+    # 2) Troca: escritas aguardam só a cópia do mês atual
+    op.execute("LOCK TABLE access_logs IN EXCLUSIVE MODE")
+    for name in historical:
+        target = name.replace('access_logs', 'access_logs_compact', 1)
+        old = bind.execute(sa.text(f"SELECT count(*), max(id) FROM {name}")).one()
+        new = bind.execute(sa.text(f"SELECT count(*), max(id) FROM {target}")).one()
+        if tuple(old) != tuple(new):
+            op.execute(f"DELETE FROM {target}")
+            op.execute(f"INSERT INTO {target} ({COPY_COLUMNS}) SELECT {CONVERTED} FROM {name}")
+    for name, _ in partitions:
+        if name not in historical:
+            op.execute(f"INSERT INTO {name.replace('access_logs', 'access_logs_compact', 1)} "
+                       f"({COPY_COLUMNS}) SELECT {CONVERTED} FROM {name}")
+
+    op.execute("ALTER SEQUENCE access_logs_id_seq OWNED BY NONE")
+    op.execute("DROP TABLE access_logs")
+    op.execute("ALTER TABLE access_logs_compact RENAME TO access_logs")
+    op.execute("ALTER TABLE access_logs RENAME CONSTRAINT access_logs_compact_pkey TO access_logs_pkey")
+    for name, _ in partitions:
+        op.execute(f"ALTER TABLE {name.replace('access_logs', 'access_logs_compact', 1)} RENAME TO {name}")
+    for index in list(INDEXES) + [UNIQUE_INDEX[0]]:
+        op.execute(f"ALTER INDEX {index}_compact RENAME TO {index}")
+    op.execute("ALTER SEQUENCE access_logs_id_seq OWNED BY access_logs.id")
+
+    op.execute(
+        "ALTER TABLE access_reconnects "
+        "ALTER COLUMN ip TYPE inet USING pg_temp.try_inet(ip), "
+        "ALTER COLUMN ip_hash TYPE bytea USING pg_temp.try_digest(ip_hash), "
+        "ALTER COLUMN mac_hash TYPE bytea USING pg_temp.try_digest(mac_hash)"
+    )
+
+    # Hex gravado por workers antigos ainda no ar vira digest bruto
+    op.execute(HEX_COMPAT_FUNCTION)
+    for table in HEX_COMPAT_TABLES:
+        op.execute(
+            f"CREATE TRIGGER {table}_hash_hex_compat BEFORE INSERT OR UPDATE OF ip_hash, mac_hash "
+            f"ON {table} FOR EACH ROW EXECUTE FUNCTION access_hash_hex_compat()"
+        )
+
+
+def _convert_sqlite(table, to_binary, batch_size=1000):
+    """Hashes hex <-> bytes em lotes (SQLite guarda qualquer tipo em qualquer coluna)"""
+    bind = op.get_bind()
+    columns = ('ip_hash', 'mac_hash')
+    last_id = 0
+    while True:
+        rows = bind.execute(sa.text(
+            f"SELECT id, {', '.join(columns)} FROM {table} WHERE id > :last ORDER BY id LIMIT :limit"
+        ), {'last': last_id, 'limit': batch_size}).fetchall()
+        if not rows:
+            return
+        for row in rows:
+            values = {}
+            for column, value in zip(columns, row[1:]):
+                if value is None:
+                    values[column] = None
+                elif to_binary:
+                    values[column] = bytes.fromhex(value) if isinstance(value, str) else value
+                else:
+                    values[column] = bytes(value).hex() if isinstance(value, bytes) else value
+            bind.execute(sa.text(
+                f"UPDATE {table} SET ip_hash = :ip_hash, mac_hash = :mac_hash WHERE id = :id"
+            ), dict(values, id=row[0]))
+        last_id = rows[-1][0]
+
+
+def upgrade():
+    if op.get_bind().dialect.name == 'postgresql':
+        _upgrade_postgresql()
+        return
+
+    for table, mac_nullable in (('access_logs', True), ('access_reconnects', False)):
+        _convert_sqlite(table, to_binary=True)
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.alter_column('ip_hash', existing_type=sa.String(length=64), type_=sa.LargeBinary(),
+                                  existing_nullable=True)
+            batch_op.alter_column('mac_hash', existing_type=sa.String(length=64), type_=sa.LargeBinary(),
+                                  existing_nullable=mac_nullable)
+
+
+def downgrade():
+    if op.get_bind().dialect.name == 'postgresql':
+        for table in HEX_COMPAT_TABLES:
+            op.execute(f"DROP TRIGGER IF EXISTS {table}_hash_hex_compat ON {table}")
+        op.execute("DROP FUNCTION IF EXISTS access_hash_hex_compat()")
+        # Volta a texto com ALTER TABLE (reescreve a tabela: janela de manutenção)
+        for table in ('access_logs', 'access_reconnects'):
+            op.execute(
+                f"ALTER TABLE {table} "
+                "ALTER COLUMN ip TYPE varchar(45) USING host(ip), "
+                "ALTER COLUMN ip_hash TYPE varchar(64) USING encode(ip_hash, 'hex'), "
+                "ALTER COLUMN mac_hash TYPE varchar(64) USING encode(mac_hash, 'hex')"
+            )
+        op.execute("ALTER TABLE access_logs ALTER COLUMN mac TYPE varchar(17) USING upper(mac::text)")
+        return
+
+    for table, mac_nullable in (('access_logs', True), ('access_reconnects', False)):
+        _convert_sqlite(table, to_binary=False)
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.alter_column('ip_hash', existing_type=sa.LargeBinary(), type_=sa.String(length=64),
+                                  existing_nullable=True)
+            batch_op.alter_column('mac_hash', existing_type=sa.LargeBinary(), type_=sa.String(length=64),
+                                  existing_nullable=mac_nullable)
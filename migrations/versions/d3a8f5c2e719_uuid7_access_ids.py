@@ -0,0 +1,139 @@
+"""Store access_id as a time-ordered UUID (v7) and drop idx_timestamp_id
+
+Revision ID: d3a8f5c2e719
+Revises: c9f3a6e1d842
+Create Date: 2026-10-17 18:00:00.000000
+
+access_id passa de texto ("20261017120000_<hex>", até 64 caracteres) para
+UUIDv7: UUID nativo de 16 bytes no PostgreSQL, CHAR(32) no SQLite. Os
+primeiros 48 bits são o instante em milissegundos, então o access_id ordena
+como o timestamp e vira o cursor da paginação do painel; o índice composto
+idx_timestamp_id (timestamp, id) deixa de ser usado e é removido.
+
+IDs antigos viram UUIDv7 determinísticos: milissegundos do timestamp do
+registro + md5 do id antigo nos bits aleatórios. access_log_search_tokens
+usa o próprio timestamp (igual ao do registro); access_reconnects busca o
+timestamp em access_logs.
+
+PostgreSQL: ALTER TABLE reescreve access_logs e os tokens com a tabela
+bloqueada: execute em janela de manutenção. O downgrade volta a texto, mas
+os ids continuam no formato UUID.
+"""
+from datetime import datetime, timedelta
+import hashlib
+import uuid
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd3a8f5c2e719'
+down_revision = 'c9f3a6e1d842'
+branch_labels = None
+depends_on = None
+
+
+UNIX_EPOCH = datetime(1970, 1, 1)
+TABLES = ('access_logs', 'access_log_search_tokens', 'access_reconnects')
+
+# Mesma conversão de _legacy_uuid(), em SQL
+LEGACY_UUID = """
+    CREATE FUNCTION pg_temp.legacy_uuid(ts timestamp, old text) RETURNS uuid AS $$
+        SELECT (lpad(to_hex(floor(extract(epoch FROM ts) * 1000)::bigint), 12, '0')
+                || '7' || substr(h, 1, 3) || '8' || substr(h, 4, 15))::uuid
+        FROM md5(old) AS h
+    $$ LANGUAGE sql IMMUTABLE
+"""
+UUID_PATTERN = "'^[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}$'"
+# Ids já em formato UUID (banco que voltou por downgrade) são mantidos
+CONVERTED = (
+    f"CASE WHEN access_id ~ {UUID_PATTERN} THEN access_id::uuid "
+    "ELSE pg_temp.legacy_uuid(timestamp, access_id) END"
+)
+
+
+def _legacy_uuid(timestamp, old):
+    """UUIDv7 (hex sem hífens, formato do sa.Uuid no SQLite) para um id antigo"""
+    if len(old) == 36:
+        # Já é UUID (banco que voltou por downgrade)
+        return uuid.UUID(old).hex
+    if isinstance(timestamp, str):
+        timestamp = datetime.fromisoformat(timestamp)
+    millis = (timestamp - UNIX_EPOCH) // timedelta(milliseconds=1)
+    digest = hashlib.md5(old.encode()).hexdigest()
+    return f"{millis:012x}7{digest[:3]}8{digest[3:18]}"
+
+
+def _upgrade_postgresql():
+    op.execute(LEGACY_UUID)
+    op.execute("DROP INDEX IF EXISTS idx_timestamp_id")
+
+    # Reconexões apontam para o registro original: converte pelo timestamp dele
+    op.execute(
+        "UPDATE access_reconnects r SET access_id = pg_temp.legacy_uuid(l.timestamp, l.access_id)::text "
+        f"FROM access_logs l WHERE l.access_id = r.access_id AND l.access_id !~ {UUID_PATTERN}"
+    )
+    for table in ('access_reconnects', 'access_log_search_tokens', 'access_logs'):
+        op.execute(f"ALTER TABLE {table} ALTER COLUMN access_id TYPE uuid USING {CONVERTED}")
+
+
+def _convert_sqlite(batch_size=1000):
+    """Troca os ids antigos pelos UUIDv7 em lotes (reconexões seguem o registro)"""
+    bind = op.get_bind()
+    last_id = 0
+    while True:
+        rows = bind.execute(sa.text(
+            "SELECT id, access_id, timestamp FROM access_logs WHERE id > :last ORDER BY id LIMIT :limit"
+        ), {'last': last_id, 'limit': batch_size}).fetchall()
+        if not rows:
+            break
+        for log_id, old, timestamp in rows:
+            new = _legacy_uuid(timestamp, old)
+            bind.execute(sa.text("UPDATE access_logs SET access_id = :new WHERE id = :id"),
+                         {'new': new, 'id': log_id})
+            bind.execute(sa.text("UPDATE access_reconnects SET access_id = :new WHERE access_id = :old"),
+                         {'new': new, 'old': old})
+        last_id = rows[-1][0]
+
+    # Tokens (mesmo timestamp do registro) e reconexões órfãs: timestamp próprio
+    for table in ('access_log_search_tokens', 'access_reconnects'):
+        rows = bind.execute(sa.text(
+            f"SELECT id, access_id, timestamp FROM {table} WHERE length(access_id) != 32"
+        )).fetchall()
+        for row_id, old, timestamp in rows:
+            bind.execute(sa.text(f"UPDATE {table} SET access_id = :new WHERE id = :id"),
+                         {'new': _legacy_uuid(timestamp, old), 'id': row_id})
+
+
+def upgrade():
+    if op.get_bind().dialect.name == 'postgresql':
+        _upgrade_postgresql()
+        return
+
+    with op.batch_alter_table('access_logs', schema=None) as batch_op:
+        batch_op.drop_index('idx_timestamp_id')
+    _convert_sqlite()
+    for table in TABLES:
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.alter_column('access_id', existing_type=sa.String(length=64),
+                                  type_=sa.Uuid(as_uuid=False), existing_nullable=False)
+
+
+def downgrade():
+    if op.get_bind().dialect.name == 'postgresql':
+        for table in TABLES:
+            op.execute(f"ALTER TABLE {table} ALTER COLUMN access_id TYPE varchar(64) USING access_id::text")
+        op.execute("CREATE INDEX idx_timestamp_id ON access_logs (timestamp, id)")
+        return
+
+    bind = op.get_bind()
+    for table in TABLES:
+        for row_id, value in bind.execute(sa.text(f"SELECT id, access_id FROM {table}")).fetchall():
+            bind.execute(sa.text(f"UPDATE {table} SET access_id = :value WHERE id = :id"),
+                         {'value': str(uuid.UUID(value)), 'id': row_id})
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.alter_column('access_id', existing_type=sa.Uuid(as_uuid=False),
+                                  type_=sa.String(length=64), existing_nullable=False)
+    with op.batch_alter_table('access_logs', schema=None) as batch_op:
+        batch_op.create_index('idx_timestamp_id', ['timestamp', 'id'], unique=False)
@@ -0,0 +1,37 @@
+"""Add access_stats_rollup table for pre-aggregated dashboard stats
+
+Revision ID: d81f3b6c2e57
+Revises: c4d2a7e9f013
+Create Date: 2026-10-17 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd81f3b6c2e57'
+down_revision = 'c4d2a7e9f013'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('access_stats_rollup',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('granularity', sa.String(length=8), nullable=False),
+    sa.Column('bucket_start', sa.DateTime(), nullable=False),
+    sa.Column('access_count', sa.Integer(), nullable=False),
+    sa.Column('ip_sketch', sa.LargeBinary(), nullable=True),
+    sa.Column('mac_sketch', sa.LargeBinary(), nullable=True),
+    sa.Column('covered_until', sa.DateTime(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('granularity', 'bucket_start', name='uq_rollup_bucket')
+    )
+
+    # Histórico existente: flask --app wsgi:app stats refresh
+
+
+def downgrade():
+    op.drop_table('access_stats_rollup')
@@ -0,0 +1,125 @@
+"""Partition access_logs by month on timestamp (PostgreSQL)
+
+Revision ID: e4a9c1d7b352
+Revises: d81f3b6c2e57
+Create Date: 2026-10-17 11:00:00.000000
+
+Recria access_logs como tabela particionada (RANGE em timestamp) com uma
+partição por mês desde o registro mais antigo até 3 meses à frente, mais uma
+partição DEFAULT de segurança. Os dados são copiados dentro da transação da
+migração, que bloqueia a tabela: execute em janela de manutenção.
+
+Em outros bancos (SQLite em desenvolvimento/testes) não faz nada.
+Novas partições: flask --app wsgi:app retention ensure-partitions
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e4a9c1d7b352'
+down_revision = 'd81f3b6c2e57'
+branch_labels = None
+depends_on = None
+
+
+COLUMNS = """
+    id integer NOT NULL DEFAULT nextval('access_logs_id_seq'),
+    nome varchar(500) NOT NULL,
+    email varchar(500) NOT NULL,
+    ip varchar(45),
+    ip_hash varchar(64),
+    mac varchar(17),
+    mac_hash varchar(64),
+    user_agent text,
+    email_bidx varchar(32),
+    access_id varchar(64) NOT NULL,
+    timestamp timestamp without time zone NOT NULL
+"""
+
+INDEXES = [
+    "CREATE INDEX ix_access_logs_timestamp ON access_logs (timestamp)",
+    "CREATE INDEX ix_access_logs_ip_hash ON access_logs (ip_hash)",
+    "CREATE INDEX ix_access_logs_mac_hash ON access_logs (mac_hash)",
+    "CREATE INDEX ix_access_logs_email_bidx ON access_logs (email_bidx)",
+    "CREATE INDEX idx_timestamp_id ON access_logs (timestamp, id)",
+    # Índices únicos em tabela particionada precisam incluir a chave de partição
+    "CREATE UNIQUE INDEX ix_access_logs_access_id ON access_logs (access_id, timestamp)",
+]
+
+OLD_INDEXES = [
+    'ix_access_logs_timestamp',
+    'ix_access_logs_ip_hash',
+    'ix_access_logs_mac_hash',
+    'ix_access_logs_email_bidx',
+    'idx_timestamp_id',
+    'ix_access_logs_access_id',
+]
+
+CREATE_MONTHLY_PARTITIONS = """
+DO $$
+DECLARE
+    first_month date := date_trunc('month', COALESCE(
+        (SELECT min(timestamp) FROM access_logs_unpartitioned), now()))::date;
+    last_month date := (date_trunc('month', now()) + interval '3 months')::date;
+    month date;
+BEGIN
+    month := first_month;
+    WHILE month <= last_month LOOP
+        EXECUTE format(
+            'CREATE TABLE IF NOT EXISTS %I PARTITION OF access_logs FOR VALUES FROM (%L) TO (%L)',
+            'access_logs_' || to_char(month, 'YYYYMM'), month, (month + interval '1 month')::date
+        );
+        month := (month + interval '1 month')::date;
+    END LOOP;
+END $$;
+"""
+
+
+def upgrade():
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+
+    op.execute("ALTER TABLE access_logs RENAME TO access_logs_unpartitioned")
+    op.execute("ALTER TABLE access_logs_unpartitioned RENAME CONSTRAINT access_logs_pkey TO access_logs_unpartitioned_pkey")
+    for name in OLD_INDEXES:
+        op.execute(f"DROP INDEX IF EXISTS {name}")
+    op.execute("ALTER SEQUENCE access_logs_id_seq OWNED BY NONE")
+
+    op.execute(f"CREATE TABLE access_logs ({COLUMNS}, PRIMARY KEY (id, timestamp)) PARTITION BY RANGE (timestamp)")
+    op.execute("ALTER SEQUENCE access_logs_id_seq OWNED BY access_logs.id")
+    for ddl in INDEXES:
+        op.execute(ddl)
+
+    op.execute(CREATE_MONTHLY_PARTITIONS)
+    op.execute("CREATE TABLE access_logs_default PARTITION OF access_logs DEFAULT")
+
+    op.execute(
+        "INSERT INTO access_logs (id, nome, email, ip, ip_hash, mac, mac_hash, user_agent, "
+        "email_bidx, access_id, timestamp) "
+        "SELECT id, nome, email, ip, ip_hash, mac, mac_hash, user_agent, email_bidx, access_id, timestamp "
+        "FROM access_logs_unpartitioned"
+    )
+    op.execute("DROP TABLE access_logs_unpartitioned")
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+
+    op.execute("ALTER TABLE access_logs RENAME TO access_logs_partitioned")
+    for name in OLD_INDEXES:
+        op.execute(f"DROP INDEX IF EXISTS {name}")
+    op.execute("ALTER SEQUENCE access_logs_id_seq OWNED BY NONE")
+
+    op.execute(f"CREATE TABLE access_logs ({COLUMNS}, PRIMARY KEY (id))")
+    op.execute("ALTER SEQUENCE access_logs_id_seq OWNED BY access_logs.id")
+    for ddl in INDEXES[:-1]:
+        op.execute(ddl)
+    op.execute("CREATE UNIQUE INDEX ix_access_logs_access_id ON access_logs (access_id)")
+
+    op.execute(
+        "INSERT INTO access_logs SELECT id, nome, email, ip, ip_hash, mac, mac_hash, user_agent, "
+        "email_bidx, access_id, timestamp FROM access_logs_partitioned"
+    )
+    op.execute("DROP TABLE access_logs_partitioned")
@@ -4,7 +4,7 @@
  */
 
 document.addEventListener('DOMContentLoaded', function() {
-    const form = document.querySelector('form');
+    const form = document.querySelector('form:not(.returning-visitor)');
     const nomeInput = document.getElementById('nome');
     const emailInput = document.getElementById('email');
     const termosInput = document.getElementById('termos');
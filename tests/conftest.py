@@ -18,6 +18,14 @@ os.environ['DATABASE_URL'] = 'sqlite:///:memory:'
 os.environ['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
 os.environ['RATELIMIT_ENABLED'] = 'false'
 os.environ['SECRET_KEY'] = 'test-secret-key-for-testing-only'
+os.environ['MAIL_BACKEND'] = 'debug'
+os.environ['MAIL_OUTBOX_WORKER'] = 'false'
+os.environ['STATS_ROLLUP_INTERVAL'] = '0'
+# Custo fixo (padrão do werkzeug) em vez da calibração na importação
+os.environ['PASSWORD_HASH_CALIBRATE'] = 'false'
+# Redis é um MagicMock nos testes: falhas de login ficam na memória
+os.environ['LOGIN_ATTEMPT_STORAGE'] = 'memory'
+os.environ['SECURITY_EVENT_FILE'] = os.path.join(tempfile.gettempdir(), 'wifi-portal-tests', 'security_events.jsonl')
 
 # Mock do Redis ANTES de importar a aplicação
 sys.modules['redis'] = MagicMock()
@@ -25,6 +33,7 @@ sys.modules['redis'] = MagicMock()
 from app_simple import app, create_default_user, db
 from app.security import security_manager
 from app.data_manager import data_manager
+from app.login_attempts import login_attempts
 
 
 @pytest.fixture
@@ -48,6 +57,7 @@ def client():
     
     # Reconfigura limiter para usar memória ao invés de Redis
     security_manager.limiter.enabled = False
+    login_attempts.clear()
     
     with app.test_client() as client:
         with app.app_context():
@@ -89,6 +99,7 @@ def client_with_csrf():
     
     # Desabilita limiter
     security_manager.limiter.enabled = False
+    login_attempts.clear()
     
     with app.test_client() as client:
         with app.app_context():
@@ -0,0 +1,94 @@
+"""
+Testes dos IDs de Acesso Ordenados pelo Tempo (UUIDv7)
+Prioridade: MÉDIA 🟡
+
+Testa:
+- Formato UUIDv7 e ordem monotônica dentro do processo
+- Instante embutido no access_id igual ao timestamp gravado
+- access_id como cursor da paginação (e cursores inválidos)
+- UUID nativo no PostgreSQL e índice idx_timestamp_id removido
+"""
+
+import uuid
+import pytest
+from datetime import datetime
+from sqlalchemy.dialects import postgresql, sqlite
+
+from app.data_manager import data_manager
+from app.models import AccessLog, uuid7
+
+
+def test_access_id_is_uuid7():
+    """
+    access_id é um UUID versão 7 em texto canônico
+    """
+    value = uuid.UUID(AccessLog.generate_access_id())
+
+    assert value.version == 7
+    assert value.variant == uuid.RFC_4122
+
+
+@pytest.mark.critical
+def test_access_ids_sort_by_creation_time():
+    """
+    CRÍTICO: IDs gerados em sequência ordenam como texto e como UUID
+    """
+    ids = [uuid7() for _ in range(2000)]
+
+    assert ids == sorted(ids)
+    assert len(set(ids)) == len(ids)
+    assert [uuid.UUID(value) for value in ids] == sorted(uuid.UUID(value) for value in ids)
+
+
+def test_access_id_embeds_given_moment():
+    """
+    generate_access_id(moment) embute o instante (precisão de milissegundos)
+    """
+    moment = datetime(2026, 3, 10, 12, 30, 45, 678901)
+    older = AccessLog.generate_access_id(datetime(2025, 1, 1))
+
+    access_id = AccessLog.generate_access_id(moment)
+
+    assert AccessLog.access_id_time(access_id) == moment.replace(microsecond=678000)
+    assert older < access_id
+
+
+def test_logged_access_timestamp_matches_id(client):
+    """
+    Registro gravado tem timestamp igual ao instante do access_id
+    """
+    data_manager.log_access_encrypted({'nome': 'Visitante', 'email': 'v@example.com', 'ip': '10.0.0.1'})
+
+    record = AccessLog.query.one()
+    assert record.timestamp == AccessLog.access_id_time(record.access_id)
+
+
+def test_cursor_is_last_access_id(client):
+    """
+    next_cursor é o access_id do último item; cursores que não são UUIDv7 são recusados
+    """
+    for i in range(3):
+        data_manager.log_access_encrypted({'nome': f'Visitante {i}', 'email': 'v@example.com', 'ip': '10.0.0.1'})
+
+    first = data_manager.get_access_logs_page(limit=2)
+    second = data_manager.get_access_logs_page(cursor=first['next_cursor'], limit=2)
+
+    assert first['next_cursor'] == first['items'][-1]['access_id']
+    assert [item['nome'] for item in first['items'] + second['items']] == [
+        'Visitante 2', 'Visitante 1', 'Visitante 0'
+    ]
+    assert second['next_cursor'] is None
+    for cursor in ('nao-e-um-cursor', str(uuid.uuid4())):
+        with pytest.raises(ValueError):
+            data_manager.decode_cursor(cursor)
+
+
+def test_native_uuid_and_dropped_index():
+    """
+    UUID nativo no PostgreSQL (CHAR(32) no SQLite) e sem idx_timestamp_id
+    """
+    column = AccessLog.__table__.c.access_id
+
+    assert column.type.compile(dialect=postgresql.dialect()) == 'UUID'
+    assert column.type.compile(dialect=sqlite.dialect()) == 'CHAR(32)'
+    assert 'idx_timestamp_id' not in {index.name for index in AccessLog.__table__.indexes}
@@ -0,0 +1,111 @@
+"""
+Testes da API Paginada de Logs do Admin
+Prioridade: ALTA 🟠
+
+Testa:
+- Autenticação obrigatória
+- Paginação por cursor (access_id UUIDv7) sem repetição nem perda de registros
+- Busca combinada com paginação
+- Cursor inválido
+"""
+
+import pytest
+from datetime import datetime, timedelta
+
+from app.data_manager import data_manager
+from app.models import AccessLog, db
+
+
+@pytest.fixture
+def muitos_registros(client):
+    """Cria 25 acessos, alguns com o mesmo timestamp"""
+    base = datetime.utcnow().replace(microsecond=0)
+    for i in range(25):
+        db.session.add(AccessLog(
+            nome=f'Visitante {i:02d}',
+            email=f'visitante{i}@example.com',
+            ip=f'10.0.1.{i}',
+            # Timestamps repetidos em pares: o desempate fica com os bits aleatórios do access_id
+            access_id=AccessLog.generate_access_id(base - timedelta(minutes=i // 2)),
+            timestamp=base - timedelta(minutes=i // 2),
+        ))
+    db.session.commit()
+
+
+def test_logs_api_requires_authentication(client):
+    """
+    API de logs deve exigir login admin
+    """
+    response = client.get('/admin/api/logs')
+
+    assert response.status_code == 302
+    assert '/admin/login' in response.location
+
+
+@pytest.mark.critical
+def test_logs_api_pages_cover_all_rows(authenticated_client, muitos_registros):
+    """
+    CRÍTICO: Percorrer todas as páginas deve retornar cada registro uma vez, em ordem
+    """
+    seen = []
+    cursor = None
+    while True:
+        url = '/admin/api/logs?limit=10' + (f'&cursor={cursor}' if cursor else '')
+        response = authenticated_client.get(url)
+        assert response.status_code == 200
+        page = response.get_json()
+        assert len(page['items']) <= 10
+        seen.extend(page['items'])
+        cursor = page['next_cursor']
+        if not cursor:
+            break
+
+    assert len(seen) == 25
+    assert len({item['access_id'] for item in seen}) == 25
+    timestamps = [item['timestamp'] for item in seen]
+    assert timestamps == sorted(timestamps, reverse=True)
+
+
+def test_logs_api_returns_decrypted_page(authenticated_client, muitos_registros):
+    """
+    Itens da página devem vir descriptografados
+    """
+    page = authenticated_client.get('/admin/api/logs?limit=1').get_json()
+
+    assert page['items'][0]['nome'].startswith('Visitante')
+    assert page['next_cursor']
+
+
+def test_logs_api_search_by_name(authenticated_client, muitos_registros):
+    """
+    Busca por nome deve usar o índice e respeitar a paginação
+    """
+    page = authenticated_client.get('/admin/api/logs?q=visit&field=nome&limit=20').get_json()
+
+    assert len(page['items']) == 20
+    assert page['next_cursor']
+
+
+def test_logs_api_invalid_cursor(authenticated_client):
+    """
+    Cursor adulterado deve retornar 400
+    """
+    response = authenticated_client.get('/admin/api/logs?cursor=nao-e-um-cursor')
+
+    assert response.status_code == 400
+
+
+def test_admin_page_renders_first_page_only(authenticated_client, muitos_registros):
+    """
+    Painel deve renderizar apenas a primeira página da tabela
+    """
+    authenticated_client.application.config['ADMIN_PAGE_SIZE'] = 5
+    try:
+        response = authenticated_client.get('/admin')
+    finally:
+        authenticated_client.application.config['ADMIN_PAGE_SIZE'] = 50
+
+    html = response.data.decode('utf-8')
+    assert response.status_code == 200
+    assert html.count('name-col cell-truncate">Visitante') == 5
+    assert 'data-next-cursor=""' not in html
@@ -0,0 +1,120 @@
+"""
+Testes do Fingerprint de Arquivos Estáticos
+Prioridade: MÉDIA 🟡
+
+Testa:
+- Manifesto com nomes derivados do conteúdo e variantes comprimidas
+- Referências url() do CSS apontando para as imagens com hash
+- url_for('static') reescrito e cache imutável nos arquivos com hash
+"""
+
+import os
+import gzip
+import json
+import shutil
+import pytest
+
+from flask import url_for
+
+from app.assets import DIST_DIR, MANIFEST_NAME, asset_manifest, build_manifest
+from app.page_cache import page_cache
+from app_simple import app
+
+
+@pytest.fixture
+def static_copy(tmp_path):
+    folder = tmp_path / 'static'
+    shutil.copytree(app.static_folder, folder, ignore=shutil.ignore_patterns(DIST_DIR))
+    return str(folder)
+
+
+@pytest.fixture
+def built_assets(client):
+    """Build no static/ real (static/dist é ignorado pelo git)"""
+    build_manifest(app.static_folder)
+    asset_manifest.load()
+    page_cache.clear()
+    yield asset_manifest
+    shutil.rmtree(os.path.join(app.static_folder, DIST_DIR), ignore_errors=True)
+    asset_manifest.load()
+    page_cache.clear()
+
+
+def test_manifest_maps_files_to_content_hashes(static_copy):
+    """
+    Cada arquivo ganha uma cópia com hash do conteúdo no nome
+    """
+    manifest = build_manifest(static_copy)
+
+    assert manifest['js/main.js'].startswith('dist/js/main.')
+    assert manifest['js/main.js'].endswith('.js')
+    with open(os.path.join(static_copy, DIST_DIR, MANIFEST_NAME)) as handle:
+        assert json.load(handle) == manifest
+    # Build reproduzível: mesmo conteúdo, mesmos nomes
+    assert build_manifest(static_copy) == manifest
+
+
+def test_changed_content_changes_hash(static_copy):
+    """
+    Alterar o arquivo deve gerar outro nome (invalida o cache dos clientes)
+    """
+    before = build_manifest(static_copy)['js/main.js']
+    with open(os.path.join(static_copy, 'js', 'main.js'), 'a') as handle:
+        handle.write('\n// alterado\n')
+
+    assert build_manifest(static_copy)['js/main.js'] != before
+
+
+def test_compressible_files_get_gzip_variant(static_copy):
+    """
+    CSS/JS ganham .gz idêntico ao original; PNG não é recomprimido
+    """
+    manifest = build_manifest(static_copy)
+    css = os.path.join(static_copy, manifest['css/style.css'])
+
+    with open(css, 'rb') as original, gzip.open(css + '.gz') as compressed:
+        assert compressed.read() == original.read()
+    assert not os.path.exists(os.path.join(static_copy, manifest['images/favicon.png']) + '.gz')
+
+
+def test_css_references_point_to_hashed_images(static_copy):
+    """
+    url() do CSS deve apontar para a imagem com hash (relativo a dist/css)
+    """
+    manifest = build_manifest(static_copy)
+    with open(os.path.join(static_copy, manifest['css/style.css']), encoding='utf-8') as handle:
+        css = handle.read()
+
+    image = manifest['images/centro-cultural-pb.png']
+    assert f'../{image[len(DIST_DIR) + 1:]}' in css
+    assert '/static/images/centro-cultural-pb.png' not in css
+
+
+@pytest.mark.critical
+def test_templates_use_hashed_urls_with_immutable_cache(built_assets, client):
+    """
+    CRÍTICO: Páginas devem referenciar os nomes com hash, servidos com cache imutável
+    """
+    with app.test_request_context():
+        url = url_for('static', filename='css/style.css')
+    assert url == '/static/' + built_assets.manifest['css/style.css']
+    assert url in client.get('/termos').data.decode('utf-8')
+
+    response = client.get(url)
+    assert response.status_code == 200
+    assert 'immutable' in response.headers['Cache-Control']
+    assert 'max-age=31536000' in response.headers['Cache-Control']
+
+    # Arquivo original continua acessível, sem cache imutável
+    original = client.get('/static/css/style.css')
+    assert original.status_code == 200
+    assert 'immutable' not in original.headers.get('Cache-Control', '')
+
+
+def test_without_manifest_urls_are_unchanged(client):
+    """
+    Sem build (desenvolvimento) url_for aponta para os arquivos originais
+    """
+    asset_manifest.load()
+    with app.test_request_context():
+        assert url_for('static', filename='js/main.js') == '/static/js/main.js'
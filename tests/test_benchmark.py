@@ -0,0 +1,53 @@
+"""
+Testes do Harness de Benchmark
+Prioridade: BAIXA 🟢
+
+Testa:
+- Percentis e detecção de regressões
+- Execução sequencial dos cenários contra a aplicação
+"""
+
+from app_simple import app
+from app.models import AccessLog, db
+from tests.benchmark.bench_portal import StatementCounter, compare, percentile, run_scenario
+
+
+def test_percentile_nearest_rank():
+    """
+    Percentis devem seguir o método nearest-rank
+    """
+    values = [float(v) for v in range(1, 101)]
+
+    assert percentile(values, 50) == 50.0
+    assert percentile(values, 95) == 95.0
+    assert percentile(values, 99) == 99.0
+    assert percentile([], 95) == 0.0
+
+
+def test_compare_flags_regressions():
+    """
+    Latência, vazão, comandos SQL e erros piores que a baseline são regressões
+    """
+    baseline = {'login': {'p95_ms': 10.0, 'throughput_rps': 100.0, 'statements_per_request': 3.0, 'errors': 0}}
+    ok = {'login': {'p95_ms': 11.0, 'throughput_rps': 95.0, 'statements_per_request': 3.0, 'errors': 0}}
+    worse = {'login': {'p95_ms': 20.0, 'throughput_rps': 50.0, 'statements_per_request': 5.0, 'errors': 2}}
+
+    assert compare(ok, baseline) == []
+    assert len(compare(worse, baseline)) == 4
+
+
+def test_login_scenario_runs_against_app(client):
+    """
+    Cenário de login deve completar o fluxo com CSRF e gravar os acessos
+    """
+    counter = StatementCounter(db.engine)
+
+    try:
+        result = run_scenario(app, 'login', total=3, concurrency=1, counter=counter)
+    finally:
+        counter.close()
+
+    assert result['requests'] == 3
+    assert result['errors'] == 0
+    assert result['statements_per_request'] > 0
+    assert AccessLog.query.count() == 3
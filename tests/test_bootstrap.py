@@ -0,0 +1,110 @@
+"""
+Testes do Bootstrap do Admin
+Prioridade: ALTA 🟠
+
+Testa:
+- /admin/login sem consultas à tabela de usuários
+- Criação única do admin padrão (inclusive em corrida entre processos)
+- Flag por processo e comando `flask admin bootstrap`
+"""
+
+import pytest
+from unittest.mock import patch
+from sqlalchemy import event
+
+from app.bootstrap import AdminBootstrap, admin_bootstrap
+from app.models import User, db
+from app_simple import app
+
+
+@pytest.fixture
+def user_queries(client):
+    """Registra os SQL executados contra a tabela users"""
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if 'users' in statement:
+            statements.append(statement)
+
+    event.listen(db.engine, 'before_cursor_execute', record)
+    yield statements
+    event.remove(db.engine, 'before_cursor_execute', record)
+
+
+@pytest.mark.critical
+def test_admin_login_page_does_not_query_users(client, user_queries):
+    """
+    CRÍTICO: GET /admin/login não deve consultar a tabela de usuários
+    """
+    response = client.get('/admin/login')
+
+    assert response.status_code == 200
+    assert user_queries == []
+
+
+def test_ensure_default_admin_creates_once(client):
+    """
+    Admin padrão só é criado com a tabela vazia
+    """
+    User.query.delete()
+    db.session.commit()
+
+    assert admin_bootstrap.ensure_default_admin() is True
+    assert admin_bootstrap.ensure_default_admin() is False
+    assert User.query.filter_by(username='admin').count() == 1
+
+
+def test_concurrent_bootstrap_does_not_duplicate(client):
+    """
+    Processo que perde a corrida deve desistir sem duplicar o admin
+    """
+    # Simula outro worker que viu a tabela vazia antes do admin ser criado
+    with patch.object(db.session, 'query') as query:
+        query.return_value.first.return_value = None
+        assert admin_bootstrap.ensure_default_admin() is False
+
+    assert User.query.filter_by(username='admin').count() == 1
+
+
+def test_ensure_once_skips_database_after_first_run(client, user_queries):
+    """
+    Depois do primeiro bootstrap o processo não consulta mais o banco
+    """
+    bootstrap = AdminBootstrap(app)
+
+    bootstrap.ensure_once()
+    first_run = len(user_queries)
+    bootstrap.ensure_once()
+
+    assert bootstrap.done is True
+    assert first_run > 0
+    assert len(user_queries) == first_run
+
+
+def test_ensure_once_retries_when_database_not_ready(client):
+    """
+    Banco sem tabelas adia o bootstrap em vez de derrubar o worker
+    """
+    bootstrap = AdminBootstrap(app)
+
+    with patch.object(bootstrap, 'ensure_default_admin', side_effect=RuntimeError('no such table')):
+        bootstrap.ensure_once()
+    assert bootstrap.done is False
+
+    bootstrap.ensure_once()
+    assert bootstrap.done is True
+
+
+def test_bootstrap_cli_command(client):
+    """
+    `flask admin bootstrap` cria o admin após as migrations
+    """
+    User.query.delete()
+    db.session.commit()
+    runner = app.test_cli_runner()
+
+    result = runner.invoke(args=['admin', 'bootstrap'])
+    assert 'created' in result.output
+    result = runner.invoke(args=['admin', 'bootstrap'])
+    assert 'nothing to do' in result.output
+    assert User.query.count() == 1
@@ -0,0 +1,92 @@
+"""
+Testes das Colunas Compactas de ip/mac/hashes
+Prioridade: MÉDIA 🟡
+
+Testa:
+- Hashes gravados como 32 bytes e lidos como hex
+- Normalização de IP e MAC (inválidos viram NULL)
+- Tipos nativos INET/MACADDR/BYTEA no PostgreSQL
+- Busca parcial e contagem de distintos sobre as colunas novas
+"""
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.dialects import postgresql, sqlite
+
+from app.data_manager import data_manager
+from app.models import AccessLog, InetAddress, MacAddress, db
+
+
+def log(ip, mac, nome='Visitante'):
+    data_manager.log_access_encrypted({'nome': nome, 'email': 'v@example.com', 'ip': ip, 'mac': mac})
+
+
+@pytest.mark.critical
+def test_hashes_are_stored_as_raw_digests(client):
+    """
+    CRÍTICO: Hash ocupa 32 bytes no banco e continua hex no Python
+    """
+    log('10.0.0.1', 'AA:BB:CC:DD:EE:FF')
+
+    stored = db.session.execute(text("SELECT ip_hash, mac_hash FROM access_logs")).one()
+    assert isinstance(stored.ip_hash, bytes) and len(stored.ip_hash) == 32
+    assert len(stored.mac_hash) == 32
+
+    record = AccessLog.query.one()
+    assert record.ip_hash == AccessLog.hash_value('10.0.0.1')
+    assert AccessLog.query.filter_by(mac_hash=AccessLog.hash_value('AA:BB:CC:DD:EE:FF')).count() == 1
+
+
+@pytest.mark.parametrize('raw, expected', [
+    ('aa-bb-cc-dd-ee-ff', 'AA:BB:CC:DD:EE:FF'),
+    ('aabb.ccdd.eeff', 'AA:BB:CC:DD:EE:FF'),
+    ('AABBCCDDEEFF', 'AA:BB:CC:DD:EE:FF'),
+    ('não-é-mac', None),
+    ('AA:BB:CC:DD:EE', None),
+])
+def test_mac_is_normalized(raw, expected):
+    """
+    MAC em qualquer formato do MikroTik é gravado como AA:BB:CC:DD:EE:FF
+    """
+    assert MacAddress.normalize(raw) == expected
+
+
+def test_invalid_ip_becomes_null(client):
+    """
+    IP inválido não quebra o registro (INET rejeitaria o texto)
+    """
+    log('999.1.1.1', 'AA:BB:CC:DD:EE:FF')
+    log('2001:DB8::1', None)
+
+    ips = sorted((r.ip or '') for r in AccessLog.query.all())
+    assert ips == ['', '2001:db8::1']
+
+
+def test_postgresql_uses_native_types():
+    """
+    No PostgreSQL as colunas usam INET, MACADDR e BYTEA; no SQLite, texto e BLOB
+    """
+    pg, lite = postgresql.dialect(), sqlite.dialect()
+    columns = AccessLog.__table__.c
+
+    assert isinstance(InetAddress().load_dialect_impl(pg), postgresql.INET)
+    assert isinstance(MacAddress().load_dialect_impl(pg), postgresql.MACADDR)
+    assert columns.ip_hash.type.compile(dialect=pg) == 'BYTEA'
+    assert columns.ip.type.compile(dialect=lite) == 'VARCHAR(45)'
+    assert columns.mac_hash.type.compile(dialect=lite) == 'BLOB'
+
+
+def test_search_and_distinct_counts(client):
+    """
+    Busca parcial por IP/MAC e contagem de distintos seguem funcionando
+    """
+    log('192.168.88.10', 'AA:BB:CC:DD:EE:01')
+    log('192.168.88.10', 'AA:BB:CC:DD:EE:02')
+    log('192.168.88.11', 'AA:BB:CC:DD:EE:02')
+
+    assert len(data_manager.search_access_logs('88.10', 'ip')) == 2
+    assert len(data_manager.search_access_logs('ee:02', 'mac')) == 2
+
+    stats = data_manager._live_user_stats()
+    assert stats['unique_ips'] == 2
+    assert stats['unique_macs'] == 2
@@ -6,6 +6,7 @@ Testa:
 - Token CSRF é gerado
 - Token CSRF é validado
 - Requisições sem token são bloqueadas
+- Token assinado sem estado (sem escrita na sessão), ligado ao cliente e à janela de tempo
 """
 
 import pytest
@@ -109,17 +110,17 @@ def test_post_with_valid_csrf_token_accepted(client_with_csrf):
 
 
 @pytest.mark.security
-def test_csrf_token_in_session(client):
+def test_csrf_token_not_in_session(client):
     """
-    Token CSRF deve ser armazenado na sessão
+    Token CSRF é assinado: o GET do login não grava a sessão (sem Set-Cookie)
     """
-    # Faz request para gerar token
-    client.get('/login')
+    response = client.get('/login')
     
-    # Verifica que token está na sessão
+    assert 'Set-Cookie' not in response.headers, "GET do login não deve emitir cookie de sessão"
     with client.session_transaction() as sess:
-        assert 'csrf_token' in sess, "Token CSRF deve estar na sessão"
-        assert len(sess['csrf_token']) > 20, "Token deve ter tamanho adequado"
+        assert 'csrf_token' not in sess
+    token = get_csrf_token(client, '/login')
+    assert len(token) > 40, "Token deve ter tamanho adequado"
 
 
 @pytest.mark.security
@@ -160,22 +161,42 @@ def test_admin_login_with_valid_csrf(client_with_csrf):
 
 
 @pytest.mark.security
-def test_csrf_token_unique_per_session(client):
+def test_csrf_token_bound_to_client(client_with_csrf):
     """
-    Cada sessão deve ter token CSRF único
+    Token de outro navegador (User-Agent) ou de outro usuário do painel é recusado
     """
-    # Primeira sessão
-    client.get('/login')
-    with client.session_transaction() as sess:
-        token1 = sess.get('csrf_token')
+    from app.csrf import csrf_tokens
     
-    # Limpa sessão
-    with client.session_transaction() as sess:
-        sess.clear()
+    with client_with_csrf.application.test_request_context(headers={'User-Agent': 'Navegador A'}):
+        token = csrf_tokens.generate()
+        assert csrf_tokens.validate(token)
+    with client_with_csrf.application.test_request_context(headers={'User-Agent': 'Navegador B'}):
+        assert not csrf_tokens.validate(token)
     
-    # Segunda sessão
-    client.get('/login')
-    with client.session_transaction() as sess:
-        token2 = sess.get('csrf_token')
+    with client_with_csrf.session_transaction() as sess:
+        sess['admin_logged_in'] = True
+        sess['username'] = 'admin'
+    response = client_with_csrf.post('/admin/profile', data={
+        'email': 'outro@example.com',
+        'current_password': 'admin123',
+        'csrf_token': token
+    }, headers={'User-Agent': 'Navegador A'}, follow_redirects=False)
+    
+    # Token gerado sem login não vale para o painel: volta sem processar
+    assert response.status_code == 302
+    assert '/admin/login' in response.location
+
+
+@pytest.mark.security
+def test_csrf_token_expires_after_two_windows(client):
+    """
+    Token vale na janela atual e na seguinte; depois é recusado
+    """
+    from app.csrf import csrf_tokens
     
-    assert token1 != token2, "Cada sessão deve ter token CSRF diferente"
+    with client.application.test_request_context():
+        token = csrf_tokens.generate(now=1_000_000)
+        window = csrf_tokens.window
+        assert csrf_tokens.validate(token, now=1_000_000 + window)
+        assert not csrf_tokens.validate(token, now=1_000_000 + 2 * window)
+        assert not csrf_tokens.validate(token.split('.')[0] + '.adulterado', now=1_000_000)
@@ -0,0 +1,101 @@
+"""
+Testes da Exportação de Registros
+Prioridade: ALTA 🟠
+
+Testa:
+- Autenticação obrigatória
+- CSV com aspas corretas e dados descriptografados
+- NDJSON
+- Filtro por período
+"""
+
+import csv
+import io
+import json
+import pytest
+from datetime import datetime, timedelta
+
+from app.models import AccessLog, db
+
+
+@pytest.fixture
+def registros_exportacao(client):
+    """Acessos em dias diferentes, um deles com vírgula no nome"""
+    base = datetime(2026, 3, 10, 12, 0, 0)
+    for i, nome in enumerate(['Silva, João', 'Maria "Mari" Souza', 'Ana Lima']):
+        db.session.add(AccessLog(
+            nome=nome,
+            email=f'pessoa{i}@example.com',
+            ip=f'10.0.0.{i}',
+            access_id=AccessLog.generate_access_id(base + timedelta(days=i)),
+            timestamp=base + timedelta(days=i),
+        ))
+    db.session.commit()
+
+
+def test_export_requires_authentication(client):
+    """
+    Exportação deve exigir login admin
+    """
+    response = client.get('/admin/export')
+
+    assert response.status_code == 302
+    assert '/admin/login' in response.location
+
+
+@pytest.mark.critical
+def test_export_csv_quotes_and_decrypts(authenticated_client, registros_exportacao):
+    """
+    CRÍTICO: CSV deve ter todos os registros, descriptografados e bem escapados
+    """
+    response = authenticated_client.get('/admin/export?format=csv')
+
+    assert response.status_code == 200
+    assert response.mimetype == 'text/csv'
+    assert 'attachment' in response.headers['Content-Disposition']
+
+    rows = list(csv.DictReader(io.StringIO(response.data.decode('utf-8-sig'))))
+    assert [r['nome'] for r in rows] == ['Silva, João', 'Maria "Mari" Souza', 'Ana Lima']
+    assert rows[0]['email'] == 'pessoa0@example.com'
+    assert rows[0]['data'] == '2026-03-10'
+
+
+def test_export_ndjson(authenticated_client, registros_exportacao):
+    """
+    NDJSON deve ter um objeto por linha
+    """
+    response = authenticated_client.get('/admin/export?format=ndjson')
+
+    lines = response.data.decode('utf-8').strip().split('\n')
+    assert len(lines) == 3
+    assert json.loads(lines[2])['nome'] == 'Ana Lima'
+
+
+def test_export_date_range(authenticated_client, registros_exportacao):
+    """
+    Período deve filtrar registros (data final inclusiva)
+    """
+    response = authenticated_client.get('/admin/export?format=ndjson&start=2026-03-11&end=2026-03-11')
+
+    lines = response.data.decode('utf-8').strip().split('\n')
+    assert len(lines) == 1
+    assert json.loads(lines[0])['nome'] == 'Maria "Mari" Souza'
+
+
+def test_export_rejects_invalid_parameters(authenticated_client):
+    """
+    Formato ou data inválidos devem retornar 400
+    """
+    assert authenticated_client.get('/admin/export?format=xml').status_code == 400
+    assert authenticated_client.get('/admin/export?start=10/03/2026').status_code == 400
+
+
+def test_export_streams_in_chunks(client, registros_exportacao):
+    """
+    Exportação deve ser produzida bloco a bloco
+    """
+    from app.data_manager import data_manager
+
+    chunks = list(data_manager.iter_access_logs_export(chunk_size=2))
+
+    assert [len(chunk) for chunk in chunks] == [2, 1]
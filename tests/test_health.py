@@ -0,0 +1,102 @@
+"""
+Testes dos Health Checks
+Prioridade: ALTA 🟠
+
+Testa:
+- Liveness sem consultar dependências
+- Readiness com latência por dependência
+- 503 quando uma dependência falha ou excede o timeout
+- Cache do resultado entre probes
+"""
+
+import time
+import pytest
+from unittest.mock import patch
+
+from app.health import health_checker
+
+
+@pytest.fixture
+def checker(client):
+    health_checker.invalidate()
+    yield health_checker
+    health_checker.invalidate()
+
+
+def test_liveness_always_ok(client):
+    """
+    /healthz não depende do banco nem do Redis
+    """
+    with patch.object(health_checker, 'run', side_effect=AssertionError('não deve rodar')):
+        response = client.get('/healthz')
+
+    assert response.status_code == 200
+    assert response.get_json()['status'] == 'healthy'
+
+
+@pytest.mark.critical
+def test_readiness_reports_each_dependency(checker, client):
+    """
+    CRÍTICO: /readyz deve verificar banco, storage do limiter e criptografia
+    """
+    with patch.object(checker, 'check_rate_limit_storage', return_value='MemoryStorage'):
+        response = client.get('/readyz')
+
+    data = response.get_json()
+    assert response.status_code == 200
+    assert data['status'] == 'ready'
+    assert set(data['checks']) == {'database', 'rate_limit_storage', 'cipher'}
+    assert all(check['status'] == 'ok' for check in data['checks'].values())
+    assert all(check['latency_ms'] >= 0 for check in data['checks'].values())
+    assert response.headers['Cache-Control'] == 'no-store'
+
+
+@pytest.mark.critical
+def test_readiness_fails_when_dependency_is_down(checker, client):
+    """
+    CRÍTICO: Dependência fora do ar deve tirar o worker do balanceamento (503)
+    """
+    with patch.object(checker, 'check_rate_limit_storage',
+                      side_effect=ConnectionError('redis down')):
+        response = client.get('/readyz')
+
+    data = response.get_json()
+    assert response.status_code == 503
+    assert data['status'] == 'unavailable'
+    assert data['checks']['rate_limit_storage']['status'] == 'error'
+    assert 'redis down' in data['checks']['rate_limit_storage']['error']
+    assert data['checks']['database']['status'] == 'ok'
+
+
+def test_readiness_times_out_slow_dependency(checker, client):
+    """
+    Dependência lenta não pode segurar o probe além do timeout
+    """
+    checker.timeout = 0.2
+    try:
+        with patch.object(checker, 'check_rate_limit_storage', return_value='ok'), \
+                patch.object(checker, 'check_database', side_effect=lambda: time.sleep(1)):
+            started = time.perf_counter()
+            response = client.get('/readyz')
+            elapsed = time.perf_counter() - started
+    finally:
+        checker.timeout = 1.0
+
+    assert response.status_code == 503
+    assert response.get_json()['checks']['database']['status'] == 'timeout'
+    assert elapsed < 0.8
+
+
+def test_readiness_result_is_cached(checker, client):
+    """
+    Probes dentro da janela de cache reaproveitam o último resultado
+    """
+    with patch.object(checker, 'check_rate_limit_storage', return_value='ok'), \
+            patch.object(checker, 'run', wraps=checker.run) as run:
+        first = client.get('/readyz').get_json()
+        second = client.get('/readyz').get_json()
+
+    assert run.call_count == 1
+    assert first['cached'] is False
+    assert second['cached'] is True
+    assert second['checked_at'] == first['checked_at']
@@ -0,0 +1,125 @@
+"""
+Testes das Imagens Responsivas
+Prioridade: MÉDIA 🟡
+
+Testa:
+- Variantes redimensionadas em AVIF/WebP com índice variants.json
+- Markup <picture> com srcset no login (e fallback sem o build)
+- Orçamento de bytes da primeira pintura (relatório e comando CLI)
+"""
+
+import os
+import shutil
+import pytest
+
+from app.images import (
+    RESPONSIVE_DIR, ImageSpec, build_variants, first_paint_report, responsive_images,
+)
+from app.page_cache import page_cache
+from app_simple import app
+
+BACKGROUND = 'images/centro-cultural-pb.png'
+
+
+@pytest.fixture
+def built_images(client):
+    """Build no static/ real (static/images/responsive é ignorado pelo git)"""
+    pytest.importorskip('PIL')
+    build_variants(app.static_folder)
+    responsive_images.load()
+    page_cache.clear()
+    yield responsive_images
+    shutil.rmtree(os.path.join(app.static_folder, RESPONSIVE_DIR), ignore_errors=True)
+    responsive_images.load()
+    page_cache.clear()
+
+
+def test_variants_are_resized_and_smaller(tmp_path):
+    """
+    Cada largura gera variantes menores que o PNG original
+    """
+    pytest.importorskip('PIL')
+    folder = tmp_path / 'static'
+    shutil.copytree(os.path.join(app.static_folder, 'images'), folder / 'images',
+                    ignore=shutil.ignore_patterns('responsive'))
+
+    index = build_variants(str(folder), {BACKGROUND: ImageSpec((480, 960, 4000), 'jpeg')})
+
+    entry = index[BACKGROUND]
+    assert entry['formats'][-1] == 'jpeg'
+    assert 'webp' in entry['formats']
+    original = os.path.getsize(folder / BACKGROUND)
+    for fmt in entry['formats']:
+        widths = [width for _, width in entry['variants'][fmt]]
+        # Largura maior que a original não é gerada
+        assert widths == [480, 960, entry['width']]
+        for name, _ in entry['variants'][fmt]:
+            assert os.path.getsize(folder / name) < original
+    assert os.path.exists(folder / RESPONSIVE_DIR / 'variants.json')
+
+
+def test_picture_without_build_falls_back_to_original(client):
+    """
+    Sem variants.json o helper gera um <img> com a imagem original
+    """
+    responsive_images.load()
+    with app.test_request_context():
+        html = str(responsive_images.picture(BACKGROUND, class_='page-background'))
+
+    assert '<source' not in html
+    assert f'src="/static/{BACKGROUND}"' in html
+
+
+@pytest.mark.critical
+def test_login_uses_responsive_background(built_images, client):
+    """
+    CRÍTICO: Login deve oferecer AVIF/WebP com srcset no lugar do PNG do CSS
+    """
+    html = client.get('/login').data.decode('utf-8')
+
+    assert 'class="has-picture-background"' in html
+    assert '<source type="image/webp"' in html
+    assert 'centro-cultural-pb-480.webp 480w' in html
+    assert 'sizes="100vw"' in html
+    assert 'favicon-32.png' in html
+
+
+def test_first_paint_report_counts_selected_variant(built_images, client):
+    """
+    Orçamento conta a variante escolhida para a tela, não o PNG do CSS
+    """
+    report = dict(first_paint_report(app, viewport=1000))
+
+    assert 'images/centro-cultural-pb.png' not in report
+    assert 'images/responsive/centro-cultural-pb-1600.webp' in report
+    assert 'images/favicon.png' not in report
+    assert 'css/style.css' in report
+    assert sum(report.values()) < app.config['FIRST_PAINT_BUDGET_KB'] * 1024
+
+
+def test_first_paint_report_without_variants_counts_original(client):
+    """
+    Sem o build, o fundo original entra (uma vez) no relatório
+    """
+    responsive_images.load()
+    page_cache.clear()
+    report = first_paint_report(app)
+
+    names = [name for name, _ in report]
+    assert names.count(BACKGROUND) == 1
+    assert dict(report)[BACKGROUND] == os.path.getsize(os.path.join(app.static_folder, BACKGROUND))
+
+
+def test_budget_command_fails_when_over_budget(client):
+    """
+    `flask assets budget` sai com erro acima do orçamento
+    """
+    runner = app.test_cli_runner()
+
+    over = runner.invoke(args=['assets', 'budget', '--budget-kb', '1'])
+    assert over.exit_code != 0
+    assert 'over budget' in over.output
+
+    within = runner.invoke(args=['assets', 'budget', '--budget-kb', '100000'])
+    assert within.exit_code == 0
+    assert 'total' in within.output
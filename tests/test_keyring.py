@@ -0,0 +1,165 @@
+"""
+Testes do Chaveiro de Criptografia
+Prioridade: CRÍTICA 🔴
+
+Testa:
+- Compatibilidade da chave legada (derivada da SECRET_KEY)
+- Carregamento de chaves pré-derivadas (env e arquivo)
+- Rotação: dados antigos continuam legíveis e são regravados com a chave nova
+- Decifragem em lote equivalente ao Fernet
+"""
+
+import os
+import tempfile
+import pytest
+from cryptography.fernet import Fernet
+from sqlalchemy import select, type_coerce, String
+
+from app.keyring import Keyring, derive_legacy_key, export_keys_to_env
+from app.models import AccessLog, db, set_encryption_cipher
+from app.security import security_manager
+from app.data_manager import data_manager
+
+
+@pytest.fixture
+def restore_keyring():
+    """Restaura o chaveiro original após o teste"""
+    original = security_manager.keyring
+    yield
+    security_manager.keyring = original
+    security_manager.cipher_suite = original.cipher
+    set_encryption_cipher(original.cipher)
+
+
+@pytest.mark.critical
+@pytest.mark.security
+def test_legacy_key_matches_previous_derivation():
+    """
+    CRÍTICO: Sem ENCRYPTION_KEYS a chave deve ser a mesma de antes (dados antigos)
+    """
+    keyring = Keyring.load(secret_key='test-secret-key-for-testing-only')
+    token = keyring.cipher.encrypt(b'dado antigo')
+
+    legacy = Fernet(derive_legacy_key('test-secret-key-for-testing-only'))
+    assert legacy.decrypt(token) == b'dado antigo'
+    assert keyring.source == 'legacy'
+
+
+def test_load_keys_from_env_and_file():
+    """
+    Chaves configuradas não devem passar pelo PBKDF2
+    """
+    new_key, old_key = Fernet.generate_key(), Fernet.generate_key()
+
+    keyring = Keyring.load(secret_key='x', keys=f'{new_key.decode()},{old_key.decode()}')
+    assert keyring.keys == [new_key, old_key]
+    assert keyring.source == 'env'
+
+    with tempfile.NamedTemporaryFile('w', suffix='.keys', delete=False) as handle:
+        handle.write(f'# chave primária\n{new_key.decode()}\n{old_key.decode()}\n')
+    try:
+        keyring = Keyring.load(secret_key='x', keys_file=handle.name)
+    finally:
+        os.remove(handle.name)
+    assert keyring.keys == [new_key, old_key]
+    assert keyring.source == 'file'
+
+
+def test_export_keys_to_env():
+    """
+    Processo mestre deve publicar a chave derivada para os workers
+    """
+    environ = {'SECRET_KEY': 'segredo'}
+    assert export_keys_to_env(environ) is True
+    assert environ['ENCRYPTION_KEYS'].encode() == derive_legacy_key('segredo')
+
+    # Não sobrescreve chaves configuradas nem deriva sem SECRET_KEY fixa
+    assert export_keys_to_env(environ) is False
+    assert export_keys_to_env({}) is False
+
+
+def test_blind_index_key_independent_of_encryption_keys():
+    """
+    Rotacionar chaves Fernet não pode invalidar os índices cegos
+    """
+    a = Keyring.load(secret_key='s', keys=Fernet.generate_key().decode())
+    b = Keyring.load(secret_key='s', keys=Fernet.generate_key().decode())
+
+    assert a.blind_index_key == b.blind_index_key
+
+
+@pytest.mark.critical
+@pytest.mark.security
+def test_rotate_encryption_reencrypts_old_rows(client, sample_user_data, restore_keyring):
+    """
+    CRÍTICO: Rotação deve regravar registros com a chave primária nova
+    """
+    old_keyring = security_manager.keyring
+    data_manager.log_access_encrypted(sample_user_data)
+
+    new_key = Fernet.generate_key()
+    old_keys = ','.join(k.decode() for k in old_keyring.keys)
+    rotated = Keyring.load(secret_key='x', keys=f'{new_key.decode()},{old_keys}')
+    security_manager.keyring = rotated
+    security_manager.cipher_suite = rotated.cipher
+    set_encryption_cipher(rotated.cipher)
+
+    # Dados antigos continuam legíveis durante a rotação
+    assert data_manager.get_access_logs(limit=1)[0]['nome'] == sample_user_data['nome']
+
+    totals = data_manager.rotate_encryption(batch_size=10)
+    assert totals['rotated'] == 1
+
+    table = AccessLog.__table__
+    raw_nome = db.session.execute(select(type_coerce(table.c.nome, String))).scalar()
+    assert Fernet(new_key).decrypt(raw_nome.encode()).decode() == sample_user_data['nome']
+
+    # Segunda execução não regrava nada
+    assert data_manager.rotate_encryption(batch_size=10)['rotated'] == 0
+
+
+@pytest.mark.critical
+@pytest.mark.security
+def test_decrypt_many_matches_fernet():
+    """
+    CRÍTICO: Decifragem em lote deve dar o mesmo resultado do MultiFernet
+    """
+    old_key, new_key = Fernet.generate_key(), Fernet.generate_key()
+    keyring = Keyring([new_key, old_key], b'bidx')
+    values = [
+        Fernet(old_key).encrypt('João da Silva'.encode()).decode(),
+        Fernet(new_key).encrypt(b'maria@example.com').decode(),
+        Fernet(new_key).encrypt(b'').decode(),
+        Fernet(new_key).encrypt(b'x' * 48).decode(),
+    ]
+
+    expected = [keyring.cipher.decrypt(v.encode()).decode() for v in values]
+
+    assert keyring.decrypt_many(values) == expected
+    # A dica da última chave não pode trocar o resultado ao alternar chaves
+    assert keyring.decrypt_many(values[::-1] * 3) == expected[::-1] * 3
+
+
+def test_decrypt_many_returns_undecryptable_values_unchanged():
+    """
+    Como no EncryptedString, valores legados ou corrompidos voltam como estão
+    """
+    keyring = Keyring([Fernet.generate_key()], b'bidx')
+    foreign = Fernet(Fernet.generate_key()).encrypt(b'outra chave').decode()
+    tampered = keyring.cipher.encrypt(b'dado').decode()[:-4] + 'AAAA'
+
+    assert keyring.decrypt_many(['texto puro', None, '', foreign, tampered]) == [
+        'texto puro', None, '', foreign, tampered
+    ]
+
+
+def test_access_log_reads_use_bulk_decryption(client, sample_user_data):
+    """
+    Listagem decifrada em lote deve ter o mesmo formato de AccessLog.to_dict
+    """
+    data_manager.log_access_encrypted(sample_user_data)
+
+    expected = AccessLog.query.one().to_dict(decrypt=True)
+
+    assert data_manager.get_access_logs(limit=1) == [expected]
+    assert data_manager.get_access_logs_page(limit=1)['items'] == [expected]
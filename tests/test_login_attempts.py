@@ -0,0 +1,177 @@
+"""
+Testes do Contador de Falhas de Login do Admin
+Prioridade: CRÍTICA 🔴
+
+Testa:
+- Janela deslizante por IP e por usuário (memória e Redis)
+- Bloqueio antes de consultar o banco ou calcular hash
+- Login bem-sucedido zera o contador do usuário
+- Variações sanitizadas do usuário caem no mesmo contador
+- Fallback para memória com o Redis fora do ar
+"""
+
+import pytest
+from unittest.mock import patch
+
+from app.login_attempts import LoginAttemptTracker, login_attempts
+from tests.conftest import get_csrf_token
+
+
+class FakeRedis:
+    """Sorted sets mínimos para os comandos usados pelo contador"""
+
+    def __init__(self):
+        self.sets = {}
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+    def delete(self, key):
+        self.sets.pop(key, None)
+
+
+class FakePipeline:
+    def __init__(self, redis):
+        self.redis = redis
+        self.results = []
+
+    def zadd(self, key, mapping):
+        self.redis.sets.setdefault(key, {}).update(mapping)
+        self.results.append(len(mapping))
+
+    def zremrangebyscore(self, key, low, high):
+        members = self.redis.sets.get(key, {})
+        removed = [m for m, score in members.items() if score <= high]
+        for member in removed:
+            del members[member]
+        self.results.append(len(removed))
+
+    def zcard(self, key):
+        self.results.append(len(self.redis.sets.get(key, {})))
+
+    def expire(self, key, seconds):
+        self.results.append(True)
+
+    def execute(self):
+        return self.results
+
+
+def tracker(redis=None, max_attempts=3, window=60):
+    instance = LoginAttemptTracker()
+    instance.max_attempts = max_attempts
+    instance.window = window
+    instance.redis = redis
+    return instance
+
+
+@pytest.mark.parametrize('redis', [None, FakeRedis()], ids=['memoria', 'redis'])
+def test_sliding_window_per_ip_and_user(redis, monkeypatch):
+    """
+    Falhas antigas saem da janela; IP e usuário são contados separadamente
+    """
+    now = [1000.0]
+    monkeypatch.setattr('app.login_attempts.time.time', lambda: now[0])
+    attempts = tracker(redis)
+
+    for _ in range(2):
+        attempts.register_failure('10.0.0.1', 'admin')
+    now[0] += 30
+    assert attempts.register_failure('10.0.0.2', 'Admin') == [1, 3]
+    assert attempts.is_locked('10.0.0.9', 'admin')
+    assert not attempts.is_locked('10.0.0.1', 'outro')
+
+    # As duas primeiras falhas saem da janela de 60 s
+    now[0] += 31
+    assert attempts.failures('10.0.0.9', 'admin') == [0, 1]
+    assert not attempts.is_locked('10.0.0.9', 'admin')
+
+
+@pytest.mark.critical
+def test_locked_login_rejected_before_lookup_and_hash(client):
+    """
+    CRÍTICO: Login bloqueado responde 429 sem consultar o usuário nem calcular hash
+    """
+    token = get_csrf_token(client, '/admin/login')
+    for _ in range(login_attempts.max_attempts):
+        client.post('/admin/login', data={'username': 'admin', 'password': 'errada', 'csrf_token': token})
+
+    with patch('app_simple.get_user') as get_user, \
+            patch('app.passwords.password_hasher.verify') as verify:
+        response = client.post('/admin/login', data={
+            'username': 'admin', 'password': 'admin123', 'csrf_token': token,
+        })
+
+    assert response.status_code == 429
+    assert 'Muitas tentativas' in response.data.decode('utf-8')
+    assert not get_user.called
+    assert not verify.called
+    with client.session_transaction() as sess:
+        assert not sess.get('admin_logged_in')
+
+
+@pytest.mark.critical
+def test_sanitized_username_variant_shares_lockout(client):
+    """
+    CRÍTICO: "ad<min" vira "admin" na sanitização e não escapa do bloqueio
+    """
+    token = get_csrf_token(client, '/admin/login')
+    # IPs distintos: só o contador por usuário bloqueia
+    for n in range(login_attempts.max_attempts):
+        client.post('/admin/login', data={'username': 'admin', 'password': 'errada', 'csrf_token': token},
+                    environ_base={'REMOTE_ADDR': f'10.0.0.{n + 1}'})
+
+    for password in ('errada', 'admin123'):
+        response = client.post('/admin/login', data={
+            'username': 'ad<min', 'password': password, 'csrf_token': token,
+        }, environ_base={'REMOTE_ADDR': '10.0.0.99'})
+        assert response.status_code == 429
+
+    with client.session_transaction() as sess:
+        assert not sess.get('admin_logged_in')
+
+
+def test_unknown_user_is_locked_too(client):
+    """
+    Usuário inexistente também é contado e bloqueado (sem revelar se existe)
+    """
+    token = get_csrf_token(client, '/admin/login')
+    for _ in range(login_attempts.max_attempts):
+        client.post('/admin/login', data={'username': 'fantasma', 'password': 'x', 'csrf_token': token})
+
+    response = client.post('/admin/login', data={'username': 'fantasma', 'password': 'x', 'csrf_token': token})
+
+    assert response.status_code == 429
+
+
+def test_successful_login_resets_user_counter(client):
+    """
+    Login correto zera as falhas do usuário
+    """
+    token = get_csrf_token(client, '/admin/login')
+    for _ in range(login_attempts.max_attempts - 1):
+        client.post('/admin/login', data={'username': 'admin', 'password': 'errada', 'csrf_token': token})
+
+    response = client.post('/admin/login', data={'username': 'admin', 'password': 'admin123', 'csrf_token': token})
+
+    assert response.status_code == 302
+    assert login_attempts.failures('127.0.0.1', 'admin')[1] == 0
+
+
+def test_redis_error_falls_back_to_memory():
+    """
+    Redis fora do ar não libera nem derruba o login: conta em memória
+    """
+    class BrokenRedis:
+        def pipeline(self, transaction=True):
+            raise ConnectionError('redis fora do ar')
+
+        def delete(self, key):
+            raise ConnectionError('redis fora do ar')
+
+    attempts = tracker(BrokenRedis(), max_attempts=2)
+    attempts.register_failure('10.0.0.1', 'admin')
+    attempts.register_failure('10.0.0.1', 'admin')
+
+    assert attempts.is_locked('10.0.0.1', 'admin')
+    attempts.reset('admin')
+    assert attempts.failures('10.0.0.1', 'admin') == [2, 0]
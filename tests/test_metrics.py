@@ -0,0 +1,69 @@
+"""
+Testes das Métricas Prometheus
+Prioridade: MÉDIA 🟡
+
+Testa:
+- Exposição em /metrics no formato texto do Prometheus
+- Contadores do registro de acesso e da criptografia
+- Histogramas de requisições e de renderização de templates
+"""
+
+import pytest
+
+from app import metrics
+from app.metrics import render_metrics
+from tests.conftest import get_csrf_token
+
+pytestmark = pytest.mark.skipif(not metrics.PROMETHEUS_AVAILABLE,
+                                reason='prometheus_client não instalado')
+
+
+def sample(name, **labels):
+    """Valor atual de uma amostra do registro padrão (0 se ausente)"""
+    value = metrics.REGISTRY.get_sample_value(name, labels)
+    return value or 0
+
+
+def test_metrics_endpoint_exposes_text_format(client):
+    """
+    /metrics deve responder no formato de exposição do Prometheus
+    """
+    response = client.get('/metrics')
+
+    assert response.status_code == 200
+    assert response.content_type.startswith('text/plain')
+    assert b'# TYPE portal_http_request_seconds histogram' in response.data
+    assert b'portal_access_log_writes_total' in response.data
+
+
+def test_login_counts_access_log_write_and_encryption(client, sample_user_data, cleanup_data_files):
+    """
+    Login no portal deve contar a gravação do acesso e os valores cifrados
+    """
+    writes = sample('portal_access_log_writes_total', mode='sync', result='ok')
+    encrypts = sample('portal_crypto_operations_total', operation='encrypt')
+    observed = sample('portal_access_log_write_seconds_count', mode='sync')
+
+    sample_user_data['csrf_token'] = get_csrf_token(client, '/login')
+    client.post('/login', data=sample_user_data)
+
+    assert sample('portal_access_log_writes_total', mode='sync', result='ok') == writes + 1
+    assert sample('portal_access_log_write_seconds_count', mode='sync') == observed + 1
+    assert sample('portal_crypto_operations_total', operation='encrypt') > encrypts
+
+
+def test_request_and_template_histograms(client):
+    """
+    Requisições e templates renderizados devem alimentar os histogramas
+    """
+    requests_before = sample('portal_http_request_seconds_count',
+                             endpoint='admin_login', method='GET', status='200')
+    renders_before = sample('portal_template_render_seconds_count', template='admin_login.html')
+
+    client.get('/admin/login')
+
+    assert sample('portal_http_request_seconds_count',
+                  endpoint='admin_login', method='GET', status='200') == requests_before + 1
+    assert sample('portal_template_render_seconds_count', template='admin_login.html') == renders_before + 1
+    # A própria coleta não entra no histograma de requisições
+    assert b'endpoint="metrics"' not in render_metrics()
@@ -0,0 +1,140 @@
+"""
+Testes da Caixa de Saída de Emails
+Prioridade: ALTA 🟠
+
+Testa:
+- Envio pelo substituto local de SMTP
+- Reaproveitamento da conexão entre mensagens
+- Novas tentativas com backoff e descarte após o limite
+- Corpo apagado após o envio e limpeza das mensagens antigas
+"""
+
+import pytest
+from datetime import datetime, timedelta
+from email.message import EmailMessage
+from unittest.mock import patch
+
+from app.models import EmailOutbox, db
+from app.outbox import DEBUG_SENT_LIMIT, DebugSMTP, email_outbox
+
+
+@pytest.fixture
+def outbox(client):
+    DebugSMTP.sent.clear()
+    email_outbox._close_connection()
+    yield email_outbox
+    email_outbox._close_connection()
+
+
+class FailingSMTP(DebugSMTP):
+    def send_message(self, message):
+        raise OSError('connection refused')
+
+
+def test_enqueue_persists_encrypted_message(outbox):
+    """
+    Mensagem deve ficar na tabela até o sender processar
+    """
+    assert outbox.enqueue('admin@example.com', 'Assunto', 'Corpo com link')
+
+    item = EmailOutbox.query.one()
+    assert item.status == 'pending'
+    assert item.body == 'Corpo com link'
+    raw = db.session.execute(db.text('SELECT body FROM email_outbox')).scalar()
+    assert raw != 'Corpo com link'
+
+
+@pytest.mark.critical
+def test_process_sends_and_reuses_connection(outbox):
+    """
+    CRÍTICO: Mensagens vencidas devem ser enviadas numa única conexão
+    """
+    for i in range(3):
+        outbox.enqueue(f'admin{i}@example.com', 'Assunto', 'Corpo')
+
+    with patch.object(DebugSMTP, 'login', autospec=True, return_value=(235, b'ok')) as login:
+        totals = outbox.process()
+        outbox.enqueue('admin3@example.com', 'Assunto', 'Corpo')
+        outbox.process()
+
+    assert totals['sent'] == 3
+    assert login.call_count <= 1
+    assert [m['To'] for m in DebugSMTP.sent] == [f'admin{i}@example.com' for i in range(4)]
+    assert EmailOutbox.query.filter_by(status='sent').count() == 4
+
+
+def test_failed_send_is_retried_with_backoff(outbox):
+    """
+    Falha no envio deve reagendar a mensagem com backoff exponencial
+    """
+    outbox.enqueue('admin@example.com', 'Assunto', 'Corpo')
+    now = datetime.utcnow()
+
+    with patch.object(outbox, '_smtp_class', return_value=FailingSMTP):
+        assert outbox.process(now=now)['retried'] == 1
+        # Ainda não venceu: nada a fazer
+        assert outbox.process(now=now + timedelta(seconds=1))['retried'] == 0
+
+    item = EmailOutbox.query.one()
+    assert item.status == 'pending'
+    assert item.attempts == 1
+    assert item.next_attempt_at == now + outbox.retry_delay(1)
+    assert 'connection refused' in item.last_error
+
+    assert outbox.process(now=item.next_attempt_at)['sent'] == 1
+
+
+def test_message_fails_after_max_attempts(outbox):
+    """
+    Após o número máximo de tentativas a mensagem é marcada como falha
+    """
+    outbox.enqueue('admin@example.com', 'Assunto', 'Corpo')
+    now = datetime.utcnow()
+
+    with patch.object(outbox, '_smtp_class', return_value=FailingSMTP):
+        for _ in range(outbox.max_attempts):
+            outbox.process(now=now)
+            now += timedelta(hours=2)
+
+    assert EmailOutbox.query.one().status == 'failed'
+
+
+@pytest.mark.security
+def test_sent_messages_are_scrubbed_and_purged(outbox):
+    """
+    Link de redefinição não fica no banco: corpo apagado no envio, linha removida após a retenção
+    """
+    outbox.enqueue('admin@example.com', 'Assunto', 'Link secreto')
+    outbox.enqueue('outro@example.com', 'Assunto', 'Pendente')
+    now = datetime.utcnow()
+    outbox.process(limit=1, now=now)
+
+    sent = EmailOutbox.query.filter_by(status='sent').one()
+    assert sent.body == ''
+
+    assert outbox.purge(now=now + outbox.retention - timedelta(minutes=1)) == 0
+    assert outbox.purge(now=now + outbox.retention + timedelta(minutes=1)) == 1
+    assert [item.status for item in EmailOutbox.query.all()] == ['pending']
+
+
+def test_debug_smtp_keeps_only_recent_messages(outbox):
+    """
+    DebugSMTP guarda só as últimas mensagens (sem crescer indefinidamente)
+    """
+    smtp = DebugSMTP()
+    for i in range(DEBUG_SENT_LIMIT + 5):
+        message = EmailMessage()
+        message['To'] = f'admin{i}@example.com'
+        smtp.send_message(message)
+
+    assert len(DebugSMTP.sent) == DEBUG_SENT_LIMIT
+    assert DebugSMTP.sent[0]['To'] == 'admin5@example.com'
+
+
+def test_retry_delay_is_capped():
+    """
+    Backoff deve dobrar a cada tentativa até o máximo de 1 hora
+    """
+    assert email_outbox.retry_delay(1) == timedelta(seconds=email_outbox.retry_base)
+    assert email_outbox.retry_delay(2) == timedelta(seconds=email_outbox.retry_base * 2)
+    assert email_outbox.retry_delay(20) == timedelta(hours=1)
@@ -0,0 +1,97 @@
+"""
+Testes do Cache de Páginas Públicas
+Prioridade: MÉDIA 🟡
+
+Testa:
+- Termos e política com ETag/Last-Modified e 304
+- Login pré-renderizado idêntico ao render completo
+- Escape dos parâmetros inseridos nos fragmentos
+"""
+
+import pytest
+from unittest.mock import patch
+
+from flask import render_template
+
+from app.page_cache import page_cache
+from app_simple import app
+
+
+@pytest.fixture
+def cache(client):
+    page_cache.clear()
+    yield page_cache
+    page_cache.clear()
+
+
+@pytest.mark.parametrize('url', ['/termos', '/politica-privacidade'])
+def test_static_pages_support_conditional_requests(cache, client, url):
+    """
+    Páginas estáticas devem responder 304 quando o ETag confere
+    """
+    first = client.get(url)
+    assert first.status_code == 200
+    assert first.headers['ETag']
+    assert first.headers['Last-Modified']
+    assert 'max-age' in first.headers['Cache-Control']
+
+    revalidated = client.get(url, headers={'If-None-Match': first.headers['ETag']})
+    assert revalidated.status_code == 304
+    assert revalidated.data == b''
+
+    since = client.get(url, headers={'If-Modified-Since': first.headers['Last-Modified']})
+    assert since.status_code == 304
+
+
+def test_static_page_rendered_once(cache, client):
+    """
+    Renders seguintes reaproveitam o corpo em cache
+    """
+    with patch('app.page_cache.render_template', wraps=render_template) as render:
+        bodies = {client.get('/termos').data for _ in range(3)}
+
+    assert render.call_count == 1
+    assert len(bodies) == 1
+
+
+@pytest.mark.critical
+def test_login_fragments_match_full_render(cache, client):
+    """
+    CRÍTICO: Login em cache deve ser igual ao render completo do template
+    """
+    url = '/login?ip=10.5.50.2&mac=AA:BB:CC:00:11:22&link-orig=http://example.com/?a=1%26b=2'
+    client.get(url)
+    with patch('app.page_cache.render_template') as render:
+        cached = client.get(url).data.decode('utf-8')
+    assert not render.called
+
+    cache.enabled = False
+    try:
+        expected = client.get(url).data.decode('utf-8')
+    finally:
+        cache.enabled = True
+    assert cached == expected
+
+
+def test_login_fragments_escape_parameters(cache, client):
+    """
+    Valores inseridos no esqueleto devem ser escapados como no Jinja
+    """
+    values = {'ip': '', 'mac': '', 'link_orig': '"><script>alert(1)</script>', 'csrf_token': 'x'}
+    with app.test_request_context('/login'):
+        cache.render_fragments('login.html', False, dict(values, link_orig=''), returning=False)
+        html = cache.render_fragments('login.html', False, values, returning=False)
+
+    assert '<script>alert(1)</script>' not in html
+    assert '&#34;&gt;&lt;script&gt;' in html
+
+
+def test_login_with_flash_messages_renders_fully(cache, client):
+    """
+    Mensagens flash pendentes não podem entrar no esqueleto em cache
+    """
+    with client.session_transaction() as sess:
+        sess['_flashes'] = [('error', 'Mensagem pendente')]
+
+    assert 'Mensagem pendente' in client.get('/login').data.decode('utf-8')
+    assert 'Mensagem pendente' not in client.get('/login').data.decode('utf-8')
@@ -0,0 +1,179 @@
+"""
+Testes do Hash de Senhas do Admin
+Prioridade: ALTA 🟠
+
+Testa:
+- Calibração do custo do scrypt (piso do werkzeug, alvo e limite de memória)
+- Compatibilidade com check_password_hash do werkzeug
+- Rehash transparente de hashes fracos no login
+- Fila limitada: 503 em vez de segurar o worker
+- Calibração única no processo mestre, herdada pelos workers
+"""
+
+import threading
+import pytest
+from werkzeug.security import check_password_hash, generate_password_hash
+
+from app.models import User, db
+from app.passwords import (
+    SCRYPT_MIN_N, PasswordHashBusy, PasswordHasher, export_method_to_env, password_hasher, scrypt_method,
+)
+from tests.conftest import get_csrf_token
+
+
+def fake_timer(costs):
+    """Relógio que avança `costs[n]` segundos em cada hash medido"""
+    state = {'now': 0.0, 'calls': 0}
+    sequence = iter(costs)
+
+    def timer():
+        state['calls'] += 1
+        if state['calls'] % 2 == 0:
+            state['now'] += next(sequence)
+        return state['now']
+    return timer
+
+
+def test_calibration_picks_largest_cost_within_target(monkeypatch):
+    """
+    Calibração sobe n enquanto o hash couber no alvo
+    """
+    monkeypatch.setattr('app.passwords.generate_password_hash', lambda *args: 'x')
+    hasher = PasswordHasher()
+    hasher.max_memory_mb = 512
+
+    assert hasher.calibrate(target_ms=250, timer=fake_timer([0.1, 0.2, 0.4])) == scrypt_method(SCRYPT_MIN_N * 2)
+    # Máquina lenta: nunca abaixo do padrão do werkzeug
+    assert hasher.calibrate(target_ms=250, timer=fake_timer([0.9])) == scrypt_method(SCRYPT_MIN_N)
+    # Limite de memória (128 * n * r bytes) corta antes do alvo
+    hasher.max_memory_mb = 32
+    assert hasher.calibrate(target_ms=250, timer=fake_timer([0.01, 0.01])) == scrypt_method(SCRYPT_MIN_N)
+
+
+def test_hash_is_werkzeug_compatible():
+    """
+    Hash gerado no pool é lido pelo check_password_hash (e vice-versa)
+    """
+    stored = password_hasher.hash('SenhaForte123')
+
+    assert stored.startswith(password_hasher.method + '$')
+    assert check_password_hash(stored, 'SenhaForte123')
+    assert password_hasher.verify(generate_password_hash('outra', 'pbkdf2:sha256:1000'), 'outra')
+    assert not password_hasher.verify(stored, 'errada')
+
+
+def test_needs_rehash_only_for_weaker_hashes():
+    """
+    Só hashes mais fracos são refeitos (calibrações variam entre processos)
+    """
+    hasher = PasswordHasher()
+    hasher.method = scrypt_method(SCRYPT_MIN_N * 2)
+
+    assert hasher.needs_rehash(generate_password_hash('x', 'pbkdf2:sha256:600000'))
+    assert hasher.needs_rehash('scrypt:32768:8:1$salt$hash')
+    assert not hasher.needs_rehash('scrypt:65536:8:1$salt$hash')
+    assert not hasher.needs_rehash('scrypt:131072:8:1$salt$hash')
+
+
+@pytest.mark.critical
+def test_login_upgrades_legacy_hash(client):
+    """
+    CRÍTICO: Login bem-sucedido troca hash pbkdf2 antigo pelo scrypt calibrado
+    """
+    user = User.query.filter_by(username='admin').one()
+    user.password_hash = generate_password_hash('admin123', 'pbkdf2:sha256:1000')
+    db.session.commit()
+
+    response = client.post('/admin/login', data={
+        'username': 'admin',
+        'password': 'admin123',
+        'csrf_token': get_csrf_token(client, '/admin/login'),
+    })
+
+    assert response.status_code == 302
+    db.session.expire_all()
+    stored = User.query.filter_by(username='admin').one().password_hash
+    assert stored.startswith(password_hasher.method + '$')
+    assert check_password_hash(stored, 'admin123')
+
+
+def test_pool_caps_concurrent_hashes(monkeypatch):
+    """
+    No máximo PASSWORD_HASH_WORKERS hashes rodam ao mesmo tempo
+    """
+    hasher = PasswordHasher()
+    hasher.workers = 2
+    hasher._slots = threading.BoundedSemaphore(8)
+    running, peak, lock = [0], [0], threading.Lock()
+    release = threading.Event()
+
+    def slow_hash(password, method):
+        with lock:
+            running[0] += 1
+            peak[0] = max(peak[0], running[0])
+        release.wait(5)
+        with lock:
+            running[0] -= 1
+        return 'hash'
+
+    monkeypatch.setattr('app.passwords.generate_password_hash', slow_hash)
+    threads = [threading.Thread(target=hasher.hash, args=('x',)) for _ in range(6)]
+    for thread in threads:
+        thread.start()
+    threading.Timer(0.3, release.set).start()
+    for thread in threads:
+        thread.join()
+
+    assert peak[0] == 2
+
+
+def test_full_queue_returns_503(client, monkeypatch):
+    """
+    Fila cheia: /admin/login responde 503 com Retry-After
+    """
+    token = get_csrf_token(client, '/admin/login')
+    monkeypatch.setattr(password_hasher, '_slots', threading.BoundedSemaphore(1))
+    monkeypatch.setattr(password_hasher, 'queue_timeout', 0.01)
+    password_hasher._slots.acquire()
+
+    with pytest.raises(PasswordHashBusy):
+        password_hasher.hash('x')
+    response = client.post('/admin/login', data={
+        'username': 'admin', 'password': 'admin123', 'csrf_token': token,
+    })
+
+    assert response.status_code == 503
+    assert response.headers['Retry-After'] == '5'
+
+
+def test_master_calibrates_once_and_workers_inherit(client, monkeypatch):
+    """
+    Mestre do Gunicorn calibra e publica o custo; workers o usam sem recalibrar
+    """
+    calls = []
+
+    def calibrate(self, target_ms=None, timer=None):
+        calls.append(target_ms)
+        return scrypt_method(SCRYPT_MIN_N * 4)
+
+    monkeypatch.setattr(PasswordHasher, 'calibrate', calibrate)
+    environ = {'PASSWORD_HASH_TARGET_MS': '300'}
+
+    assert export_method_to_env(environ)
+    assert environ['PASSWORD_HASH_METHOD'] == scrypt_method(SCRYPT_MIN_N * 4)
+    # Worker reciclado: ambiente já tem o custo, nada a calibrar
+    assert not export_method_to_env(environ)
+    assert not export_method_to_env({'PASSWORD_HASH_CALIBRATE': 'false'})
+    assert calls == [300]
+
+    worker = PasswordHasher()
+    monkeypatch.setitem(client.application.config, 'PASSWORD_HASH_CALIBRATE', True)
+    monkeypatch.setitem(client.application.config, 'PASSWORD_HASH_METHOD', environ['PASSWORD_HASH_METHOD'])
+    worker.init_app(client.application)
+    assert worker.method == scrypt_method(SCRYPT_MIN_N * 4)
+    assert calls == [300]
+
+    # Valor abaixo do piso do werkzeug é ignorado
+    monkeypatch.setitem(client.application.config, 'PASSWORD_HASH_METHOD', scrypt_method(1024))
+    worker.init_app(client.application)
+    assert calls == [300, None]
@@ -0,0 +1,151 @@
+"""
+Testes do Storage de Rate Limiting em Dois Níveis
+Prioridade: ALTA 🟠
+
+Testa:
+- Limite respeitado com contagem local
+- Incrementos enviados ao storage remoto em lote
+- Sincronização de hits de outros processos perto do limite
+- Tráfego real (poucos hits por IP) sem idas ao remoto na requisição
+"""
+
+import os
+import threading
+import pytest
+from limits import parse
+from limits.storage import MemoryStorage, storage_from_string
+from limits.strategies import FixedWindowRateLimiter
+
+from app.rate_limit_storage import TieredStorage, limit_from_key
+
+
+class CountingMemoryStorage(MemoryStorage):
+    """Storage em memória que conta as idas ao "Redis" """
+    STORAGE_SCHEME = None
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.calls = 0
+
+    def incr(self, key, expiry, amount=1):
+        self.calls += 1
+        return super().incr(key, expiry, amount)
+
+
+def make_storage(remote=None, **options):
+    storage = TieredStorage('tiered+memory://', sync_interval=60, **options)
+    if remote is not None:
+        storage.remote = remote
+    return storage
+
+
+def test_scheme_is_registered():
+    """
+    URI tiered+ deve criar o storage em dois níveis
+    """
+    storage = storage_from_string('tiered+memory://', sync_batch=5)
+
+    assert isinstance(storage, TieredStorage)
+    assert isinstance(storage.remote, MemoryStorage)
+    assert storage.sync_batch == 5
+
+
+def test_limit_from_key():
+    """
+    Limite deve ser extraído da chave do limits
+    """
+    item = parse('100/minute')
+
+    assert limit_from_key(item.key_for('login', '10.0.0.1')) == 100
+    assert limit_from_key('admin_login_10.0.0.1') is None
+
+
+@pytest.mark.critical
+def test_limit_is_enforced():
+    """
+    CRÍTICO: Pré-contagem local não pode deixar passar hits além do limite
+    """
+    limiter = FixedWindowRateLimiter(make_storage())
+    item = parse('20/minute')
+
+    results = [limiter.hit(item, '10.0.0.1') for _ in range(25)]
+
+    assert results.count(True) == 20
+    assert results[20:] == [False] * 5
+
+
+def test_remote_round_trips_are_batched():
+    """
+    Longe do limite, o remoto só deve ser consultado a cada lote
+    """
+    remote = CountingMemoryStorage()
+    limiter = FixedWindowRateLimiter(make_storage(remote, sync_batch=10))
+    item = parse('1000/hour')
+
+    for _ in range(100):
+        assert limiter.hit(item, '10.0.0.1')
+
+    assert remote.calls <= 11
+    # Remoto fica atrás no máximo um lote
+    assert 100 - 10 < remote.get(item.key_for('10.0.0.1')) <= 100
+
+
+def test_hits_from_other_processes_are_seen_near_limit():
+    """
+    Perto do limite cada hit sincroniza e vê a contagem dos outros processos
+    """
+    remote = CountingMemoryStorage()
+    worker_a = FixedWindowRateLimiter(make_storage(remote))
+    worker_b = FixedWindowRateLimiter(make_storage(remote))
+    item = parse('20/minute')
+
+    for _ in range(15):
+        assert worker_a.hit(item, '10.0.0.1')
+    admitted = [worker_b.hit(item, '10.0.0.1') for _ in range(10)]
+
+    assert admitted.count(True) <= 5 + TieredStorage('tiered+memory://')._local_budget(20)
+
+
+def test_sparse_hits_per_ip_stay_local_with_defaults(monkeypatch):
+    """
+    Configuração padrão, /login de 5 aparelhos a cada 2 s: nenhuma ida ao remoto na requisição
+    """
+    clock = [1000.0]
+    monkeypatch.setattr('app.rate_limit_storage.time.time', lambda: clock[0])
+    storage = TieredStorage('tiered+memory://')
+    request_flushes = []
+    flush = storage._flush
+
+    def spy(dirty):
+        if threading.current_thread() is threading.main_thread():
+            request_flushes.append(len(dirty))
+        return flush(dirty)
+
+    storage._flush = spy
+    limiter = FixedWindowRateLimiter(storage)
+    item = parse('20/minute')
+
+    for hit in range(30):
+        assert limiter.hit(item, f'10.0.0.{hit % 5}')
+        clock[0] += 2
+
+    assert len(request_flushes) <= 1
+    assert storage._flusher_pid == os.getpid()
+    # A sincronização periódica entrega tudo ao remoto
+    storage._sync(clock[0])
+    assert sum(storage.remote.get(item.key_for(f'10.0.0.{i}')) for i in range(5)) == 30
+
+
+def test_clear_resets_local_and_remote():
+    """
+    Limpar uma chave deve zerar o contador local e o remoto
+    """
+    storage = make_storage()
+    limiter = FixedWindowRateLimiter(storage)
+    item = parse('5/minute')
+    for _ in range(5):
+        limiter.hit(item, '10.0.0.1')
+
+    limiter.clear(item, '10.0.0.1')
+
+    assert limiter.hit(item, '10.0.0.1')
@@ -0,0 +1,188 @@
+"""
+Testes da Retenção de Registros
+Prioridade: ALTA 🟠
+
+Testa:
+- Cálculo de meses e nomes/DDL de partições
+- Remoção em lotes (bancos sem particionamento)
+- Remoção dos tokens do índice cego junto com os registros
+- Partição nova recebe os registros do mês que estavam na DEFAULT
+- Retenção também limpa a partição DEFAULT
+- Rollup de estatísticas recalculado após a retenção
+- Thread do worker cria as partições futuras
+"""
+
+import pytest
+from datetime import date, datetime, timedelta
+
+from app.models import AccessLog, AccessLogSearchToken, db
+from app.retention import (
+    add_months, move_from_default_sql, partition_ddl, partition_name, retention_manager,
+)
+
+
+def add_access(timestamp, nome='Visitante'):
+    db.session.add(AccessLog(
+        nome=nome,
+        email='visitante@example.com',
+        access_id=AccessLog.generate_access_id(timestamp),
+        timestamp=timestamp,
+    ))
+
+
+def test_add_months_crosses_year():
+    """
+    Aritmética de meses deve atravessar a virada do ano
+    """
+    assert add_months(date(2026, 11, 1), 3) == date(2027, 2, 1)
+    assert add_months(date(2026, 1, 1), -1) == date(2025, 12, 1)
+
+
+def test_partition_ddl():
+    """
+    DDL deve cobrir exatamente o mês
+    """
+    assert partition_name(date(2026, 3, 1)) == 'access_logs_202603'
+    assert partition_ddl(date(2026, 12, 15)) == (
+        "CREATE TABLE IF NOT EXISTS access_logs_202612 PARTITION OF access_logs "
+        "FOR VALUES FROM ('2026-12-01') TO ('2027-01-01')"
+    )
+
+
+@pytest.mark.critical
+def test_retention_removes_old_rows_in_batches(client):
+    """
+    CRÍTICO: Registros anteriores ao período de retenção devem ser removidos
+    """
+    for day in range(1, 6):
+        add_access(datetime(2025, 12, day, 10, 0))
+    add_access(datetime(2026, 1, 1, 0, 0), nome='Mantido')
+    db.session.commit()
+
+    totals = retention_manager.apply_retention(months=9, today=date(2026, 10, 17), batch_size=2)
+
+    assert totals['rows'] == 5
+    assert totals['tokens'] > 0
+    assert [log.nome for log in AccessLog.query.all()] == ['Mantido']
+    assert AccessLogSearchToken.query.filter(
+        AccessLogSearchToken.timestamp < datetime(2026, 1, 1)
+    ).count() == 0
+    assert AccessLogSearchToken.query.count() > 0
+
+
+def test_retention_requires_positive_months(client):
+    """
+    Retenção de zero meses apagaria tudo e deve ser recusada
+    """
+    with pytest.raises(ValueError):
+        retention_manager.apply_retention(months=0)
+
+
+def test_ensure_partitions_noop_without_postgres(client):
+    """
+    Sem PostgreSQL não há partições a criar
+    """
+    assert retention_manager.ensure_partitions() == []
+
+
+@pytest.mark.critical
+def test_partitioned_retention_purges_default_partition(client, monkeypatch):
+    """
+    CRÍTICO: Registros antigos na DEFAULT (mês sem partição) também saem na retenção
+    """
+    db.session.execute(db.text(
+        "CREATE TABLE access_logs_default (id INTEGER PRIMARY KEY, timestamp DATETIME NOT NULL)"
+    ))
+    db.session.execute(db.text(
+        "INSERT INTO access_logs_default (id, timestamp) VALUES "
+        "(1, '2025-11-03 10:00:00'), (2, '2025-12-20 10:00:00'), (3, '2026-02-01 00:00:00')"
+    ))
+    db.session.commit()
+    monkeypatch.setattr(retention_manager, 'is_partitioned', lambda: True)
+    monkeypatch.setattr(retention_manager, 'list_partitions', lambda: [])
+
+    try:
+        totals = retention_manager.apply_retention(months=9, today=date(2026, 10, 17), batch_size=1)
+        remaining = db.session.execute(db.text("SELECT id FROM access_logs_default")).scalars().all()
+    finally:
+        db.session.execute(db.text("DROP TABLE access_logs_default"))
+        db.session.commit()
+
+    assert totals['rows'] == 2
+    assert remaining == [3]
+
+
+def test_retention_rebuilds_stats_rollup(client):
+    """
+    Estatísticas do rollup devem bater com a consulta direta depois da retenção
+    """
+    from app.data_manager import data_manager
+    from app.stats_rollup import stats_rollup
+
+    now = datetime.utcnow()
+    for i in range(3):
+        add_access(datetime(now.year - 2, 1, 10 + i))
+    add_access(now - timedelta(hours=3))
+    db.session.commit()
+    stats_rollup.refresh(now=now)
+    assert stats_rollup.get_stats(now=now)['total_accesses'] == 4
+
+    retention_manager.apply_retention(months=12)
+
+    assert stats_rollup.get_stats(now=now)['total_accesses'] == 1
+    assert data_manager.get_user_stats() == data_manager._live_user_stats()
+
+
+def test_move_from_default_sql():
+    """
+    Registros do mês saem da DEFAULT para a partição nova antes do ATTACH
+    """
+    statements = move_from_default_sql(date(2027, 2, 10), ['id', 'timestamp'])
+
+    assert statements[0].startswith('LOCK TABLE access_logs_default')
+    assert statements[1] == (
+        "CREATE TABLE access_logs_202702 (LIKE access_logs INCLUDING DEFAULTS INCLUDING CONSTRAINTS)"
+    )
+    assert statements[2] == (
+        "WITH moved AS (DELETE FROM access_logs_default "
+        "WHERE timestamp >= '2027-02-01' AND timestamp < '2027-03-01' RETURNING id, timestamp) "
+        "INSERT INTO access_logs_202702 (id, timestamp) SELECT id, timestamp FROM moved"
+    )
+    assert statements[3] == (
+        "ALTER TABLE access_logs ATTACH PARTITION access_logs_202702 "
+        "FOR VALUES FROM ('2027-02-01') TO ('2027-03-01')"
+    )
+
+
+def test_partition_thread_runs_at_startup(client, monkeypatch):
+    """
+    Worker cria as partições futuras ao subir, sem depender da CLI
+    """
+    calls = []
+    monkeypatch.setattr(retention_manager, 'ensure_partitions',
+                        lambda months_ahead: calls.append(months_ahead) or [])
+
+    retention_manager.start(interval=3600, months_ahead=5)
+    retention_manager._thread.join(timeout=0.5)
+    retention_manager.stop()
+    retention_manager._thread.join(timeout=5)
+
+    assert calls == [5]
+    assert not retention_manager._thread.is_alive()
+
+
+def test_partition_thread_only_in_server_workers(client, monkeypatch):
+    """
+    Importar o app (CLI) não inicia a thread; o hook do worker inicia conforme a config
+    """
+    from app_simple import app
+
+    assert retention_manager._thread is None or not retention_manager._thread.is_alive()
+
+    started = []
+    monkeypatch.setattr(retention_manager, 'start', lambda interval, months_ahead: started.append(interval))
+    monkeypatch.setitem(app.config, 'ACCESS_LOG_PARTITION_INTERVAL', 0)
+    assert not retention_manager.start_worker()
+    monkeypatch.setitem(app.config, 'ACCESS_LOG_PARTITION_INTERVAL', 600)
+    assert retention_manager.start_worker()
+    assert started == [600]
@@ -0,0 +1,173 @@
+"""
+Testes de Visitantes Recorrentes
+Prioridade: MÉDIA 🟡
+
+Testa:
+- Oferta de reconexão em um clique para MAC cadastrado recentemente
+- Registro leve (access_reconnects) em vez de um novo AccessLog
+- Janela de validade e cache LRU/TTL das consultas
+"""
+
+import time
+import pytest
+from datetime import datetime, timedelta
+from unittest.mock import patch
+
+from app.models import AccessLog, AccessReconnect, db
+from app.retention import retention_manager
+from app.returning_visitors import TTLCache, returning_visitors
+from tests.conftest import get_csrf_token
+
+MAC = 'AA:BB:CC:DD:EE:FF'
+
+
+@pytest.fixture
+def visitors(client):
+    returning_visitors.cache.clear()
+    yield returning_visitors
+    returning_visitors.cache.clear()
+
+
+def register(client, data):
+    data = dict(data, csrf_token=get_csrf_token(client, '/login'))
+    return client.post('/login', data=data)
+
+
+def reconnect(client, mac=MAC, ip='192.168.88.150'):
+    return client.post('/login', data={
+        'reconnect': '1', 'mac': mac, 'ip': ip,
+        'csrf_token': get_csrf_token(client, '/login'),
+    })
+
+
+def test_ttl_cache_evicts_and_expires():
+    """
+    Cache descarta o item menos usado e entradas vencidas
+    """
+    cache = TTLCache(maxsize=2, ttl=60)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    cache.get('a')
+    cache.set('c', 3)
+
+    assert cache.get('b', None) is None
+    assert cache.get('a') == 1
+    with patch('app.returning_visitors.time.monotonic', return_value=10 ** 9):
+        assert cache.get('a', None) is None
+
+
+def test_new_device_gets_only_the_form(visitors, client):
+    """
+    MAC desconhecido não recebe a opção de reconexão
+    """
+    response = client.get(f'/login?mac={MAC}')
+
+    assert response.status_code == 200
+    assert 'Reconectar' not in response.data.decode('utf-8')
+
+
+@pytest.mark.critical
+def test_returning_device_reconnects_with_one_click(visitors, client, sample_user_data):
+    """
+    CRÍTICO: Dispositivo recorrente reconecta sem novo AccessLog criptografado
+    """
+    register(client, sample_user_data)
+    assert 'Reconectar' in client.get(f'/login?mac={MAC}').data.decode('utf-8')
+
+    response = reconnect(client)
+
+    assert response.status_code == 302
+    assert AccessLog.query.count() == 1
+    record = AccessReconnect.query.one()
+    assert record.access_id == AccessLog.query.one().access_id
+    assert record.ip == '192.168.88.150'
+    assert record.mac_hash == AccessLog.hash_value(MAC)
+
+
+def test_reconnect_rejected_for_unknown_device(visitors, client):
+    """
+    Reconexão forjada para um MAC sem cadastro volta ao formulário
+    """
+    response = reconnect(client)
+
+    assert response.status_code == 200
+    assert 'Não foi possível reconectar' in response.data.decode('utf-8')
+    assert AccessReconnect.query.count() == 0
+
+
+def test_registration_outside_window_is_not_returning(visitors, client, sample_user_data):
+    """
+    Cadastro mais antigo que a janela exige preencher o formulário de novo
+    """
+    register(client, sample_user_data)
+    later = datetime.utcnow() + visitors.window + timedelta(minutes=1)
+
+    assert visitors.lookup(MAC) is not None
+    assert visitors.lookup(MAC, now=later) is None
+
+
+def test_repeat_lookups_are_served_from_cache(visitors, client, sample_user_data):
+    """
+    Consultas repetidas do mesmo MAC não voltam ao banco
+    """
+    register(client, sample_user_data)
+    visitors.lookup(MAC)
+    visitors.lookup('11:22:33:44:55:66')
+
+    with patch.object(AccessLog, 'query') as query:
+        assert visitors.lookup(MAC) is not None
+        assert visitors.lookup('11:22:33:44:55:66') is None
+
+    assert not query.with_entities.called
+
+
+def test_new_registration_clears_negative_cache(visitors, client, sample_user_data):
+    """
+    Cadastro pelo formulário invalida o 'não recorrente' em cache
+    """
+    assert visitors.lookup(MAC) is None
+
+    register(client, sample_user_data)
+
+    assert visitors.lookup(MAC) is not None
+
+
+def test_negative_cache_expires_quickly_in_other_workers(visitors, client, sample_user_data):
+    """
+    'Não recorrente' em cache vence em segundos mesmo sem forget() local
+    (cadastro feito em outro worker ou ainda na fila de escrita)
+    """
+    assert visitors.lookup(MAC) is None
+
+    with patch.object(visitors, 'forget'):
+        register(client, sample_user_data)
+    assert visitors.lookup(MAC) is None
+
+    later = time.monotonic() + visitors.miss_ttl + 1
+    with patch('app.returning_visitors.time.monotonic', return_value=later):
+        assert visitors.lookup(MAC) is not None
+
+
+def test_negative_cache_can_be_disabled(visitors, client, sample_user_data, monkeypatch):
+    """
+    RETURNING_VISITOR_MISS_TTL=0 não guarda resultados negativos
+    """
+    monkeypatch.setattr(visitors, 'miss_ttl', 0)
+    assert visitors.lookup(MAC) is None
+    assert len(visitors.cache) == 0
+
+
+def test_retention_removes_old_reconnects(visitors, client):
+    """
+    Retenção também apaga reconexões antigas (LGPD)
+    """
+    old_id = AccessLog.generate_access_id(datetime(2000, 1, 1))
+    new_id = AccessLog.generate_access_id()
+    db.session.add(AccessReconnect(access_id=old_id, mac_hash=AccessLog.hash_value('x'), timestamp=datetime(2000, 1, 1)))
+    db.session.add(AccessReconnect(access_id=new_id, mac_hash=AccessLog.hash_value('y'), timestamp=datetime.utcnow()))
+    db.session.commit()
+
+    totals = retention_manager.apply_retention(12)
+
+    assert totals['reconnects'] == 1
+    assert [r.access_id for r in AccessReconnect.query.all()] == [new_id]
@@ -0,0 +1,103 @@
+"""
+Testes de Busca por Índice Cego
+Prioridade: ALTA 🟠
+
+Testa:
+- Busca exata por email sem descriptografar a tabela
+- Busca por prefixo de palavras do nome
+- Índices não expõem dados em texto plano
+- Reconstrução do índice para registros antigos
+"""
+
+import pytest
+
+from app.data_manager import data_manager
+from app.models import AccessLog, AccessLogSearchToken, db
+
+
+@pytest.fixture
+def registros(client):
+    """Popula o banco com alguns acessos"""
+    pessoas = [
+        ('João da Silva', 'joao.silva@example.com'),
+        ('Maria Souza', 'maria@example.com'),
+        ('José Silveira', 'jose@example.com'),
+    ]
+    for nome, email in pessoas:
+        data_manager.log_access_encrypted({'nome': nome, 'email': email, 'ip': '10.0.0.1'})
+    return pessoas
+
+
+@pytest.mark.critical
+def test_search_email_exact_match(registros):
+    """
+    CRÍTICO: Email deve ser encontrado pelo índice cego (normalizado)
+    """
+    results = data_manager.search_access_logs('  Maria@Example.COM ', field='email')
+
+    assert len(results) == 1
+    assert results[0]['nome'] == 'Maria Souza'
+
+
+def test_search_email_partial_does_not_match(registros):
+    """
+    Índice de email é exato: parte do email não encontra registros
+    """
+    assert data_manager.search_access_logs('maria', field='email') == []
+
+
+@pytest.mark.critical
+def test_search_name_prefix(registros):
+    """
+    CRÍTICO: Prefixo de palavra do nome deve encontrar registros (sem acento)
+    """
+    results = data_manager.search_access_logs('silv', field='nome')
+    nomes = {r['nome'] for r in results}
+
+    assert nomes == {'João da Silva', 'José Silveira'}
+
+
+def test_search_name_multiple_words(registros):
+    """
+    Todas as palavras buscadas devem estar no nome
+    """
+    results = data_manager.search_access_logs('joao silva', field='nome')
+
+    assert [r['nome'] for r in results] == ['João da Silva']
+
+
+def test_search_name_too_short_returns_empty(registros):
+    """
+    Termos com menos de 2 caracteres não são indexados
+    """
+    assert data_manager.search_access_logs('j', field='nome') == []
+
+
+@pytest.mark.security
+def test_blind_index_does_not_store_plaintext(registros):
+    """
+    Índices cegos não devem conter email ou nome em texto plano
+    """
+    log = AccessLog.query.first()
+    assert log.email_bidx
+    assert 'example' not in log.email_bidx
+
+    tokens = [t.token for t in AccessLogSearchToken.query.all()]
+    assert tokens
+    assert not any('silva' in token for token in tokens)
+
+
+def test_rebuild_search_index_for_legacy_rows(client):
+    """
+    Registros sem índice (criados antes da migração) devem ser indexados
+    """
+    data_manager.log_access_encrypted({'nome': 'Ana Lima', 'email': 'ana@example.com'})
+    AccessLog.query.update({'email_bidx': None})
+    AccessLogSearchToken.query.delete()
+    db.session.commit()
+
+    assert data_manager.search_access_logs('ana', field='nome') == []
+
+    assert data_manager.rebuild_search_index(batch_size=10) == 1
+    assert len(data_manager.search_access_logs('ana@example.com', field='email')) == 1
+    assert len(data_manager.search_access_logs('lim', field='nome')) == 1
@@ -0,0 +1,131 @@
+"""
+Testes do Pipeline de Eventos de Segurança
+Prioridade: ALTA 🟠
+
+Testa:
+- Eventos estruturados em JSON gravados em lote fora da requisição
+- Amostragem de eventos de alto volume
+- Destino no banco (tabela security_events)
+- Fila cheia descarta em vez de bloquear
+"""
+
+import json
+import queue
+import pytest
+from unittest.mock import patch
+
+from app.models import SecurityEvent
+from app.security_events import (
+    DatabaseSink, JsonFileSink, SecurityEventPipeline, parse_sample_rates, security_events,
+)
+from app_simple import app
+from tests.conftest import get_csrf_token
+
+
+@pytest.fixture
+def pipeline(client, tmp_path):
+    """Pipeline isolado gravando num arquivo temporário"""
+    events = SecurityEventPipeline()
+    events.init_app(app)
+    events.stop()
+    events.sink = JsonFileSink(str(tmp_path / 'events.jsonl'), batch_size=1000)
+    events.start()
+    yield events
+    events.stop()
+
+
+def read_events(sink):
+    with open(sink.path, encoding='utf-8') as handle:
+        return [json.loads(line) for line in handle]
+
+
+def test_parse_sample_rates():
+    """
+    Taxas de amostragem vêm de 'tipo=taxa' separados por vírgula
+    """
+    assert parse_sample_rates('access_registered=0.1, data_export=2') == {
+        'access_registered': 0.1, 'data_export': 1.0,
+    }
+    assert parse_sample_rates('') == {}
+
+
+@pytest.mark.critical
+def test_events_are_written_as_json_in_batches(pipeline):
+    """
+    CRÍTICO: Eventos devem virar linhas JSON gravadas pelo listener
+    """
+    with patch.object(JsonFileSink, 'write', wraps=pipeline.sink.write) as write:
+        for i in range(5):
+            pipeline.emit('admin_login_failed', {'username': f'user{i}'}, ip='10.0.0.1')
+        pipeline.flush()
+
+    assert write.call_count == 1
+    events = read_events(pipeline.sink)
+    assert [e['details']['username'] for e in events] == [f'user{i}' for i in range(5)]
+    assert events[0]['event_type'] == 'admin_login_failed'
+    assert events[0]['ip'] == '10.0.0.1'
+    assert events[0]['sample_rate'] == 1.0
+
+
+def test_high_volume_events_are_sampled(pipeline):
+    """
+    Eventos com taxa de amostragem só são parcialmente gravados
+    """
+    pipeline.sample_rates = {'access_registered': 0.25}
+    with patch('app.security_events.random.random', side_effect=[0.1, 0.5, 0.9, 0.2]):
+        kept = [pipeline.emit('access_registered', {}) for _ in range(4)]
+    pipeline.flush()
+
+    assert kept == [True, False, False, True]
+    events = read_events(pipeline.sink)
+    assert len(events) == 2
+    assert all(e['sample_rate'] == 0.25 for e in events)
+
+
+def test_request_events_go_through_pipeline(client):
+    """
+    log_security_event na requisição deve enfileirar, não escrever no log geral
+    """
+    with patch.object(security_events, 'emit') as emit:
+        client.post('/admin/login', data={
+            'username': 'admin', 'password': 'errada',
+            'csrf_token': get_csrf_token(client, '/admin/login'),
+        })
+
+    event_types = [c.args[0] for c in emit.call_args_list]
+    assert 'admin_login_failed' in event_types
+    context = emit.call_args_list[-1].kwargs
+    assert context['endpoint'] == 'admin_login'
+    assert context['method'] == 'POST'
+
+
+def test_database_sink_inserts_batch(client):
+    """
+    Destino db grava o lote na tabela security_events
+    """
+    events = SecurityEventPipeline()
+    events.init_app(app)
+    events.stop()
+    events.sink = DatabaseSink(app)
+    events.start()
+    events.emit('data_export', {'format': 'csv'}, ip='10.0.0.2', endpoint='admin_export')
+    events.stop()
+
+    row = SecurityEvent.query.one()
+    assert row.event_type == 'data_export'
+    assert row.ip == '10.0.0.2'
+    assert json.loads(row.details) == {'format': 'csv'}
+
+
+def test_full_queue_drops_instead_of_blocking(pipeline):
+    """
+    Fila cheia não pode bloquear a thread da requisição
+    """
+    pipeline.stop()
+    pipeline.queue = queue.Queue(maxsize=1)
+    pipeline._handler.queue = pipeline.queue
+
+    pipeline.emit('csrf_token_invalid', {})
+    pipeline.emit('csrf_token_invalid', {})
+
+    assert pipeline.queue.qsize() == 1
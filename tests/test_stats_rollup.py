@@ -0,0 +1,149 @@
+"""
+Testes do Rollup de Estatísticas
+Prioridade: MÉDIA 🟡
+
+Testa:
+- Sketch HyperLogLog (estimativa e merge)
+- Consolidação de buckets de hora/dia
+- Estatísticas = rollup + registros ainda não consolidados
+- Rollup desatualizado cai na consulta direta
+"""
+
+import pytest
+from datetime import datetime, timedelta
+
+from app.data_manager import data_manager
+from app.models import AccessLog, AccessStatsRollup, db
+from app.stats_rollup import HyperLogLog, stats_rollup
+
+
+def add_access(timestamp, ip, mac=None):
+    db.session.add(AccessLog(
+        nome='Visitante',
+        email='visitante@example.com',
+        ip=ip,
+        ip_hash=AccessLog.hash_value(ip),
+        mac=mac,
+        mac_hash=AccessLog.hash_value(mac),
+        access_id=AccessLog.generate_access_id(timestamp),
+        timestamp=timestamp,
+    ))
+
+
+def test_hyperloglog_small_cardinality_is_exact():
+    """
+    Cardinalidades pequenas devem ser exatas (linear counting)
+    """
+    sketch = HyperLogLog().update(['a', 'b', 'a', 'c', None])
+
+    assert sketch.estimate() == 3
+    assert HyperLogLog().estimate() == 0
+
+
+def test_hyperloglog_large_cardinality_within_error():
+    """
+    Erro da estimativa deve ficar dentro de ~5% para 20 mil valores
+    """
+    sketch = HyperLogLog().update(f'device-{i}' for i in range(20000))
+
+    assert abs(sketch.estimate() - 20000) / 20000 < 0.05
+
+
+def test_hyperloglog_merge_and_serialization():
+    """
+    Merge deve equivaler à união e sobreviver à serialização
+    """
+    a = HyperLogLog().update(['x', 'y'])
+    b = HyperLogLog.from_bytes(HyperLogLog().update(['y', 'z']).to_bytes())
+
+    assert a.merge(b).estimate() == 3
+
+
+def test_stats_without_rollup_fall_back_to_live_queries(client, sample_user_data):
+    """
+    Sem rollup calculado, estatísticas vêm da consulta direta
+    """
+    data_manager.log_access_encrypted(sample_user_data)
+
+    assert stats_rollup.get_stats() is None
+    assert data_manager.get_user_stats()['total_accesses'] == 1
+
+
+@pytest.mark.critical
+def test_rollup_matches_live_stats(client):
+    """
+    CRÍTICO: Rollup + registros recentes devem bater com a consulta direta
+    """
+    now = datetime.utcnow()
+    for days_ago in range(10):
+        for i in range(3):
+            add_access(now - timedelta(days=days_ago, hours=i), f'10.0.{days_ago}.{i}',
+                       mac=f'AA:BB:CC:DD:EE:{i:02X}')
+    db.session.commit()
+
+    expected = data_manager._live_user_stats()
+
+    assert stats_rollup.refresh(now=now) > 0
+    assert AccessStatsRollup.query.filter_by(granularity='day').count() >= 10
+
+    # Registro novo ainda não consolidado deve aparecer pelo "tail"
+    add_access(now, '10.9.9.9', mac='AA:BB:CC:DD:EE:FF')
+    db.session.commit()
+    expected = data_manager._live_user_stats()
+
+    assert data_manager.get_user_stats() == expected
+
+
+def test_rollup_refresh_is_idempotent(client):
+    """
+    Executar o job várias vezes não deve contar registros em dobro
+    """
+    now = datetime.utcnow()
+    for i in range(4):
+        add_access(now - timedelta(hours=3, minutes=i), f'10.1.1.{i}')
+    db.session.commit()
+
+    stats_rollup.refresh(now=now)
+    stats_rollup.refresh(now=now + timedelta(minutes=30))
+    stats_rollup.refresh(now=now + timedelta(hours=1))
+
+    stats = stats_rollup.get_stats(now=now)
+    assert stats['total_accesses'] == 4
+    assert stats['unique_ips'] == 4
+
+
+def test_rollup_rebuild(client):
+    """
+    Rebuild deve recalcular o histórico após remoções manuais
+    """
+    now = datetime.utcnow()
+    for i in range(5):
+        add_access(now - timedelta(days=30, hours=i), f'10.2.2.{i}')
+    db.session.commit()
+    stats_rollup.refresh(now=now)
+
+    AccessLog.query.filter(AccessLog.ip == '10.2.2.0').delete()
+    db.session.commit()
+    stats_rollup.refresh(now=now, rebuild=True)
+
+    assert stats_rollup.get_stats(now=now)['total_accesses'] == 4
+
+
+def test_stale_rollup_falls_back_to_live_queries(client):
+    """
+    Rollup parado (job desligado) não deve arrastar o "tail" inteiro para a memória
+    """
+    now = datetime.utcnow()
+    for i in range(3):
+        add_access(now - timedelta(days=2, hours=i), f'10.3.3.{i}')
+    db.session.commit()
+    stats_rollup.refresh(now=now - timedelta(days=1))
+
+    add_access(now, '10.3.3.9')
+    db.session.commit()
+
+    assert stats_rollup.get_stats(now=now) is None
+    # Dentro do atraso tolerado o registro novo entra pelo "tail"
+    assert stats_rollup.get_stats(now=now - timedelta(days=1))['total_accesses'] == 4
+    assert data_manager.get_user_stats() == data_manager._live_user_stats()
+    assert data_manager.get_user_stats()['total_accesses'] == 4
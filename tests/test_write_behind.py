@@ -0,0 +1,224 @@
+"""
+Testes da Fila Write-Behind de Registros de Acesso
+Prioridade: ALTA 🟠
+
+Testa:
+- Registros enfileirados são gravados em lote
+- Spool local não contém dados pessoais em texto plano
+- Recuperação de spool deixado por processo que caiu
+- Replay idempotente após queda entre o commit e a remoção do spool
+- Quarentena de lotes que falham repetidamente ou estouram a fila
+"""
+
+import os
+import shutil
+import tempfile
+import pytest
+
+from app.data_manager import data_manager
+from app.models import AccessLog, AccessLogSearchToken
+from app.write_behind import AccessLogWriteBehind
+
+
+@pytest.fixture
+def write_behind(client):
+    """Ativa o write-behind sem thread de fundo (flush manual)"""
+    spool_dir = tempfile.mkdtemp()
+    client.application.config['ACCESS_LOG_SPOOL_DIR'] = spool_dir
+    client.application.config['ACCESS_LOG_BATCH_SIZE'] = 2
+    data_manager.setup_write_behind(start=False)
+    yield data_manager.write_behind
+    data_manager.write_behind.stop()
+    data_manager.write_behind = None
+    shutil.rmtree(spool_dir, ignore_errors=True)
+
+
+@pytest.mark.critical
+def test_enqueued_rows_flushed_in_batch(write_behind, sample_user_data):
+    """
+    CRÍTICO: Registros enfileirados devem chegar ao banco após o flush
+    """
+    for i in range(5):
+        data = sample_user_data.copy()
+        data['ip'] = f'10.0.0.{i}'
+        assert data_manager.log_access_encrypted(data) is True
+
+    assert AccessLog.query.count() == 0, "Nada deve ser gravado antes do flush"
+    assert write_behind.pending() == 5
+
+    assert write_behind.flush() == 5
+    assert write_behind.pending() == 0
+
+    logs = data_manager.get_access_logs(limit=10)
+    assert len(logs) == 5
+    assert all(log['nome'] == sample_user_data['nome'] for log in logs)
+    assert {log['ip'] for log in logs} == {f'10.0.0.{i}' for i in range(5)}
+
+
+@pytest.mark.security
+def test_spool_does_not_store_plaintext(write_behind, sample_user_data):
+    """
+    Spool em disco deve guardar nome/email criptografados (LGPD)
+    """
+    data_manager.log_access_encrypted(sample_user_data)
+
+    contents = ''
+    for name in os.listdir(write_behind.spool_dir):
+        with open(os.path.join(write_behind.spool_dir, name), encoding='utf-8') as f:
+            contents += f.read()
+
+    assert contents, "Registro deve estar no spool antes do flush"
+    assert sample_user_data['email'] not in contents
+    assert sample_user_data['nome'] not in contents
+
+
+def test_spool_removed_after_flush(write_behind, sample_user_data):
+    """
+    Segmentos do spool devem ser apagados após commit no banco
+    """
+    data_manager.log_access_encrypted(sample_user_data)
+    write_behind.flush()
+
+    leftovers = [n for n in os.listdir(write_behind.spool_dir) if n.endswith('.flushing')]
+    assert leftovers == []
+
+
+def test_failed_flush_keeps_rows(write_behind, sample_user_data):
+    """
+    Falha no banco não deve descartar registros enfileirados
+    """
+    data_manager.log_access_encrypted(sample_user_data)
+
+    original = write_behind.flush_callback
+
+    def failing(rows):
+        raise RuntimeError('banco indisponível')
+
+    write_behind.flush_callback = failing
+    assert write_behind.flush() == 0
+    assert write_behind.pending() == 1
+
+    write_behind.flush_callback = original
+    assert write_behind.flush() == 1
+    assert AccessLog.query.count() == 1
+
+
+@pytest.mark.critical
+def test_recover_spool_from_dead_process(write_behind, sample_user_data):
+    """
+    CRÍTICO: Registros no spool de um processo morto devem ser recuperados
+    """
+    data_manager.log_access_encrypted(sample_user_data)
+
+    # Simula queda: fecha o spool sem flush, liberando o lock do processo
+    write_behind._spool_file.close()
+    data_manager.write_behind = None
+
+    successor = AccessLogWriteBehind(
+        flush_callback=data_manager._insert_access_rows,
+        spool_dir=write_behind.spool_dir,
+        serialize=data_manager._serialize_access_row,
+        deserialize=data_manager._deserialize_access_row,
+    )
+    data_manager.write_behind = successor
+
+    assert successor.pending() == 1
+    assert successor.flush() == 1
+
+    last = AccessLog.query.order_by(AccessLog.id.desc()).first()
+    assert last.nome == sample_user_data['nome']
+    assert last.email == sample_user_data['email']
+
+
+def successor_of(write_behind):
+    """Simula queda do processo e sobe outro que recupera o spool"""
+    write_behind._spool_file.close()
+    data_manager.write_behind = None
+    successor = AccessLogWriteBehind(
+        flush_callback=data_manager._insert_access_rows,
+        spool_dir=write_behind.spool_dir,
+        serialize=data_manager._serialize_access_row,
+        deserialize=data_manager._deserialize_access_row,
+    )
+    data_manager.write_behind = successor
+    return successor
+
+
+@pytest.mark.critical
+def test_replay_after_crash_between_commit_and_remove(write_behind, sample_user_data):
+    """
+    CRÍTICO: Queda depois do commit e antes de apagar o spool não duplica nem trava o lote
+    """
+    for i in range(3):
+        data = sample_user_data.copy()
+        data['ip'] = f'10.0.0.{i}'
+        data_manager.log_access_encrypted(data)
+    # Commit no banco, mas o processo cai antes de remover o segmento
+    data_manager._insert_access_rows(list(write_behind._buffer))
+    tokens = AccessLogSearchToken.query.count()
+
+    successor = successor_of(write_behind)
+    data = sample_user_data.copy()
+    data['ip'] = '10.0.0.9'
+    data_manager.log_access_encrypted(data)
+
+    assert successor.pending() == 4
+    assert successor.flush() == 4
+    assert AccessLog.query.count() == 4
+    assert AccessLogSearchToken.query.count() == tokens * 4 // 3
+    assert [n for n in os.listdir(successor.spool_dir) if n.endswith('.flushing')] == []
+
+
+def test_repeated_failures_quarantine_batch(write_behind, sample_user_data):
+    """
+    Lote que sempre falha vai para quarentena (com backoff) e é regravado pela CLI
+    """
+    data_manager.log_access_encrypted(sample_user_data)
+    original = write_behind.flush_callback
+
+    def failing(rows):
+        raise ValueError('registro inválido')
+
+    write_behind.flush_callback = failing
+    write_behind.max_failures = 2
+    assert write_behind.flush() == 0
+    assert write_behind.pending() == 1
+    assert write_behind._retry_at > 0
+    assert write_behind.flush() == 0
+
+    assert write_behind.pending() == 0
+    quarantined = [n for n in os.listdir(write_behind.spool_dir) if n.endswith('.failed')]
+    assert len(quarantined) == 1
+    # Quarentena não volta sozinha na recuperação
+    assert successor_of(write_behind).pending() == 0
+
+    write_behind.flush_callback = original
+    totals = data_manager.replay_quarantined_access_logs()
+    assert totals == {'files': 1, 'rows': 1, 'failed': 0}
+    assert AccessLog.query.count() == 1
+    assert not [n for n in os.listdir(write_behind.spool_dir) if n.endswith('.failed')]
+
+
+def test_database_outage_caps_requeued_rows(write_behind, sample_user_data):
+    """
+    Banco fora do ar não conta para a quarentena, mas a fila não cresce sem limite
+    """
+    from sqlalchemy.exc import OperationalError
+
+    def down(rows):
+        raise OperationalError('INSERT', {}, Exception('conexão recusada'))
+
+    write_behind.flush_callback = down
+    write_behind.max_failures = 1
+    write_behind.max_pending = 3
+    for _ in range(2):
+        data_manager.log_access_encrypted(sample_user_data)
+    assert write_behind.flush() == 0
+    assert write_behind.pending() == 2
+
+    for _ in range(2):
+        data_manager.log_access_encrypted(sample_user_data)
+    assert write_behind.flush() == 0
+
+    assert write_behind.pending() == 0
+    assert len([n for n in os.listdir(write_behind.spool_dir) if n.endswith('.failed')]) == 2
@@ -3,9 +3,16 @@ WSGI entry point for production deployment with Gunicorn.
 
 Usage:
     gunicorn -c deploy/gunicorn.conf.py wsgi:app
+
+With GUNICORN_WORKER_CLASS=gevent (the default) the standard library is
+monkey-patched here, before the application opens any socket or thread.
 """
 
-from app_simple import app
+from app.green import patch
+
+patch()
+
+from app_simple import app  # noqa: E402
 
 if __name__ == "__main__":
     app.run()